@@ -18,7 +18,8 @@ const adminState = {
     availableSlotsByDate: {},
     rescheduleOrderNumber: null,
     rescheduleCurrentMonth: new Date(),
-    rescheduleSelectedSlot: null
+    rescheduleSelectedSlot: null,
+    rescheduleDuration: null
 };
 
 // DOM Elements
@@ -52,10 +53,19 @@ const elements = {
     appointmentsTableBody: document.getElementById('appointmentsTableBody'),
     noAppointments: document.getElementById('noAppointments'),
     
+    // Archive (past appointments)
+    archiveMonthInput: document.getElementById('archiveMonthInput'),
+    loadArchiveBtn: document.getElementById('loadArchiveBtn'),
+    archiveLoading: document.getElementById('archiveLoading'),
+    archiveList: document.getElementById('archiveList'),
+    archiveTableBody: document.getElementById('archiveTableBody'),
+    noArchivedAppointments: document.getElementById('noArchivedAppointments'),
+    
     // Reschedule Modal
     rescheduleModal: document.getElementById('rescheduleModal'),
     rescheduleOrderNumber: document.getElementById('rescheduleOrderNumber'),
     rescheduleCurrentTime: document.getElementById('rescheduleCurrentTime'),
+    rescheduleDuration: document.getElementById('rescheduleDuration'),
     rescheduleLoading: document.getElementById('rescheduleLoading'),
     rescheduleCalendar: document.getElementById('rescheduleCalendar'),
     rescheduleCurrentMonth: document.getElementById('rescheduleCurrentMonth'),
@@ -277,6 +287,35 @@ function showDashboard() {
 }
 
 // API Functions
+// Writes that hit a locked SharePoint file answer 202 and keep retrying on
+// the server; poll their status URL until they are saved or fail
+const WRITE_POLL_INTERVAL_MS = 1500;
+const WRITE_POLL_TIMEOUT_MS = 150000;
+
+async function waitForWrite(data) {
+    const statusUrl = `${API_BASE_URL}${data.statusUrl.replace(/^\/api/, '')}`;
+    const deadline = Date.now() + WRITE_POLL_TIMEOUT_MS;
+    
+    while (Date.now() < deadline) {
+        await new Promise(resolve => setTimeout(resolve, WRITE_POLL_INTERVAL_MS));
+        
+        const response = await fetch(statusUrl);
+        const status = await response.json();
+        
+        if (!response.ok) {
+            throw new Error(status.message || 'Could not check the status of your request');
+        }
+        if (status.status === 'committed') {
+            return { ...data, pending: false, message: status.message };
+        }
+        if (status.status === 'failed') {
+            throw new Error(status.message || 'Your request could not be saved');
+        }
+    }
+    
+    throw new Error('Your request is taking longer than expected. Please check again shortly.');
+}
+
 async function fetchAppointments() {
     const response = await fetch(`${API_BASE_URL}/admin/appointments`);
     const data = await response.json();
@@ -288,6 +327,17 @@ async function fetchAppointments() {
     return data.appointments;
 }
 
+async function fetchArchivedAppointments(month) {
+    const response = await fetch(`${API_BASE_URL}/admin/appointments/archive?month=${encodeURIComponent(month)}`);
+    const data = await response.json();
+    
+    if (!response.ok) {
+        throw new Error(data.message || 'Failed to fetch archived appointments');
+    }
+    
+    return data.appointments;
+}
+
 async function cancelAppointment(orderNumber) {
     const response = await fetch(`${API_BASE_URL}/admin/appointments/${orderNumber}`, {
         method: 'DELETE'
@@ -299,16 +349,20 @@ async function cancelAppointment(orderNumber) {
         throw new Error(data.message || 'Failed to cancel appointment');
     }
     
+    if (response.status === 202 && data.pending) {
+        return await waitForWrite(data);
+    }
+    
     return data;
 }
 
-async function rescheduleAppointment(orderNumber, newSlotTime) {
+async function rescheduleAppointment(orderNumber, newSlotTime, durationMinutes = null) {
     const response = await fetch(`${API_BASE_URL}/admin/appointments/${orderNumber}`, {
         method: 'PUT',
         headers: {
             'Content-Type': 'application/json'
         },
-        body: JSON.stringify({ newSlotTime })
+        body: JSON.stringify({ newSlotTime, durationMinutes })
     });
     
     const data = await response.json();
@@ -317,11 +371,16 @@ async function rescheduleAppointment(orderNumber, newSlotTime) {
         throw new Error(data.message || 'Failed to reschedule appointment');
     }
     
+    if (response.status === 202 && data.pending) {
+        return await waitForWrite(data);
+    }
+    
     return data;
 }
 
-async function fetchAvailableSlots() {
-    const response = await fetch(`${API_BASE_URL}/available-slots`);
+async function fetchAvailableSlots(durationMinutes = null) {
+    const query = durationMinutes ? `?durationMinutes=${encodeURIComponent(durationMinutes)}` : '';
+    const response = await fetch(`${API_BASE_URL}/available-slots${query}`);
     const data = await response.json();
     
     if (!response.ok) {
@@ -470,9 +529,10 @@ function showDateAppointments(date) {
                 <div class="appointment-info">
                     <p><strong>Order Number:</strong> ${appt.orderNumber}</p>
                     <p><strong>Time:</strong> ${appt.appointmentTime}</p>
+                    <p><strong>Dock time:</strong> ${appt.durationMinutes} minutes</p>
                 </div>
                 <div class="appointment-actions">
-                    <button class="btn-small btn-reschedule" onclick="openRescheduleModal('${appt.orderNumber}', '${appt.appointmentDate}', '${appt.appointmentTime}')">
+                    <button class="btn-small btn-reschedule" onclick="openRescheduleModal('${appt.orderNumber}', '${appt.appointmentDate}', '${appt.appointmentTime}', ${appt.durationMinutes})">
                         Reschedule
                     </button>
                     <button class="btn-small btn-cancel" onclick="handleCancelAppointment('${appt.orderNumber}')">
@@ -518,7 +578,7 @@ function renderAppointmentsTable() {
             <td>${appt.appointmentTime}</td>
             <td>
                 <div class="action-buttons">
-                    <button class="btn-small btn-reschedule" onclick="openRescheduleModal('${appt.orderNumber}', '${appt.appointmentDate}', '${appt.appointmentTime}')">
+                    <button class="btn-small btn-reschedule" onclick="openRescheduleModal('${appt.orderNumber}', '${appt.appointmentDate}', '${appt.appointmentTime}', ${appt.durationMinutes})">
                         Reschedule
                     </button>
                     <button class="btn-small btn-cancel" onclick="handleCancelAppointment('${appt.orderNumber}')">
@@ -544,6 +604,43 @@ function handleSearch() {
     renderListView();
 }
 
+// Archived appointments (read only)
+async function loadArchivedAppointments() {
+    const month = elements.archiveMonthInput.value;
+    if (!month) {
+        alert('Please choose a month');
+        return;
+    }
+    
+    try {
+        elements.archiveLoading.style.display = 'block';
+        elements.archiveList.style.display = 'none';
+        
+        const appointments = await fetchArchivedAppointments(month);
+        const sorted = [...appointments].sort((a, b) =>
+            new Date(combineDateAndTime(a.appointmentDate, a.appointmentTime)) -
+            new Date(combineDateAndTime(b.appointmentDate, b.appointmentTime))
+        );
+        
+        elements.archiveTableBody.innerHTML = sorted.map(appt => `
+            <tr>
+                <td>${appt.orderNumber}</td>
+                <td>${appt.appointmentDate}</td>
+                <td>${appt.appointmentTime}</td>
+                <td>${appt.customerEmail || ''}</td>
+            </tr>
+        `).join('');
+        elements.noArchivedAppointments.style.display = sorted.length === 0 ? 'block' : 'none';
+        
+        elements.archiveLoading.style.display = 'none';
+        elements.archiveList.style.display = 'block';
+    } catch (error) {
+        console.error('Error loading archived appointments:', error);
+        elements.archiveLoading.style.display = 'none';
+        alert('Failed to load archived appointments: ' + error.message);
+    }
+}
+
 // Cancel Appointment
 async function handleCancelAppointment(orderNumber) {
     if (!confirm(`Are you sure you want to cancel the appointment for order ${orderNumber}?`)) {
@@ -568,24 +665,38 @@ async function handleCancelAppointment(orderNumber) {
 }
 
 // Reschedule Modal Functions
-async function openRescheduleModal(orderNumber, appointmentDate, appointmentTime) {
+async function openRescheduleModal(orderNumber, appointmentDate, appointmentTime, durationMinutes = null) {
     adminState.rescheduleOrderNumber = orderNumber;
     adminState.rescheduleCurrentMonth = new Date();
     adminState.rescheduleSelectedSlot = null;
+    adminState.rescheduleDuration = durationMinutes;
     
     elements.rescheduleOrderNumber.textContent = orderNumber;
     elements.rescheduleCurrentTime.textContent = `${appointmentDate} at ${appointmentTime}`;
+    elements.rescheduleDuration.value = durationMinutes || '';
     elements.rescheduleModal.classList.add('show');
-    elements.rescheduleLoading.style.display = 'block';
-    elements.rescheduleCalendar.style.display = 'none';
-    elements.rescheduleTimeSlots.classList.remove('show');
     elements.confirmRescheduleBtn.style.display = 'none';
     elements.confirmRescheduleBtn.disabled = false;
     elements.confirmRescheduleBtn.textContent = 'Confirm Reschedule';
     hideMessage(elements.rescheduleMessage);
     
+    await loadRescheduleSlots();
+}
+
+function getRescheduleDuration() {
+    const duration = parseInt(elements.rescheduleDuration.value, 10);
+    return duration > 0 ? duration : null;
+}
+
+// Only offer start times with room for the appointment's dock time
+async function loadRescheduleSlots() {
+    adminState.rescheduleSelectedSlot = null;
+    elements.rescheduleLoading.style.display = 'block';
+    elements.rescheduleCalendar.style.display = 'none';
+    elements.rescheduleTimeSlots.classList.remove('show');
+    
     try {
-        const slots = await fetchAvailableSlots();
+        const slots = await fetchAvailableSlots(getRescheduleDuration());
         adminState.availableSlots = slots;
         adminState.availableSlotsByDate = groupSlotsByDate(slots);
         
@@ -728,8 +839,17 @@ function selectRescheduleSlot(slot, slotElement) {
     hideMessage(elements.rescheduleMessage);
 }
 
+function handleRescheduleDurationChange() {
+    // A new dock time alone can be saved without picking another slot
+    const changed = getRescheduleDuration() && getRescheduleDuration() !== adminState.rescheduleDuration;
+    elements.confirmRescheduleBtn.style.display = changed ? 'inline-block' : 'none';
+    loadRescheduleSlots();
+}
+
 async function handleConfirmReschedule() {
-    if (!adminState.rescheduleSelectedSlot) {
+    const duration = getRescheduleDuration();
+    const durationChanged = duration && duration !== adminState.rescheduleDuration;
+    if (!adminState.rescheduleSelectedSlot && !durationChanged) {
         showMessage(elements.rescheduleMessage, 'Please select a new time slot', 'error');
         return;
     }
@@ -738,7 +858,8 @@ async function handleConfirmReschedule() {
     elements.confirmRescheduleBtn.textContent = 'Rescheduling...';
     
     try {
-        await rescheduleAppointment(adminState.rescheduleOrderNumber, adminState.rescheduleSelectedSlot);
+        await rescheduleAppointment(adminState.rescheduleOrderNumber, adminState.rescheduleSelectedSlot,
+                                    durationChanged ? duration : null);
         showMessage(elements.rescheduleMessage, 'Appointment rescheduled successfully!', 'success');
         
         // Close modal and refresh immediately
@@ -802,6 +923,7 @@ elements.adminNextMonth.addEventListener('click', () => {
 });
 
 elements.searchInput.addEventListener('input', handleSearch);
+elements.loadArchiveBtn.addEventListener('click', loadArchivedAppointments);
 
 elements.reschedulePrevMonth.addEventListener('click', () => {
     adminState.rescheduleCurrentMonth.setMonth(adminState.rescheduleCurrentMonth.getMonth() - 1);
@@ -814,6 +936,7 @@ elements.rescheduleNextMonth.addEventListener('click', () => {
 });
 
 elements.confirmRescheduleBtn.addEventListener('click', handleConfirmReschedule);
+elements.rescheduleDuration.addEventListener('change', handleRescheduleDurationChange);
 elements.cancelRescheduleBtn.addEventListener('click', closeRescheduleModal);
 elements.closeRescheduleModal.addEventListener('click', closeRescheduleModal);
 
@@ -10,6 +10,9 @@ const state = {
     selectedDate: null,
     availableSlots: [],
     availableSlotsByDate: {},
+    prefetchedSlots: null, // Slots returned together with the order validation
+    slotMinutes: null, // Length of one time slot; an order may need several
+    fullDays: [], // Bookable days with no time left, which have a waitlist
     currentMonth: new Date(),
     today: new Date()
 };
@@ -29,6 +32,10 @@ const elements = {
     slotsContainer: document.getElementById('slotsContainer'),
     backToValidationBtn: document.getElementById('backToValidationBtn'),
     selectionMessage: document.getElementById('selectionMessage'),
+    waitlistSection: document.getElementById('waitlistSection'),
+    waitlistDate: document.getElementById('waitlistDate'),
+    waitlistEmail: document.getElementById('waitlistEmail'),
+    joinWaitlistBtn: document.getElementById('joinWaitlistBtn'),
     
     // Step 3
     stepConfirmation: document.getElementById('step-confirmation'),
@@ -107,9 +114,39 @@ function groupSlotsByDate(slots) {
 }
 
 // API Functions
+// Writes that hit a locked SharePoint file answer 202 and keep retrying on
+// the server; poll their status URL until they are saved or fail
+const WRITE_POLL_INTERVAL_MS = 1500;
+const WRITE_POLL_TIMEOUT_MS = 150000;
+
+async function waitForWrite(data) {
+    const statusUrl = `${API_BASE_URL}${data.statusUrl.replace(/^\/api/, '')}`;
+    const deadline = Date.now() + WRITE_POLL_TIMEOUT_MS;
+    
+    while (Date.now() < deadline) {
+        await new Promise(resolve => setTimeout(resolve, WRITE_POLL_INTERVAL_MS));
+        
+        const response = await fetch(statusUrl);
+        const status = await response.json();
+        
+        if (!response.ok) {
+            throw new Error(status.message || 'Could not check the status of your request');
+        }
+        if (status.status === 'committed') {
+            return { ...data, pending: false, message: status.message };
+        }
+        if (status.status === 'failed') {
+            throw new Error(status.message || 'Your request could not be saved');
+        }
+    }
+    
+    throw new Error('Your request is taking longer than expected. Please check again shortly.');
+}
+
+// Validates the order and, if it can be booked, returns its available slots in the same response
 async function validateOrder(orderNumber) {
     try {
-        const response = await fetch(`${API_BASE_URL}/validate-order`, {
+        const response = await fetch(`${API_BASE_URL}/validate-order-with-slots`, {
             method: 'POST',
             headers: {
                 'Content-Type': 'application/json'
@@ -132,13 +169,18 @@ async function validateOrder(orderNumber) {
 
 async function loadAvailableSlots() {
     try {
-        const response = await fetch(`${API_BASE_URL}/available-slots`);
+        // Only start times with room for the order's whole dock time
+        const duration = state.currentOrder ? state.currentOrder.durationMinutes : null;
+        const query = duration ? `?durationMinutes=${encodeURIComponent(duration)}` : '';
+        const response = await fetch(`${API_BASE_URL}/available-slots${query}`);
         const data = await response.json();
         
         if (!response.ok) {
             throw new Error(data.message || 'Failed to load available slots');
         }
         
+        state.slotMinutes = data.slotMinutes || state.slotMinutes;
+        state.fullDays = data.fullDays || [];
         return data.slots;
     } catch (error) {
         console.error('Error loading slots:', error);
@@ -159,7 +201,14 @@ async function bookAppointment(orderNumber, slotTime, customerEmail) {
         const data = await response.json();
         
         if (!response.ok) {
-            throw new Error(data.message || 'Failed to book appointment');
+            const error = new Error(data.message || 'Failed to book appointment');
+            // A taken slot (409) comes with the nearest free times
+            error.suggestions = data.suggestions || [];
+            throw error;
+        }
+        
+        if (response.status === 202 && data.pending) {
+            return await waitForWrite(data);
         }
         
         return data;
@@ -169,6 +218,24 @@ async function bookAppointment(orderNumber, slotTime, customerEmail) {
     }
 }
 
+async function joinWaitlist(orderNumber, date, customerEmail) {
+    const response = await fetch(`${API_BASE_URL}/waitlist`, {
+        method: 'POST',
+        headers: {
+            'Content-Type': 'application/json'
+        },
+        body: JSON.stringify({ orderNumber, date, customerEmail })
+    });
+    
+    const data = await response.json();
+    
+    if (!response.ok) {
+        throw new Error(data.message || 'Failed to join the waitlist');
+    }
+    
+    return data;
+}
+
 // Event Handlers
 async function handleValidateOrder() {
     const orderNumber = elements.orderNumberInput.value.trim();
@@ -187,6 +254,9 @@ async function handleValidateOrder() {
         
         if (result.success) {
             state.currentOrder = result.order;
+            state.prefetchedSlots = result.slots || null;
+            state.slotMinutes = result.slotMinutes || state.slotMinutes;
+            state.fullDays = result.fullDays || [];
             
             if (result.order.hasAppointment) {
                 // Use the formatted appointment date/time from server
@@ -219,6 +289,7 @@ async function showSlotSelectionStep() {
     elements.orderInfo.innerHTML = `
         <p><strong>Order Number:</strong> ${state.currentOrder.orderNumber}</p>
         <p><strong>Status:</strong> ${state.currentOrder.status}</p>
+        ${isLongAppointment() ? `<p><strong>Dock time:</strong> ${state.currentOrder.durationMinutes} minutes</p>` : ''}
     `;
     
     // Show loading
@@ -228,8 +299,11 @@ async function showSlotSelectionStep() {
     hideMessage(elements.selectionMessage);
     
     try {
-        const slots = await loadAvailableSlots();
+        // Slots normally arrive with the validation; fetch them only if they didn't
+        const slots = state.prefetchedSlots || await loadAvailableSlots();
+        state.prefetchedSlots = null;
         state.availableSlots = slots;
+        renderWaitlistSection();
         
         if (slots.length === 0) {
             elements.slotsLoading.style.display = 'none';
@@ -247,6 +321,9 @@ async function showSlotSelectionStep() {
         
         // Set up calendar navigation
         setupCalendarNavigation();
+        
+        // Keep the calendar current while the customer picks a time
+        startSlotEvents();
     } catch (error) {
         elements.slotsLoading.style.display = 'none';
         showMessage(elements.selectionMessage, `Error loading time slots: ${error.message}`, 'error');
@@ -255,6 +332,43 @@ async function showSlotSelectionStep() {
 
 // renderTimeSlots function removed - replaced with calendar view
 
+function renderWaitlistSection() {
+    if (!elements.waitlistSection) {
+        return;
+    }
+    if (state.fullDays.length === 0) {
+        elements.waitlistSection.style.display = 'none';
+        return;
+    }
+    
+    elements.waitlistDate.innerHTML = state.fullDays.map(day => {
+        const label = new Date(`${day}T00:00:00Z`).toLocaleDateString('en-US', {
+            weekday: 'long', month: 'long', day: 'numeric', timeZone: 'UTC'
+        });
+        return `<option value="${day}">${label}</option>`;
+    }).join('');
+    elements.waitlistSection.style.display = 'block';
+}
+
+async function handleJoinWaitlist() {
+    const customerEmail = elements.waitlistEmail.value.trim();
+    if (!isValidEmail(customerEmail)) {
+        showMessage(elements.selectionMessage, 'Please enter a valid email address for the waitlist', 'error');
+        elements.waitlistEmail.focus();
+        return;
+    }
+    
+    elements.joinWaitlistBtn.disabled = true;
+    try {
+        const result = await joinWaitlist(state.currentOrder.orderNumber, elements.waitlistDate.value, customerEmail);
+        showMessage(elements.selectionMessage, result.message, 'success');
+    } catch (error) {
+        showMessage(elements.selectionMessage, error.message, 'error');
+    } finally {
+        elements.joinWaitlistBtn.disabled = false;
+    }
+}
+
 function selectTimeSlot(slotTime) {
     // Remove previous selection
     document.querySelectorAll('.time-slot').forEach(slot => {
@@ -320,14 +434,25 @@ async function handleConfirmBooking() {
     confirmBtn.disabled = true;
     confirmBtn.textContent = 'Booking...';
     
+    // Shown if the booking has to wait for the schedule file to be released
+    const savingNotice = setTimeout(() => {
+        confirmBtn.textContent = 'Saving...';
+    }, 3000);
+    
     try {
         const result = await bookAppointment(state.currentOrder.orderNumber, state.selectedSlot, customerEmail);
+        clearTimeout(savingNotice);
         
         if (result.success) {
             showConfirmationStep(result.appointment, customerEmail);
         }
     } catch (error) {
-        showMessage(elements.selectionMessage, error.message, 'error');
+        clearTimeout(savingNotice);
+        let message = error.message;
+        if (error.suggestions && error.suggestions.length > 0) {
+            message += `. Nearest available times: ${error.suggestions.map(formatDateTime).join(', ')}`;
+        }
+        showMessage(elements.selectionMessage, message, 'error');
         confirmBtn.disabled = false;
         confirmBtn.textContent = 'Confirm Booking';
     }
@@ -339,6 +464,7 @@ function isValidEmail(email) {
 }
 
 function showConfirmationStep(appointment, customerEmail) {
+    stopSlotEvents();
     showStep(elements.stepConfirmation);
     
     elements.confirmationDetails.innerHTML = `
@@ -358,6 +484,7 @@ function showConfirmationStep(appointment, customerEmail) {
 }
 
 function handleBackToValidation() {
+    stopSlotEvents();
     showStep(elements.stepValidation);
     elements.orderNumberInput.value = '';
     state.currentOrder = null;
@@ -365,6 +492,8 @@ function handleBackToValidation() {
     state.selectedDate = null;
     state.availableSlots = [];
     state.availableSlotsByDate = {};
+    state.prefetchedSlots = null;
+    state.fullDays = [];
     hideMessage(elements.validationMessage);
     elements.validateBtn.disabled = false;
     elements.validateBtn.textContent = 'Validate Order';
@@ -384,6 +513,11 @@ function handleBackToValidation() {
     if (emailInput) {
         emailInput.value = '';
     }
+    
+    if (elements.waitlistSection) {
+        elements.waitlistSection.style.display = 'none';
+        elements.waitlistEmail.value = '';
+    }
 }
 
 function handleNewAppointment() {
@@ -399,6 +533,9 @@ elements.orderNumberInput.addEventListener('keypress', (e) => {
 });
 elements.backToValidationBtn.addEventListener('click', handleBackToValidation);
 elements.newAppointmentBtn.addEventListener('click', handleNewAppointment);
+if (elements.joinWaitlistBtn) {
+    elements.joinWaitlistBtn.addEventListener('click', handleJoinWaitlist);
+}
 
 // Initialize
 console.log('Appointment system initialized');
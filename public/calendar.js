@@ -38,6 +38,9 @@ function renderCalendar() {
     const isWeekend = currentDate.getDay() === 0 || currentDate.getDay() === 6;
     
     const dayEl = createDayElement(day, false, hasSlots, isToday, isPast || isWeekend || !hasSlots, currentDate);
+    if (state.selectedDate && isSameDay(currentDate, state.selectedDate)) {
+      dayEl.classList.add('selected');
+    }
     calendarDays.appendChild(dayEl);
   }
   
@@ -90,7 +93,7 @@ function selectDate(date) {
   renderTimeSlotsForDate(date);
 }
 
-function renderTimeSlotsForDate(date) {
+function renderTimeSlotsForDate(date, scroll = true) {
   const dateKey = date.toISOString().split('T')[0];
   const slots = state.availableSlotsByDate[dateKey] || [];
   
@@ -115,6 +118,9 @@ function renderTimeSlotsForDate(date) {
     slotEl.className = 'time-slot';
     slotEl.textContent = formatTime(slot);
     slotEl.dataset.slot = slot;
+    if (slot === state.selectedSlot) {
+      slotEl.classList.add('selected');
+    }
     slotEl.addEventListener('click', () => selectTimeSlot(slot));
     timeSlotsContainer.appendChild(slotEl);
   });
@@ -123,7 +129,9 @@ function renderTimeSlotsForDate(date) {
   hideMessage(elements.selectionMessage);
   
   // Scroll to time slots
-  timeSlotsSection.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
+  if (scroll) {
+    timeSlotsSection.scrollIntoView({ behavior: 'smooth', block: 'nearest' });
+  }
 }
 
 function setupCalendarNavigation() {
@@ -138,6 +146,99 @@ function setupCalendarNavigation() {
   });
 }
 
+// Live slot updates: while the calendar is open the server pushes slot-taken
+// and slot-freed changes (server-sent events), so it stays current without polling
+let slotEventSource = null;
+
+function startSlotEvents() {
+  if (!window.EventSource || slotEventSource) {
+    return;
+  }
+  
+  let connected = false;
+  slotEventSource = new EventSource(`${API_BASE_URL}/slot-events`);
+  
+  slotEventSource.addEventListener('open', () => {
+    // Changes made while the browser was reconnecting were missed; reload once
+    if (connected) {
+      refreshAvailableSlots();
+    }
+    connected = true;
+  });
+  
+  slotEventSource.addEventListener('slots', (event) => {
+    // Events list the slots that filled up or freed for a one-slot booking;
+    // the start times open to a longer appointment depend on its neighbours
+    // too, so reload those instead
+    if (isLongAppointment()) {
+      refreshAvailableSlots();
+    } else {
+      applySlotChanges(JSON.parse(event.data));
+    }
+  });
+  
+  slotEventSource.addEventListener('error', () => {
+    // Live updates are off or full (503): the calendar simply stays as loaded
+    if (slotEventSource && slotEventSource.readyState === EventSource.CLOSED) {
+      slotEventSource = null;
+    }
+  });
+}
+
+function stopSlotEvents() {
+  if (slotEventSource) {
+    slotEventSource.close();
+    slotEventSource = null;
+  }
+}
+
+async function refreshAvailableSlots() {
+  try {
+    setAvailableSlots(await loadAvailableSlots());
+  } catch (error) {
+    console.error('Error refreshing slots:', error);
+  }
+}
+
+function isLongAppointment() {
+  return Boolean(state.currentOrder && state.slotMinutes &&
+                 state.currentOrder.durationMinutes > state.slotMinutes);
+}
+
+function applySlotChanges(changes) {
+  const taken = new Set(changes.taken || []);
+  const slots = state.availableSlots.filter(slot => !taken.has(slot));
+  (changes.freed || []).forEach(slot => {
+    if (!slots.includes(slot)) {
+      slots.push(slot);
+    }
+  });
+  slots.sort();
+  setAvailableSlots(slots);
+}
+
+function setAvailableSlots(slots) {
+  const lostSelection = state.selectedSlot && !slots.includes(state.selectedSlot);
+  if (lostSelection) {
+    state.selectedSlot = null;
+    const confirmBtn = document.getElementById('confirmBookingBtn');
+    if (confirmBtn) {
+      confirmBtn.remove();
+    }
+  }
+  
+  state.availableSlots = slots;
+  state.availableSlotsByDate = groupSlotsByDate(slots);
+  renderCalendar();
+  if (state.selectedDate) {
+    renderTimeSlotsForDate(state.selectedDate, false);
+  }
+  
+  if (lostSelection) {
+    showMessage(elements.selectionMessage, 'The time you selected was just booked by someone else. Please choose another time.', 'error');
+  }
+}
+
 function isSameDay(date1, date2) {
   return date1.getFullYear() === date2.getFullYear() &&
          date1.getMonth() === date2.getMonth() &&
@@ -148,4 +249,6 @@ function isSameDay(date1, date2) {
 window.renderCalendar = renderCalendar;
 window.selectDate = selectDate;
 window.setupCalendarNavigation = setupCalendarNavigation;
+window.startSlotEvents = startSlotEvents;
+window.stopSlotEvents = stopSlotEvents;
 
@@ -1,10 +1,32 @@
-from flask import Flask, request, jsonify, send_from_directory
+from flask import Flask, Response, request, jsonify, send_from_directory
 from flask_cors import CORS
 from config import Config
-from services.sharepoint_service import SharePointService
+from services.storage import create_storage_backend, StorageFileNotFound, StorageWriteError, VersionConflict
+from services.excel_table import ExcelTableWriter
+from services.appointment_log import AppointmentLog
+from services.appointment_archiver import AppointmentArchiver, appointment_key
+from services.order_reconciler import OrderReconciler
+from services.waitlist import Waitlist
+from services.waitlist_promoter import WaitlistPromoter
+from services.reminder_scheduler import ReminderScheduler
+from services.periodic_job import PeriodicJob
+from services import file_formats
 from services.email_service import EmailService
+from services.http_session import is_async_mode
+from services.record_table import RecordTable
+from services.slot_keys import slot_key, slot_key_from_iso, slot_key_to_iso
+from services.free_slots import FreeSlotIndex
+from services.slot_capacity import SlotCapacity
+from services.dock_schedule import DockSchedule, DockScheduleCache
+from services.slot_events import SlotEventHub
+from services.snapshot_cache import SnapshotCache
+from services.appointment_writer import GroupCommitWriter, MutationRejected, WritePending
+from services.write_status import WriteStatusStore
+from services.write_journal import WriteJournal
+from services.circuit_breaker import SharePointUnavailable
 from datetime import datetime, timedelta
 import os
+import posixpath
 import traceback
 
 app = Flask(__name__, static_folder='../public', static_url_path='')
@@ -13,10 +35,35 @@ app.config.from_object(Config)
 # CORS Configuration
 CORS(app, origins=app.config.get('CORS_ORIGINS', []), supports_credentials=True)
 
-# Initialize services
-sharepoint_service = SharePointService(app.config)
+# Initialize services (orders/appointments files live in SharePoint, or a
+# local directory with STORAGE_BACKEND=local)
+storage = create_storage_backend(app.config)
 email_service = EmailService(app.config)
 
+# Parsed orders/appointments snapshots, revalidated by eTag
+snapshot_cache = SnapshotCache(storage, app.config)
+
+# Columns of the appointments file
+APPOINTMENT_FIELDNAMES = ['OrderNumber', 'Appointment_Date', 'Appointment_Time', 'Customer_Email', 'Created_Time',
+                          'Duration_Minutes']
+
+# Columns of the orders sheet the app uses; only these are kept in the snapshot
+ORDER_FIELDNAMES = ['Ready Order Number', 'Ready Date', 'Pick up Status', 'Storage Fee Start From']
+if app.config.get('APPOINTMENT_DURATION_COLUMN'):
+    ORDER_FIELDNAMES.append(app.config['APPOINTMENT_DURATION_COLUMN'])
+
+# The orders snapshot is also kept on disk so restarts memory-map it instead
+# of re-downloading and re-parsing the workbook (only if it was parsed into
+# the same columns)
+snapshot_cache.persist(app.config.get('ORDERS_FILE_PATH'), ORDER_FIELDNAMES)
+
+# Bookings each slot can take (loading bays), by weekday and time of day
+slot_capacity = SlotCapacity.from_config(
+    app.config.get('SLOT_CAPACITY', 1),
+    app.config.get('SLOT_CAPACITY_BY_WEEKDAY', ''),
+    app.config.get('SLOT_CAPACITY_BY_TIME', '')
+)
+
 # In-memory slot locks
 slot_locks = {}
 LOCK_TIMEOUT = 60  # seconds
@@ -49,15 +96,8 @@ def unlock_slot(order_number, slot_time):
         del slot_locks[lock_key]
 
 def find_order_by_number(orders, order_number):
-    """Find order in orders list by order number (case-insensitive)"""
-    order_num_str = str(order_number).strip().upper()
-    
-    for order in orders:
-        if 'Ready Order Number' in order:
-            ready_num = str(order['Ready Order Number']).strip().upper()
-            if ready_num == order_num_str:
-                return order
-    return None
+    """Find order in orders table by order number (case-insensitive, indexed)"""
+    return orders.find(order_number)
 
 def find_appointment_by_order_number(appointments, order_number):
     """Find appointment in appointments list by order number (case-insensitive)"""
@@ -74,6 +114,12 @@ def is_order_ready(order):
     """Check if order is ready for pickup"""
     return bool(order.get('Ready Order Number'))
 
+def is_order_picked_up(order):
+    """Check if order has already been picked up (fulfilled)"""
+    storage_fee_status = str(order.get('Storage Fee Start From', '')).strip().lower()
+    pickup_status = str(order.get('Pick up Status', '')).strip().lower()
+    return storage_fee_status == 'picked up' or pickup_status == 'fulfilled'
+
 def is_excel_file(file_path):
     """Check if file is Excel based on extension"""
     return file_path.lower().endswith(('.xlsx', '.xls'))
@@ -81,17 +127,233 @@ def is_excel_file(file_path):
 def parse_appointments_file(file_content, file_path):
     """Parse appointments file (CSV or Excel based on extension)"""
     if is_excel_file(file_path):
-        return sharepoint_service.parse_excel_file(file_content)
+        return file_formats.parse_excel_file(file_content)
     else:
-        return sharepoint_service.parse_csv_file(file_content)
+        return file_formats.parse_csv_file(file_content)
 
-def save_appointments_file(appointments, file_path, fieldnames):
-    """Save appointments to file (CSV or Excel based on extension)"""
+def save_appointments_file(appointments, file_path, fieldnames, if_match=None, create_only=False):
+    """Save appointments to file (CSV or Excel based on extension)
+    
+    With if_match, the save fails with VersionConflict if the file changed
+    since that version was read (e.g. another worker saved in between);
+    create_only does the same for a file that did not exist when read.
+    """
     if is_excel_file(file_path):
-        file_bytes = sharepoint_service.records_to_excel_bytes(appointments, fieldnames)
+        file_bytes = file_formats.records_to_excel_bytes(appointments, fieldnames)
+    else:
+        file_bytes = file_formats.records_to_csv_bytes(appointments, fieldnames)
+    version = storage.write(file_path, file_bytes, if_match=if_match, create_only=create_only)
+    
+    # Our own write is the newest version; no need to download it again
+    snapshot_cache.put(file_path, build_appointments_table(appointments), version)
+
+def parse_orders_file(file_content, file_path):
+    """Parse orders file (CSV or Excel based on extension)"""
+    if file_path.endswith('.xlsx') or file_path.endswith('.xls'):
+        return file_formats.parse_excel_file(file_content)
+    else:
+        return file_formats.parse_csv_file(file_content)
+
+def parse_orders_snapshot(file_content):
+    """Parse the orders file into a compact table indexed by order number (used columns only)"""
+    orders_file_path = app.config.get('ORDERS_FILE_PATH')
+    return RecordTable.from_records(parse_orders_file(file_content, orders_file_path), 'Ready Order Number', ORDER_FIELDNAMES)
+
+def build_appointments_table(appointments):
+    """Pack appointments into a compact table indexed by order number
+    
+    Each row also gets an integer Slot_Key (see services/slot_keys.py) parsed
+    once here, so booked-slot checks don't re-parse dates and times.
+    """
+    rows = [dict(appt, Slot_Key=slot_key(appt.get('Appointment_Date'), appt.get('Appointment_Time')))
+            for appt in appointments]
+    return RecordTable.from_records(rows, 'OrderNumber', APPOINTMENT_FIELDNAMES + ['Slot_Key'])
+
+def parse_appointments_snapshot(file_content):
+    """Parse the appointments file into a compact table indexed by order number"""
+    appointments_file_path = app.config.get('APPOINTMENTS_FILE_PATH')
+    return build_appointments_table(parse_appointments_file(file_content, appointments_file_path))
+
+def advance_dock_schedule(previous, table, changes):
+    """on_tail of the appointments log: apply appended changes to the cached dock schedule"""
+    def update(schedule):
+        for old, new in changes:
+            if old is not None:
+                occupy_dock(schedule, old, -1)
+            if new is not None:
+                occupy_dock(schedule, new)
+    dock_schedules.advance(previous, table, update)
+
+# With APPOINTMENTS_APPEND_ONLY, a CSV appointments file is an append-only log
+# of changes; after the first read only newly appended bytes are fetched
+appointments_log = None
+if app.config.get('APPOINTMENTS_APPEND_ONLY'):
+    if not is_excel_file(app.config.get('APPOINTMENTS_FILE_PATH')):
+        appointments_log = AppointmentLog(storage, app.config.get('APPOINTMENTS_FILE_PATH'), 'OrderNumber',
+                                          APPOINTMENT_FIELDNAMES, build_table=build_appointments_table,
+                                          on_tail=advance_dock_schedule)
+    else:
+        print("APPOINTMENTS_APPEND_ONLY ignored: append-only mode needs a CSV appointments file")
+
+# Snapshot parser for the appointments file (the log reads it incrementally itself)
+appointments_parser = appointments_log or parse_appointments_snapshot
+
+def load_orders(max_age=None):
+    """Get the orders snapshot table (read-only, indexed by order number)"""
+    return snapshot_cache.get(app.config.get('ORDERS_FILE_PATH'), parse_orders_snapshot, max_age=max_age)
+
+def lazy(load):
+    """Return a function that calls load() on first use and then returns the same result
+    
+    Handlers pass data they may not need this way, so e.g. a request for an
+    unknown order never downloads the appointments file.
+    """
+    result = []
+    def get():
+        if not result:
+            result.append(load())
+        return result[0]
+    return get
+
+def load_appointments(max_age=None):
+    """Get appointments as a fresh list of dicts (safe for the caller to modify)
+    
+    A missing appointments file is treated as empty; any other failure is
+    raised, since guessing "no appointments" would show booked slots as free.
+    """
+    appointments_file_path = app.config.get('APPOINTMENTS_FILE_PATH')
+    try:
+        return snapshot_cache.get(appointments_file_path, appointments_parser, max_age=max_age).to_records()
+    except StorageFileNotFound:
+        return []
+
+def load_appointments_for_write():
+    """Get the latest appointments and the version they were read at
+    
+    Used by the appointment writer, which saves with If-Match on that
+    version so a concurrent save by another worker is detected, not lost.
+    """
+    appointments_file_path = app.config.get('APPOINTMENTS_FILE_PATH')
+    try:
+        table, version = snapshot_cache.get_latest(appointments_file_path, appointments_parser)
+    except StorageFileNotFound:
+        return [], None
+    return table.to_records(), version
+
+class AppointmentBatch(list):
+    """The appointment writer's working list, with the dock schedule of its rows
+    
+    apply_appointment_mutation() keeps schedule in step with the rows, and
+    after_appointments_commit() caches it as the schedule of the saved snapshot.
+    """
+    schedule = None
+    grid_version = None
+
+def load_appointment_batch():
+    """load() for the appointment writer: load_appointments_for_write() as an AppointmentBatch
+    
+    The batch starts from a copy of the snapshot's cached dock schedule, so
+    checking a mutation doesn't rebuild it from every row.
+    """
+    appointments_file_path = app.config.get('APPOINTMENTS_FILE_PATH')
+    try:
+        table, version = snapshot_cache.get_latest(appointments_file_path, appointments_parser)
+    except StorageFileNotFound:
+        table, version = None, None
+    batch = AppointmentBatch(table.to_records() if table is not None else [])
+    batch.schedule, batch.grid_version = dock_schedules.checkout(table, lambda: batch)
+    return batch, version
+
+def fetch_orders_and_appointments(max_age=None):
+    """Load orders and appointments snapshots, revalidating both concurrently
+    
+    Request latency is the slower of the two downloads instead of their sum.
+    A missing appointments file is treated as empty.
+    """
+    orders_file_path = app.config.get('ORDERS_FILE_PATH')
+    appointments_file_path = app.config.get('APPOINTMENTS_FILE_PATH')
+    
+    results = snapshot_cache.get_many([
+        (orders_file_path, parse_orders_snapshot),
+        (appointments_file_path, appointments_parser)
+    ], max_age=max_age)
+    
+    orders = results[orders_file_path]
+    if isinstance(orders, Exception):
+        raise orders
+    
+    appointments = results[appointments_file_path]
+    if isinstance(appointments, StorageFileNotFound):
+        appointments = []
+    elif isinstance(appointments, Exception):
+        raise appointments
     else:
-        file_bytes = sharepoint_service.records_to_csv_bytes(appointments, fieldnames)
-    sharepoint_service.upload_file_content(file_path, file_bytes)
+        appointments = appointments.to_records()
+    
+    return orders, appointments
+
+def data_freshness(*paths):
+    """Freshness indicator for responses built from snapshots (stale while SharePoint is down)"""
+    paths = paths or (app.config.get('ORDERS_FILE_PATH'), app.config.get('APPOINTMENTS_FILE_PATH'))
+    return snapshot_cache.get_freshness(paths)
+
+def sharepoint_unavailable_response(error):
+    """503 returned immediately while the SharePoint circuit breaker is open"""
+    response = jsonify({
+        'success': False,
+        'message': 'The scheduling system is temporarily unavailable. Please try again in a minute.',
+        'retryAfter': error.retry_after
+    })
+    if error.retry_after:
+        response.headers['Retry-After'] = str(error.retry_after)
+    return response, 503
+
+def preload_snapshots():
+    """Load orders and appointments snapshots up front
+    
+    Called in the gunicorn master (see gunicorn.conf.py) so forked workers
+    start with the snapshots already in memory and share them copy-on-write.
+    """
+    for path, parser in [(app.config.get('ORDERS_FILE_PATH'), parse_orders_snapshot),
+                         (app.config.get('APPOINTMENTS_FILE_PATH'), appointments_parser)]:
+        if not path:
+            continue
+        try:
+            table = snapshot_cache.get(path, parser)
+            print(f"Preloaded {path}: {len(table)} rows, {len(table.buffer)} bytes")
+        except Exception as e:
+            print(f"Could not preload {path}: {e}")
+
+def reset_after_fork():
+    """Give a forked worker its own Graph connections (snapshots stay shared)"""
+    storage.reset_connections()
+    email_service.reset_connections()
+
+def start_background_work():
+    """Start per-process background work once the process will serve requests
+    
+    Called from gunicorn's post_fork, serve_async.py and app.run below; never
+    in the gunicorn master, since threads don't survive fork.
+    """
+    try:
+        appointment_writer.recover()
+    except Exception as e:
+        print(f"Could not replay the write journal: {e}")
+    
+    if app.config.get('ARCHIVE_INTERVAL_HOURS', 6) > 0:
+        archive_job.start()
+    if app.config.get('RECONCILE_INTERVAL_SECONDS', 60) > 0:
+        reconcile_job.start()
+    if app.config.get('WAITLIST_INTERVAL_SECONDS', 10) > 0:
+        waitlist_job.start()
+    if app.config.get('REMINDER_INTERVAL_SECONDS', 60) > 0 and email_service.is_configured:
+        reminder_job.start()
+
+def stop_background_work():
+    """Stop the threads start_background_work() and the first write started (tests, shutdown)"""
+    appointment_writer.stop()
+    for job in (archive_job, reconcile_job, waitlist_job, reminder_job):
+        job.stop()
 
 def generate_time_slots():
     """Generate all available time slots for the next days"""
@@ -125,32 +387,200 @@ def generate_time_slots():
     
     return slots
 
-def get_all_booked_slots(appointments):
-    """Get list of all booked slot times"""
-    booked = []
+def appointment_slot_key(appt):
+    """Slot key of an appointment's start, or None for an incomplete row
     
+    Uses the Slot_Key parsed when the snapshot was loaded; rows created since
+    (e.g. by a mutation in the writer) are parsed here.
+    """
+    key = appt.get('Slot_Key')
+    if key is None or key == '':
+        if not appt.get('Appointment_Date') or not appt.get('Appointment_Time'):
+            return None
+        key = slot_key(appt['Appointment_Date'], appt['Appointment_Time'])
+    return key
+
+def slot_minutes():
+    return app.config.get('TIME_SLOT_INTERVAL_MINUTES', 30)
+
+def normalize_duration(value):
+    """Dock minutes as a whole number of slots, capped at APPOINTMENT_MAX_MINUTES; None if value isn't a duration"""
+    try:
+        minutes = int(float(str(value).strip()))
+    except (TypeError, ValueError):
+        return None
+    if minutes <= 0:
+        return None
+    interval = slot_minutes()
+    minutes = -(-minutes // interval) * interval
+    return max(interval, min(minutes, app.config.get('APPOINTMENT_MAX_MINUTES', 240)))
+
+def order_duration(order):
+    """Dock minutes an order needs: its APPOINTMENT_DURATION_COLUMN value, else one slot"""
+    column = app.config.get('APPOINTMENT_DURATION_COLUMN')
+    return (normalize_duration(order.get(column)) if column else None) or slot_minutes()
+
+def appointment_duration(appt):
+    """Dock minutes booked for an appointment (one slot for rows from before durations)"""
+    return normalize_duration(appt.get('Duration_Minutes')) or slot_minutes()
+
+def iter_booked_intervals(appointments):
+    """Yield (start slot key, duration minutes) for every booked appointment"""
     for appt in appointments:
-        if appt.get('Appointment_Date') and appt.get('Appointment_Time'):
-            try:
-                # Combine date and time
-                date_str = str(appt['Appointment_Date'])
-                time_str = str(appt['Appointment_Time'])
-                
-                # Parse and combine
-                date_part = datetime.strptime(date_str, '%Y-%m-%d')
-                time_part = datetime.strptime(time_str, '%I:%M %p')
-                
-                combined = date_part.replace(
-                    hour=time_part.hour,
-                    minute=time_part.minute
-                )
-                
-                booked.append(combined.isoformat() + 'Z')
-            except:
-                pass
+        key = appointment_slot_key(appt)
+        if key is not None:
+            yield key, appointment_duration(appt)
+
+def build_dock_schedule(appointments):
+    """Dock occupancy of the bookable slots (see services/dock_schedule.py)"""
+    grid = [slot_key_from_iso(slot) for slot in generate_time_slots()]
+    return DockSchedule(grid, slot_capacity.capacity, slot_minutes()).load(iter_booked_intervals(appointments))
+
+def dock_grid_version():
+    """Changes whenever generate_time_slots() does: at each slot start, as that slot drops off"""
+    now = slot_key_from_iso(datetime.utcnow().isoformat(timespec='seconds') + 'Z')
+    return now - now % slot_minutes()
+
+# One dock schedule per appointments snapshot, instead of one per check
+dock_schedules = DockScheduleCache(build=build_dock_schedule, grid_version=dock_grid_version)
+
+def dock_schedule_for(table):
+    """Dock schedule of an appointments snapshot table (None: no file); shared, don't change it"""
+    return dock_schedules.get(table, lambda: table.to_records() if table is not None else [])
+
+def load_dock_schedule():
+    """Dock schedule of the appointments snapshot load_appointments() reads"""
+    try:
+        table = snapshot_cache.get(app.config.get('APPOINTMENTS_FILE_PATH'), appointments_parser)
+    except StorageFileNotFound:
+        table = None
+    return dock_schedule_for(table)
+
+def occupy_dock(schedule, appt, count=1):
+    """Book (count=-1: release) an appointment row's interval in schedule"""
+    key = appointment_slot_key(appt)
+    if key is not None:
+        schedule.add(key, appointment_duration(appt), count)
+
+def get_booked_slot_keys(appointments):
+    """Get the set of slot keys with at least one booking
     
+    Reads the pre-parsed Slot_Key inline rather than through
+    appointment_slot_key(): this runs over every row, and the per-row call
+    was most of its cost.
+    """
+    booked = set()
+    for appt in appointments:
+        key = appt.get('Slot_Key')
+        if key is None or key == '':
+            if not appt.get('Appointment_Date') or not appt.get('Appointment_Time'):
+                continue
+            key = slot_key(appt['Appointment_Date'], appt['Appointment_Time'])
+        if key is not None:
+            booked.add(key)
     return booked
 
+def get_full_slot_keys(schedule):
+    """Get the set of bookable slot keys that can't take another one-slot booking"""
+    return {key for key in schedule.grid if not schedule.fits(key, schedule.interval)}
+
+def get_all_booked_slots(appointments):
+    """Get list of all booked slot times"""
+    return [slot_key_to_iso(key) for key in sorted(get_booked_slot_keys(appointments))]
+
+def check_order(order_number, orders, appointments):
+    """Validate order_number against the orders snapshot and its appointment
+    
+    appointments is called (see lazy()) only once the order exists and is
+    not picked up. Returns (response body, status code) for the validate
+    endpoints.
+    """
+    order = find_order_by_number(orders, order_number)
+    
+    if not order:
+        return {
+            'success': False,
+            'message': 'Order not found or not ready for pickup yet. Please check with staff.'
+        }, 404
+    
+    if not is_order_ready(order):
+        return {
+            'success': False,
+            'message': 'Order is not ready for pickup yet'
+        }, 400
+    
+    # Check if already picked up (its appointment is removed by the reconciler)
+    if is_order_picked_up(order):
+        return {
+            'success': False,
+            'message': 'This order has already been picked up. No appointment needed.'
+        }, 400
+    
+    # Check if already has appointment
+    existing_appt = find_appointment_by_order_number(appointments(), order_number)
+    
+    if existing_appt and existing_appt.get('Appointment_Date') and existing_appt.get('Appointment_Time'):
+        combined_datetime = f"{existing_appt['Appointment_Date']} at {existing_appt['Appointment_Time']}"
+        
+        return {
+            'success': True,
+            'message': f"Order already has an appointment scheduled for {combined_datetime}",
+            'order': {
+                'orderNumber': order['Ready Order Number'],
+                'status': order.get('Pick up Status', 'Ready to Pickup'),
+                'readyDate': order.get('Ready Date', ''),
+                'hasAppointment': True,
+                'appointmentDate': existing_appt['Appointment_Date'],
+                'appointmentTime': existing_appt['Appointment_Time'],
+                'appointmentDateTime': combined_datetime,
+                'durationMinutes': appointment_duration(existing_appt)
+            }
+        }, 200
+    
+    return {
+        'success': True,
+        'message': 'Order validated and ready for scheduling',
+        'order': {
+            'orderNumber': order['Ready Order Number'],
+            'status': order.get('Pick up Status', 'Ready to Pickup'),
+            'readyDate': order.get('Ready Date', ''),
+            'hasAppointment': False,
+            'durationMinutes': order_duration(order)
+        }
+    }, 200
+
+def available_slots_summary(schedule, appointments, duration=None):
+    """Available slots response fields for the given appointments and their dock schedule
+    
+    A slot is available if an appointment of duration minutes (default one
+    slot) starting there has a free bay for its whole length. remaining maps
+    each available slot to the bookings it can still take.
+    """
+    duration = duration or schedule.interval
+    
+    # Filter out full slots
+    remaining = {}
+    for key in schedule.grid:
+        left = schedule.remaining(key, duration)
+        if left > 0:
+            remaining[slot_key_to_iso(key)] = left
+    available_slots = list(remaining)
+    
+    # Bookable days with no time left (customers can join their waitlist)
+    open_days = {slot[:10] for slot in available_slots}
+    full_days = sorted({slot_key_to_iso(key)[:10] for key in schedule.grid} - open_days)
+    
+    return {
+        'slots': available_slots,
+        'remaining': remaining,
+        'fullDays': full_days,
+        'slotMinutes': schedule.interval,
+        'durationMinutes': duration,
+        'totalSlots': len(schedule.grid),
+        'availableCount': len(available_slots),
+        'bookedCount': len(get_booked_slot_keys(appointments))
+    }
+
 def format_date_for_excel(iso_time):
     """Format ISO datetime to date string for Excel"""
     dt = datetime.fromisoformat(iso_time.replace('Z', '+00:00'))
@@ -201,6 +631,404 @@ def combine_date_and_time_to_iso(date_str, time_str):
         print(f"Error combining date and time: {e}, date: {date_str}, time: {time_str}")
         return datetime.now().isoformat() + 'Z'
 
+def is_same_order_number(a, b):
+    """Compare order numbers case-insensitively"""
+    return str(a).strip().upper() == str(b).strip().upper()
+
+def apply_appointment_mutation(appointments, mutation):
+    """Check and apply one appointment mutation to the list in place
+    
+    Runs in the group-commit writer against the latest appointments, so the
+    checks here are authoritative; the handlers' own checks against the
+    snapshot are only an early exit. Raises MutationRejected without
+    modifying the list if the mutation no longer applies.
+    
+    The dock schedule of an AppointmentBatch is updated along with its rows;
+    a plain list gets a schedule built for the call.
+    """
+    op = mutation['op']
+    schedule = getattr(appointments, 'schedule', None) or build_dock_schedule(appointments)
+    
+    if op == 'book':
+        order_number = mutation['orderNumber']
+        slot_time = mutation['slotTime']
+        duration = mutation.get('durationMinutes') or slot_minutes()
+        
+        existing_appt = find_appointment_by_order_number(appointments, order_number)
+        if existing_appt and existing_appt.get('Appointment_Date') and existing_appt.get('Appointment_Time'):
+            raise MutationRejected('Order already has a scheduled appointment', 400)
+        
+        if not schedule.fits(slot_key_from_iso(slot_time), duration):
+            raise MutationRejected('This time slot is no longer available', 409)
+        
+        new_appointment = {
+            'OrderNumber': order_number,
+            'Appointment_Date': format_date_for_excel(slot_time),
+            'Appointment_Time': format_time_for_excel(slot_time),
+            'Customer_Email': mutation['customerEmail'],
+            'Created_Time': mutation['createdTime'],
+            'Duration_Minutes': duration
+        }
+        
+        # Add or update appointment
+        if existing_appt:
+            appointments[:] = [a if not is_same_order_number(a.get('OrderNumber', ''), order_number)
+                               else new_appointment for a in appointments]
+        else:
+            appointments.append(new_appointment)
+        occupy_dock(schedule, new_appointment)
+        return new_appointment
+    
+    if op == 'cancel':
+        for i, appt in enumerate(appointments):
+            if is_same_order_number(appt.get('OrderNumber', ''), mutation['orderNumber']):
+                occupy_dock(schedule, appt, -1)
+                return appointments.pop(i)
+        raise MutationRejected('Appointment not found', 404)
+    
+    if op == 'reschedule':
+        # Moves the appointment to newSlotTime and/or sets its durationMinutes;
+        # either one left out keeps the current value
+        order_number = mutation['orderNumber']
+        
+        appt_index = None
+        for i, appt in enumerate(appointments):
+            if is_same_order_number(appt.get('OrderNumber', ''), order_number):
+                appt_index = i
+                break
+        
+        if appt_index is None:
+            raise MutationRejected('Appointment not found', 404)
+        
+        old_appointment = appointments[appt_index]
+        if mutation.get('newSlotTime'):
+            new_key = slot_key_from_iso(mutation['newSlotTime'])
+        else:
+            new_key = appointment_slot_key(old_appointment)
+        if new_key is None:
+            raise MutationRejected('New slot time is required for an appointment without a time', 400)
+        new_slot_time = slot_key_to_iso(new_key)
+        duration = mutation.get('durationMinutes') or appointment_duration(old_appointment)
+        
+        # Check if the new time is available (excluding current appointment);
+        # admins may also move an appointment outside the bookable slots
+        occupy_dock(schedule, old_appointment, -1)
+        if schedule.on_grid(new_key) and not schedule.fits(new_key, duration):
+            occupy_dock(schedule, old_appointment)
+            raise MutationRejected('The new time slot is not available', 409)
+        
+        appointments[appt_index] = {
+            'OrderNumber': order_number,
+            'Appointment_Date': format_date_for_excel(new_slot_time),
+            'Appointment_Time': format_time_for_excel(new_slot_time),
+            'Customer_Email': old_appointment.get('Customer_Email', ''),
+            'Created_Time': old_appointment.get('Created_Time', mutation['createdTime']),
+            'Duration_Minutes': duration
+        }
+        occupy_dock(schedule, appointments[appt_index])
+        return old_appointment
+    
+    if op == 'remove':
+        # Drop appointments for the given orders (and optionally incomplete rows)
+        order_numbers = {str(n).strip().upper() for n in mutation.get('orderNumbers', [])}
+        drop_incomplete = mutation.get('dropIncomplete', False)
+        
+        def keep(appt):
+            if drop_incomplete and (not appt.get('OrderNumber') or not appt.get('Appointment_Date')
+                                    or not appt.get('Appointment_Time')):
+                return False
+            return str(appt.get('OrderNumber', '')).strip().upper() not in order_numbers
+        
+        kept = [a for a in appointments if keep(a)]
+        removed = len(appointments) - len(kept)
+        if removed == 0:
+            raise MutationRejected('Nothing to remove', 404)
+        for appt in appointments:
+            if not keep(appt):
+                occupy_dock(schedule, appt, -1)
+        appointments[:] = kept
+        return removed
+    
+    if op == 'archive':
+        # Drop bookings already copied to the monthly archives; an order
+        # rescheduled since then no longer matches and stays
+        archived = {tuple(entry) for entry in mutation['entries']}
+        kept = [a for a in appointments if appointment_key(a) not in archived]
+        removed = len(appointments) - len(kept)
+        if removed == 0:
+            raise MutationRejected('Nothing to archive', 404)
+        for appt in appointments:
+            if appointment_key(appt) in archived:
+                occupy_dock(schedule, appt, -1)
+        appointments[:] = kept
+        return removed
+    
+    raise ValueError(f"Unknown appointment mutation: {op}")
+
+# With APPOINTMENTS_EXCEL_TABLE, an .xlsx appointments file on SharePoint is
+# changed row by row through the workbook API instead of being re-uploaded
+appointments_table = None
+if app.config.get('APPOINTMENTS_EXCEL_TABLE'):
+    if storage.name == 'sharepoint' and is_excel_file(app.config.get('APPOINTMENTS_FILE_PATH')):
+        appointments_table = ExcelTableWriter(
+            storage,
+            app.config.get('APPOINTMENTS_FILE_PATH'),
+            app.config.get('APPOINTMENTS_EXCEL_TABLE'),
+            'OrderNumber',
+            APPOINTMENT_FIELDNAMES
+        )
+    else:
+        print("APPOINTMENTS_EXCEL_TABLE ignored: table mode needs an .xlsx appointments file on SharePoint")
+
+def save_appointments(appointments, version):
+    """Save a batch of appointment changes made to the list read at version
+    
+    In append-only mode the changes are appended to the log. In Excel table
+    mode only the changed rows are sent, diffed against the cached snapshot
+    of that version. Otherwise the whole file is uploaded with If-Match.
+    """
+    file_path = app.config.get('APPOINTMENTS_FILE_PATH')
+    if appointments_log is not None:
+        table, new_version = appointments_log.save(appointments, version)
+        snapshot_cache.put(file_path, table, new_version)
+        return
+    
+    if appointments_table is None:
+        save_appointments_file(appointments, file_path, APPOINTMENT_FIELDNAMES, if_match=version, create_only=version is None)
+        return
+    
+    if version is None:
+        raise StorageWriteError(
+            f"Excel table mode needs an existing workbook with table {appointments_table.table_name}",
+            retryable=False
+        )
+    
+    snapshot = snapshot_cache.get_snapshot(file_path)
+    if snapshot is None or snapshot.version != version:
+        raise VersionConflict()
+    
+    new_version = appointments_table.save_changes(snapshot.data.to_records(), appointments, expected_version=version)
+    if new_version is None:
+        # Another edit may have landed with ours; the cache must not pair our
+        # rows with that eTag, so the next read fetches the workbook again
+        snapshot_cache.invalidate(file_path)
+        return
+    snapshot_cache.put(file_path, build_appointments_table(appointments), new_version)
+
+def slot_events_max_streams():
+    """Open slot event streams allowed per process
+    
+    Each stream holds its connection open. In async mode that is cheap, so
+    half of the process's connections may be streams by default. Sync and
+    gthread workers give up a thread per stream: gunicorn.conf.py sets
+    SLOT_EVENTS_MAX_STREAMS to a quarter of a gthread worker's threads, and
+    otherwise streams are off unless it is set.
+    """
+    configured = app.config.get('SLOT_EVENTS_MAX_STREAMS', '')
+    if str(configured).strip():
+        return int(configured)
+    return app.config.get('ASYNC_WORKER_CONNECTIONS', 500) // 2 if is_async_mode() else 0
+
+# Open booking calendars get slot-taken / slot-freed changes pushed to them
+slot_events = SlotEventHub(
+    load_booked=lambda: get_full_slot_keys(load_dock_schedule()),
+    visible_keys=lambda: {slot_key_from_iso(slot) for slot in generate_time_slots()},
+    poll_seconds=app.config.get('SLOT_EVENTS_POLL_SECONDS', 5),
+    max_streams=slot_events_max_streams(),
+    stream_seconds=app.config.get('SLOT_EVENTS_STREAM_SECONDS', 300)
+)
+
+# Free slots kept sorted, for suggesting the nearest free times
+free_slot_index = FreeSlotIndex(grid=lambda: [slot_key_from_iso(slot) for slot in generate_time_slots()])
+
+def find_nearest_free_slots(slot_time, count=3, same_day=False, duration=None):
+    """ISO times of the count free slots closest to slot_time
+    
+    The index is only re-synced when the appointments snapshot changed, so
+    a lookup is a bisect, not a rescan of generate_time_slots(). The index
+    holds slots free for one slot's time; for a longer duration, more
+    candidates are taken from it and checked against the dock schedule.
+    """
+    try:
+        table = snapshot_cache.get(app.config.get('APPOINTMENTS_FILE_PATH'), appointments_parser)
+    except StorageFileNotFound:
+        table = None
+    schedule = dock_schedule_for(table)
+    if not free_slot_index.is_current(table):
+        free_slot_index.update(get_full_slot_keys(schedule), source=table)
+    
+    now = slot_key_from_iso(datetime.utcnow().isoformat(timespec='seconds') + 'Z')
+    key = slot_key_from_iso(slot_time)
+    if not duration or duration <= slot_minutes():
+        keys = free_slot_index.nearest(key, count, same_day=same_day, not_before=now + 1)
+        return [slot_key_to_iso(k) for k in keys]
+    
+    limit = count * 4
+    while True:
+        candidates = free_slot_index.nearest(key, limit, same_day=same_day, not_before=now + 1)
+        fitting = [k for k in candidates if schedule.fits(k, duration)]
+        if len(fitting) >= count or len(candidates) < limit:
+            break
+        limit *= 4
+    closest = sorted(fitting, key=lambda k: abs(k - key))[:count]
+    return [slot_key_to_iso(k) for k in sorted(closest)]
+
+def after_appointments_commit(appointments):
+    """Update caches and push the slot changes to open calendars once a batch is saved"""
+    snapshot = snapshot_cache.get_snapshot(app.config.get('APPOINTMENTS_FILE_PATH'))
+    source = snapshot.data if snapshot else None
+    schedule = getattr(appointments, 'schedule', None)
+    if schedule is not None:
+        dock_schedules.put(schedule, source, appointments.grid_version)
+    else:
+        schedule = build_dock_schedule(appointments)
+    
+    full = get_full_slot_keys(schedule)
+    slot_events.publish(full)
+    free_slot_index.update(full, source=source)
+    
+    # A cancel or reschedule may have freed a slot someone is waiting for;
+    # the check is a no-op when nobody is
+    waitlist_job.trigger()
+
+# Appointment changes arriving close together are written as one upload
+appointment_writer = GroupCommitWriter(
+    load=load_appointment_batch,
+    apply=apply_appointment_mutation,
+    save=save_appointments,
+    window_seconds=app.config.get('WRITE_BATCH_WINDOW_MS', 100) / 1000,
+    ack_timeout=app.config.get('WRITE_ACK_TIMEOUT_SECONDS', 5),
+    retry_deadline=app.config.get('WRITE_RETRY_DEADLINE_SECONDS', 120),
+    status_store=WriteStatusStore(app.config.get('WRITE_STATUS_DIR') or None),
+    check_available=storage.check_available,
+    journal=WriteJournal(app.config.get('WRITE_JOURNAL_DIR')) if app.config.get('WRITE_JOURNAL_DIR') else None,
+    after_commit=after_appointments_commit
+)
+
+# Past appointments are moved to monthly archive files so the hot file stays small
+appointment_archiver = AppointmentArchiver(
+    storage,
+    load=lambda: load_appointments_for_write()[0],
+    remove=lambda entries: appointment_writer.submit({'op': 'archive', 'entries': entries}),
+    archive_dir=app.config.get('ARCHIVE_DIR') or posixpath.join(
+        posixpath.dirname(app.config.get('APPOINTMENTS_FILE_PATH')), 'archive'),
+    fieldnames=APPOINTMENT_FIELDNAMES,
+    keep_days=app.config.get('ARCHIVE_AFTER_DAYS', 30)
+)
+archive_job = PeriodicJob('archiver', appointment_archiver.run_once,
+                          interval_seconds=app.config.get('ARCHIVE_INTERVAL_HOURS', 6) * 3600)
+
+# Appointments of picked-up orders are removed in the background, in one
+# batched write per change of the orders file, instead of by page loads
+order_reconciler = OrderReconciler(
+    load_orders=lambda: snapshot_cache.get_latest(app.config.get('ORDERS_FILE_PATH'), parse_orders_snapshot),
+    load_appointments=load_appointments_for_write,
+    remove=lambda order_numbers, drop_incomplete: appointment_writer.submit({
+        'op': 'remove',
+        'orderNumbers': order_numbers,
+        'dropIncomplete': drop_incomplete
+    }),
+    is_picked_up=is_order_picked_up
+)
+reconcile_job = PeriodicJob('reconciler', order_reconciler.run_once,
+                            interval_seconds=app.config.get('RECONCILE_INTERVAL_SECONDS', 60))
+
+# Orders waiting for a fully booked day are booked into slots freed there
+waitlist = Waitlist(app.config.get('WAITLIST_FILE') or None)
+
+def is_order_bookable(order_number):
+    order = find_order_by_number(load_orders(), order_number)
+    return bool(order) and is_order_ready(order) and not is_order_picked_up(order)
+
+def send_waitlist_promotion(entry, slot_time):
+    email_result = email_service.send_waitlist_promotion_email(entry['orderNumber'], slot_time, entry['customerEmail'],
+                                                                duration_minutes=entry['durationMinutes'])
+    if not email_result.get('success'):
+        print(f"Failed to send waitlist email: {email_result.get('message')}")
+
+waitlist_promoter = WaitlistPromoter(
+    waitlist,
+    load_appointments=load_appointments_for_write,
+    build_schedule=build_dock_schedule,
+    is_bookable=is_order_bookable,
+    book=lambda entry, slot_time: appointment_writer.submit({
+        'op': 'book',
+        'orderNumber': entry['orderNumber'],
+        'slotTime': slot_time,
+        'customerEmail': entry['customerEmail'],
+        'createdTime': datetime.now().isoformat(),
+        'durationMinutes': entry['durationMinutes']
+    }),
+    notify=send_waitlist_promotion
+)
+waitlist_job = PeriodicJob('waitlist', waitlist_promoter.run_once,
+                           interval_seconds=app.config.get('WAITLIST_INTERVAL_SECONDS', 10))
+
+# Reminder emails go out the day before and the morning of each appointment
+def reminder_send_times():
+    """(kind, days before, minute of day) of each configured reminder, in the order they go out"""
+    send_times = []
+    for kind, days_before, setting in (('dayBefore', 1, 'REMINDER_DAY_BEFORE_TIME'),
+                                       ('morningOf', 0, 'REMINDER_MORNING_OF_TIME')):
+        value = app.config.get(setting)
+        if not value:
+            continue
+        minute = slot_key('1970-01-01', value)
+        if minute is None or not 0 <= minute < 1440:
+            print(f"Ignoring {setting}={value!r}: not a time of day")
+            continue
+        send_times.append((kind, days_before, minute))
+    return send_times
+
+def send_reminder(kind, order_number, start, customer_email):
+    return email_service.send_reminder_email(order_number, slot_key_to_iso(start), customer_email,
+                                             same_day=kind == 'morningOf')
+
+reminder_scheduler = ReminderScheduler(
+    load_appointments=load_appointments_for_write,
+    describe=lambda appt: (appt.get('OrderNumber'), appointment_slot_key(appt), appt.get('Customer_Email')),
+    send=send_reminder,
+    send_times=reminder_send_times(),
+    path=app.config.get('REMINDER_STATE_FILE') or None,
+    max_per_minute=app.config.get('REMINDER_MAX_PER_MINUTE', 20)
+)
+reminder_job = PeriodicJob('reminders', reminder_scheduler.run_once,
+                           interval_seconds=app.config.get('REMINDER_INTERVAL_SECONDS', 60))
+
+def waitlist_entry_response(entry, position):
+    return {
+        'orderNumber': entry['orderNumber'],
+        'date': entry['date'],
+        'position': position,
+        'durationMinutes': entry['durationMinutes'],
+        'requestedAt': datetime.utcfromtimestamp(entry['requestedAt']).isoformat(timespec='seconds') + 'Z'
+    }
+
+def slot_taken_response(message, slot_time, duration=None):
+    """409 for a slot that can't be booked, suggesting the nearest free slots instead"""
+    try:
+        suggestions = find_nearest_free_slots(slot_time, duration=duration)
+    except Exception as e:
+        print(f"Could not suggest slots near {slot_time}: {e}")
+        suggestions = []
+    
+    return jsonify({
+        'success': False,
+        'message': message,
+        'suggestions': suggestions
+    }), 409
+
+def write_pending_response(pending, message, **extra):
+    """202 response for a write still retrying in the background"""
+    return jsonify(dict(
+        extra,
+        success=True,
+        pending=True,
+        message=message,
+        writeId=pending.write_id,
+        statusUrl=f"/api/appointments/writes/{pending.write_id}"
+    )), 202
+
 # Static file serving
 @app.route('/')
 def serve_index():
@@ -216,7 +1044,45 @@ def health_check():
     return jsonify({
         'status': 'OK',
         'message': 'Server is running',
-        'version': '1.0.1'
+        'version': '1.0.1',
+        'serverMode': 'async' if is_async_mode() else 'sync',
+        'storage': storage.get_stats(),
+        'writer': appointment_writer.get_stats(),
+        'excelTable': appointments_table.get_stats() if appointments_table else None,
+        'appointmentLog': appointments_log.get_stats() if appointments_log else None,
+        'archiver': dict(appointment_archiver.get_stats(), **archive_job.get_stats()),
+        'reconciler': dict(order_reconciler.get_stats(), **reconcile_job.get_stats()),
+        'waitlist': dict(waitlist_promoter.get_stats(), **waitlist_job.get_stats()),
+        'reminders': dict(reminder_scheduler.get_stats(), **reminder_job.get_stats()),
+        'slotEvents': slot_events.get_stats(),
+        'freeSlots': free_slot_index.get_stats(),
+        'dockSchedule': dock_schedules.get_stats(),
+        'slotCapacity': slot_capacity.get_stats(),
+        'circuit': storage.breaker.get_stats() if storage.breaker else None,
+        'freshness': data_freshness()
+    })
+
+# Outcome of a write that answered 202 (still retrying in the background)
+@app.route('/api/appointments/writes/<write_id>', methods=['GET'])
+def get_write_status(write_id):
+    status = appointment_writer.get_status(write_id)
+    if status is None:
+        return jsonify({
+            'success': False,
+            'message': 'Unknown or expired write id'
+        }), 404
+    
+    messages = {
+        'pending': 'Still saving',
+        'committed': 'Saved successfully',
+        'failed': status.get('message') or 'Could not save the change'
+    }
+    return jsonify({
+        'success': status['status'] != 'failed',
+        'writeId': write_id,
+        'status': status['status'],
+        'message': messages.get(status['status'], ''),
+        'statusCode': status.get('statusCode')
     })
 
 # Admin authentication endpoint
@@ -263,93 +1129,51 @@ def validate_order():
                 'message': 'Order number is required'
             }), 400
         
-        # Fetch and parse orders file
-        orders_file_path = app.config.get('ORDERS_FILE_PATH')
-        orders_content = sharepoint_service.get_file_content(orders_file_path)
-        
-        if orders_file_path.endswith('.xlsx') or orders_file_path.endswith('.xls'):
-            orders = sharepoint_service.parse_excel_file(orders_content)
-        else:
-            orders = sharepoint_service.parse_csv_file(orders_content)
-        
-        # Fetch appointments file
-        appointments_file_path = app.config.get('APPOINTMENTS_FILE_PATH')
-        try:
-            appts_content = sharepoint_service.get_file_content(appointments_file_path)
-            appointments = parse_appointments_file(appts_content, appointments_file_path)
-        except:
-            appointments = []
-        
-        # Find order
-        order = find_order_by_number(orders, order_number)
-        
-        if not order:
-            return jsonify({
-                'success': False,
-                'message': 'Order not found or not ready for pickup yet. Please check with staff.'
-            }), 404
-        
-        if not is_order_ready(order):
-            return jsonify({
-                'success': False,
-                'message': 'Order is not ready for pickup yet'
-            }), 400
-        
-        # Check if already picked up
-        storage_fee_status = str(order.get('Storage Fee Start From', '')).strip().lower()
-        pickup_status = str(order.get('Pick up Status', '')).strip().lower()
+        # The appointments snapshot is only loaded for a bookable order
+        body, status = check_order(order_number, load_orders(), lazy(load_appointments))
+        if status == 200:
+            body['freshness'] = data_freshness()
+        return jsonify(body), status
         
-        is_picked_up = storage_fee_status == 'picked up' or pickup_status == 'fulfilled'
+    except SharePointUnavailable as e:
+        return sharepoint_unavailable_response(e)
+    except Exception as e:
+        print(f'Error validating order: {e}')
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'message': 'Server error while validating order',
+            'error': str(e)
+        }), 500
+
+# Endpoint 1b: Validate Order and Get Available Slots
+@app.route('/api/validate-order-with-slots', methods=['POST'])
+def validate_order_with_slots():
+    """Validate the order and, if it can be booked, return the available slots
+    
+    Both come from the same orders and appointments snapshots, so the first
+    booking step costs one round-trip and one appointments download.
+    """
+    try:
+        data = request.get_json()
+        order_number = data.get('orderNumber')
         
-        if is_picked_up:
-            # Remove appointment if exists
-            existing_appt = find_appointment_by_order_number(appointments, order_number)
-            if existing_appt:
-                appointments = [a for a in appointments 
-                               if str(a.get('OrderNumber', '')).strip().upper() != str(order_number).strip().upper()]
-                appointments_file_path = app.config.get('APPOINTMENTS_FILE_PATH')
-                save_appointments_file(
-                    appointments,
-                    appointments_file_path,
-                    ['OrderNumber', 'Appointment_Date', 'Appointment_Time', 'Customer_Email', 'Created_Time']
-                )
-            
+        if not order_number:
             return jsonify({
                 'success': False,
-                'message': 'This order has already been picked up. No appointment needed.'
+                'message': 'Order number is required'
             }), 400
         
-        # Check if already has appointment
-        existing_appt = find_appointment_by_order_number(appointments, order_number)
-        
-        if existing_appt and existing_appt.get('Appointment_Date') and existing_appt.get('Appointment_Time'):
-            combined_datetime = f"{existing_appt['Appointment_Date']} at {existing_appt['Appointment_Time']}"
-            
-            return jsonify({
-                'success': True,
-                'message': f"Order already has an appointment scheduled for {combined_datetime}",
-                'order': {
-                    'orderNumber': order['Ready Order Number'],
-                    'status': order.get('Pick up Status', 'Ready to Pickup'),
-                    'readyDate': order.get('Ready Date', ''),
-                    'hasAppointment': True,
-                    'appointmentDate': existing_appt['Appointment_Date'],
-                    'appointmentTime': existing_appt['Appointment_Time'],
-                    'appointmentDateTime': combined_datetime
-                }
-            })
-        
-        return jsonify({
-            'success': True,
-            'message': 'Order validated and ready for scheduling',
-            'order': {
-                'orderNumber': order['Ready Order Number'],
-                'status': order.get('Pick up Status', 'Ready to Pickup'),
-                'readyDate': order.get('Ready Date', ''),
-                'hasAppointment': False
-            }
-        })
+        appointments = lazy(load_appointments)
+        body, status = check_order(order_number, load_orders(), appointments)
+        if status == 200:
+            if not body['order']['hasAppointment']:
+                body.update(available_slots_summary(load_dock_schedule(), appointments(), body['order']['durationMinutes']))
+            body['freshness'] = data_freshness()
+        return jsonify(body), status
         
+    except SharePointUnavailable as e:
+        return sharepoint_unavailable_response(e)
     except Exception as e:
         print(f'Error validating order: {e}')
         traceback.print_exc()
@@ -363,36 +1187,81 @@ def validate_order():
 @app.route('/api/available-slots', methods=['GET'])
 def get_available_slots():
     try:
-        # Generate all possible time slots
-        all_slots = generate_time_slots()
-        
-        # Fetch appointments to get booked slots
-        appointments_file_path = app.config.get('APPOINTMENTS_FILE_PATH')
-        try:
-            appts_content = sharepoint_service.get_file_content(appointments_file_path)
-            appointments = parse_appointments_file(appts_content, appointments_file_path)
-        except:
-            appointments = []
+        # Load appointments snapshot to get booked slots
+        appointments = load_appointments()
         
-        booked_slots = get_all_booked_slots(appointments)
-        
-        # Filter out booked slots
-        available_slots = [slot for slot in all_slots if slot not in booked_slots]
+        # durationMinutes: only list slots with room for an appointment this long
+        body = {'success': True}
+        body.update(available_slots_summary(load_dock_schedule(), appointments,
+                                            normalize_duration(request.args.get('durationMinutes'))))
+        body['freshness'] = data_freshness(app.config.get('APPOINTMENTS_FILE_PATH'))
+        return jsonify(body)
         
+    except SharePointUnavailable as e:
+        return sharepoint_unavailable_response(e)
+    except Exception as e:
+        print(f'Error fetching available slots: {e}')
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'message': 'Server error while fetching available slots',
+            'error': str(e)
+        }), 500
+
+# Endpoint 2b: Live Slot Changes (server-sent events)
+@app.route('/api/slot-events', methods=['GET'])
+def get_slot_events():
+    """Stream slot-taken / slot-freed changes to an open booking calendar"""
+    subscriber = slot_events.subscribe()
+    if subscriber is None:
+        return jsonify({
+            'success': False,
+            'message': 'Live slot updates are not available right now'
+        }), 503
+    
+    return Response(slot_events.stream(subscriber), mimetype='text/event-stream', headers={
+        'Cache-Control': 'no-cache',
+        'X-Accel-Buffering': 'no'  # Don't let a reverse proxy hold events back
+    })
+
+# Endpoint 2c: Nearest Free Slots
+@app.route('/api/nearest-slots', methods=['GET'])
+def get_nearest_slots():
+    """Return the free slots closest to slotTime (count, default 3; sameDay=true for that day only)
+    
+    durationMinutes limits them to slots with room for an appointment that long.
+    """
+    slot_time = request.args.get('slotTime', '')
+    same_day = request.args.get('sameDay', '').lower() == 'true'
+    duration = normalize_duration(request.args.get('durationMinutes'))
+    
+    try:
+        count = int(request.args.get('count', 3))
+        slot_key_from_iso(slot_time)
+    except ValueError:
+        count = 0
+    if not 1 <= count <= 20:
+        return jsonify({
+            'success': False,
+            'message': 'slotTime must be an ISO time (e.g. 2025-11-13T14:30:00Z) and count between 1 and 20'
+        }), 400
+    
+    try:
         return jsonify({
             'success': True,
-            'slots': available_slots,
-            'totalSlots': len(all_slots),
-            'availableCount': len(available_slots),
-            'bookedCount': len(booked_slots)
+            'slotTime': slot_time,
+            'slots': find_nearest_free_slots(slot_time, count, same_day, duration),
+            'freshness': data_freshness(app.config.get('APPOINTMENTS_FILE_PATH'))
         })
         
+    except SharePointUnavailable as e:
+        return sharepoint_unavailable_response(e)
     except Exception as e:
-        print(f'Error fetching available slots: {e}')
+        print(f'Error finding nearest slots: {e}')
         traceback.print_exc()
         return jsonify({
             'success': False,
-            'message': 'Server error while fetching available slots',
+            'message': 'Server error while finding nearest slots',
             'error': str(e)
         }), 500
 
@@ -422,31 +1291,13 @@ def book_appointment():
         
         # Lock the slot
         if not lock_slot(order_number, slot_time):
-            return jsonify({
-                'success': False,
-                'message': 'This time slot is currently being booked by another customer'
-            }), 409
+            return slot_taken_response('This time slot is currently being booked by another customer', slot_time)
         
         try:
-            # Fetch orders
-            orders_file_path = app.config.get('ORDERS_FILE_PATH')
-            orders_content = sharepoint_service.get_file_content(orders_file_path)
-            
-            if orders_file_path.endswith('.xlsx') or orders_file_path.endswith('.xls'):
-                orders = sharepoint_service.parse_excel_file(orders_content)
-            else:
-                orders = sharepoint_service.parse_csv_file(orders_content)
-            
-            # Fetch appointments
-            appointments_file_path = app.config.get('APPOINTMENTS_FILE_PATH')
-            try:
-                appts_content = sharepoint_service.get_file_content(appointments_file_path)
-                appointments = parse_appointments_file(appts_content, appointments_file_path)
-            except:
-                appointments = []
-            
-            # Find order
-            order = find_order_by_number(orders, order_number)
+            # Check the order first; the appointments snapshot is only loaded
+            # for a bookable order (the writer re-checks against the latest
+            # appointments before saving)
+            order = find_order_by_number(load_orders(), order_number)
             
             if not order:
                 unlock_slot(order_number, slot_time)
@@ -463,18 +1314,15 @@ def book_appointment():
                 }), 400
             
             # Check if picked up
-            storage_fee_status = str(order.get('Storage Fee Start From', '')).strip().lower()
-            pickup_status = str(order.get('Pick up Status', '')).strip().lower()
-            
-            is_picked_up = storage_fee_status == 'picked up' or pickup_status == 'fulfilled'
-            
-            if is_picked_up:
+            if is_order_picked_up(order):
                 unlock_slot(order_number, slot_time)
                 return jsonify({
                     'success': False,
                     'message': 'This order has already been picked up. No appointment needed.'
                 }), 400
             
+            appointments = load_appointments()
+            
             # Check existing appointment
             existing_appt = find_appointment_by_order_number(appointments, order_number)
             
@@ -486,59 +1334,68 @@ def book_appointment():
                     'existingAppointment': f"{existing_appt['Appointment_Date']} at {existing_appt['Appointment_Time']}"
                 }), 400
             
-            # Check if slot is still available
-            booked_slots = get_all_booked_slots(appointments)
-            if slot_time in booked_slots:
+            # Check if the dock is free for the order's whole appointment
+            duration = order_duration(order)
+            if not load_dock_schedule().fits(slot_key_from_iso(slot_time), duration):
                 unlock_slot(order_number, slot_time)
-                return jsonify({
-                    'success': False,
-                    'message': 'This time slot is no longer available'
-                }), 409
+                return slot_taken_response('This time slot is no longer available', slot_time, duration)
             
-            # Create new appointment
-            new_appointment = {
-                'OrderNumber': order_number,
-                'Appointment_Date': format_date_for_excel(slot_time),
-                'Appointment_Time': format_time_for_excel(slot_time),
-                'Customer_Email': customer_email,
-                'Created_Time': datetime.now().isoformat()
+            appointment = {
+                'orderNumber': order['Ready Order Number'],
+                'pickupTime': slot_time,
+                'durationMinutes': duration
             }
             
-            # Add or update appointment
-            if existing_appt:
-                appointments = [a if str(a.get('OrderNumber', '')).strip().upper() != str(order_number).strip().upper() 
-                               else new_appointment for a in appointments]
-            else:
-                appointments.append(new_appointment)
+            def send_confirmation(_=None):
+                email_result = email_service.send_confirmation_email(
+                    order_number,
+                    slot_time,
+                    customer_email,
+                    duration_minutes=duration
+                )
+                
+                if not email_result.get('success'):
+                    print(f"Failed to send confirmation email: {email_result.get('message')}")
             
-            # Save appointments
-            appointments_file_path = app.config.get('APPOINTMENTS_FILE_PATH')
-            save_appointments_file(
-                appointments,
-                appointments_file_path,
-                ['OrderNumber', 'Appointment_Date', 'Appointment_Time', 'Customer_Email', 'Created_Time']
-            )
+            # Save appointment (batched with other bookings arriving at the same time)
+            try:
+                appointment_writer.submit({
+                    'op': 'book',
+                    'orderNumber': order_number,
+                    'slotTime': slot_time,
+                    'customerEmail': customer_email,
+                    'createdTime': datetime.now().isoformat(),
+                    'durationMinutes': duration
+                })
+            except MutationRejected as e:
+                unlock_slot(order_number, slot_time)
+                if e.status_code == 409:
+                    return slot_taken_response(e.message, slot_time, duration)
+                return jsonify({
+                    'success': False,
+                    'message': e.message
+                }), e.status_code
+            except WritePending as pending:
+                # SharePoint file is locked; keep the slot locked and send the
+                # email once the background retry lands
+                pending.future.add_done_callback(lambda _: unlock_slot(order_number, slot_time))
+                pending.on_commit(send_confirmation)
+                return write_pending_response(
+                    pending,
+                    'Your booking is being saved. This can take a moment while the schedule file is in use.',
+                    appointment=appointment
+                )
             
             # Unlock slot
             unlock_slot(order_number, slot_time)
             
             # Send confirmation email
-            email_result = email_service.send_confirmation_email(
-                order_number,
-                slot_time,
-                customer_email
-            )
-            
-            if not email_result.get('success'):
-                print(f"Failed to send confirmation email: {email_result.get('message')}")
+            send_confirmation()
             
             return jsonify({
                 'success': True,
                 'message': 'Appointment booked successfully',
-                'appointment': {
-                    'orderNumber': order['Ready Order Number'],
-                    'pickupTime': slot_time
-                }
+                'appointment': appointment
             })
             
         except Exception as e:
@@ -546,6 +1403,8 @@ def book_appointment():
                 unlock_slot(order_number, slot_time)
             raise
         
+    except SharePointUnavailable as e:
+        return sharepoint_unavailable_response(e)
     except Exception as e:
         print(f'Error booking appointment: {e}')
         traceback.print_exc()
@@ -555,73 +1414,143 @@ def book_appointment():
             'error': str(e)
         }), 500
 
+# Endpoint 4: Join the Waitlist of a Fully Booked Day
+@app.route('/api/waitlist', methods=['POST'])
+def join_waitlist():
+    """Put an order on the waitlist of a bookable day with no time left for it
+    
+    When a time frees up that day, the order that has waited longest is
+    booked into it in the background and emailed (services/waitlist_promoter.py).
+    """
+    try:
+        data = request.get_json()
+        order_number = data.get('orderNumber')
+        date = str(data.get('date') or '')
+        customer_email = data.get('customerEmail')
+        
+        if not order_number or not date or not customer_email:
+            return jsonify({
+                'success': False,
+                'message': 'Order number, date and email address are required'
+            }), 400
+        
+        appointments = lazy(load_appointments)
+        body, status = check_order(order_number, load_orders(), appointments)
+        if status != 200:
+            return jsonify(body), status
+        order = body['order']
+        if order['hasAppointment']:
+            return jsonify({
+                'success': False,
+                'message': 'Order already has a scheduled appointment'
+            }), 400
+        
+        if date not in {slot[:10] for slot in generate_time_slots()}:
+            return jsonify({
+                'success': False,
+                'message': 'Please choose a day within the booking window'
+            }), 400
+        
+        day_start = slot_key_from_iso(f"{date}T00:00:00Z")
+        schedule = load_dock_schedule()
+        if schedule.first_fit(day_start, day_start + 1440, order['durationMinutes']) is not None:
+            return jsonify({
+                'success': False,
+                'message': 'This day still has available times. Please book one of them.'
+            }), 409
+        
+        entry, position = waitlist.join({
+            'orderNumber': order['orderNumber'],
+            'date': date,
+            'customerEmail': customer_email,
+            'durationMinutes': order['durationMinutes']
+        })
+        return jsonify({
+            'success': True,
+            'message': f"You are number {position} on the waitlist for {date}. "
+                       "If a time frees up, we will book it for you and email you.",
+            'waitlist': waitlist_entry_response(entry, position)
+        })
+        
+    except SharePointUnavailable as e:
+        return sharepoint_unavailable_response(e)
+    except Exception as e:
+        print(f'Error joining waitlist: {e}')
+        traceback.print_exc()
+        return jsonify({
+            'success': False,
+            'message': 'Server error while joining the waitlist',
+            'error': str(e)
+        }), 500
+
+# Endpoint 4b: Waitlist Position of an Order
+@app.route('/api/waitlist/<order_number>', methods=['GET'])
+def get_waitlist_entry(order_number):
+    entry, position = waitlist.get(order_number)
+    if entry is None:
+        return jsonify({
+            'success': False,
+            'message': 'Order is not on the waitlist'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'waitlist': waitlist_entry_response(entry, position)
+    })
+
+# Endpoint 4c: Leave the Waitlist
+@app.route('/api/waitlist/<order_number>', methods=['DELETE'])
+def leave_waitlist(order_number):
+    if waitlist.leave(order_number) is None:
+        return jsonify({
+            'success': False,
+            'message': 'Order is not on the waitlist'
+        }), 404
+    
+    return jsonify({
+        'success': True,
+        'message': 'Order removed from the waitlist'
+    })
+
 # Admin Endpoint 1: Get All Appointments
 @app.route('/api/admin/appointments', methods=['GET'])
 def get_admin_appointments():
     try:
-        # Fetch orders
-        orders_file_path = app.config.get('ORDERS_FILE_PATH')
-        orders_content = sharepoint_service.get_file_content(orders_file_path)
+        # Load orders and appointments snapshots in parallel
+        orders, appointments = fetch_orders_and_appointments()
         
-        if orders_file_path.endswith('.xlsx') or orders_file_path.endswith('.xls'):
-            orders = sharepoint_service.parse_excel_file(orders_content)
-        else:
-            orders = sharepoint_service.parse_csv_file(orders_content)
-        
-        # Fetch appointments
-        appointments_file_path = app.config.get('APPOINTMENTS_FILE_PATH')
-        try:
-            appts_content = sharepoint_service.get_file_content(appointments_file_path)
-            appointments = parse_appointments_file(appts_content, appointments_file_path)
-        except:
-            appointments = []
-        
-        # Clean up appointments
-        needs_update = False
+        # Hide appointments of picked-up orders and incomplete rows; the
+        # reconciler removes them from the file in the background
         cleaned_appointments = []
-        
         for appt in appointments:
             if not appt.get('OrderNumber') or not appt.get('Appointment_Date') or not appt.get('Appointment_Time'):
-                needs_update = True
                 continue
             
-            # Check if picked up
             order = find_order_by_number(orders, appt['OrderNumber'])
-            
-            if order and order.get('Pick up Status'):
-                pickup_status = str(order['Pick up Status']).strip().lower()
-                if pickup_status == 'fulfilled':
-                    print(f"Removing appointment for order {appt['OrderNumber']} - already picked up")
-                    needs_update = True
-                    continue
+            if order and is_order_picked_up(order):
+                continue
             
             cleaned_appointments.append(appt)
         
-        # Update if needed
-        if needs_update:
-            print(f"Updating appointments file: removed {len(appointments) - len(cleaned_appointments)} fulfilled orders")
-            appointments_file_path = app.config.get('APPOINTMENTS_FILE_PATH')
-            save_appointments_file(
-                cleaned_appointments,
-                appointments_file_path,
-                ['OrderNumber', 'Appointment_Date', 'Appointment_Time', 'Customer_Email', 'Created_Time']
-            )
-        
         # Format response
         valid_appointments = [{
             'orderNumber': appt.get('OrderNumber', ''),
             'appointmentDate': appt.get('Appointment_Date', ''),
             'appointmentTime': appt.get('Appointment_Time', ''),
             'customerEmail': appt.get('Customer_Email', ''),
-            'createdTime': appt.get('Created_Time', '')
+            'createdTime': appt.get('Created_Time', ''),
+            'durationMinutes': appointment_duration(appt)
         } for appt in cleaned_appointments]
         
         return jsonify({
             'success': True,
             'appointments': valid_appointments,
-            'count': len(valid_appointments)
+            'count': len(valid_appointments),
+            'freshness': data_freshness()
         })
         
+    except SharePointUnavailable as e:
+        return sharepoint_unavailable_response(e)
     except Exception as e:
         print(f'Error fetching appointments: {e}')
         traceback.print_exc()
@@ -631,6 +1560,57 @@ def get_admin_appointments():
             'error': str(e)
         }), 500
 
+# Admin Endpoint: Archived (past) appointments of one month, read only on request
+@app.route('/api/admin/appointments/archive', methods=['GET'])
+def get_archived_appointments():
+    month = request.args.get('month', '')
+    try:
+        archived = appointment_archiver.get_month(month)
+    except ValueError as e:
+        return jsonify({
+            'success': False,
+            'message': str(e)
+        }), 400
+    except SharePointUnavailable as e:
+        return sharepoint_unavailable_response(e)
+    except Exception as e:
+        print(f'Error fetching archived appointments: {e}')
+        return jsonify({
+            'success': False,
+            'message': 'Server error while fetching archived appointments',
+            'error': str(e)
+        }), 500
+    
+    appointments = [{
+        'orderNumber': str(appt.get('OrderNumber', '')),
+        'appointmentDate': str(appt.get('Appointment_Date', '')),
+        'appointmentTime': str(appt.get('Appointment_Time', '')),
+        'customerEmail': appt.get('Customer_Email', ''),
+        'createdTime': appt.get('Created_Time', '')
+    } for appt in archived]
+    
+    return jsonify({
+        'success': True,
+        'month': month,
+        'appointments': appointments,
+        'count': len(appointments)
+    })
+
+# Admin Endpoint: Waitlists of fully booked days, head of each queue first
+@app.route('/api/admin/waitlist', methods=['GET'])
+def get_admin_waitlist():
+    days = [{
+        'date': date,
+        'entries': [dict(waitlist_entry_response(entry, position), customerEmail=entry['customerEmail'])
+                    for position, entry in enumerate(waitlist.waiting(date), 1)]
+    } for date in waitlist.days()]
+    
+    return jsonify({
+        'success': True,
+        'days': days,
+        'count': sum(len(day['entries']) for day in days)
+    })
+
 # Admin Endpoint 2: Cancel Appointment
 @app.route('/api/admin/appointments/<order_number>', methods=['DELETE'])
 def cancel_appointment(order_number):
@@ -641,63 +1621,48 @@ def cancel_appointment(order_number):
                 'message': 'Order number is required'
             }), 400
         
-        # Fetch appointments
-        try:
-            appointments_file_path = app.config.get('APPOINTMENTS_FILE_PATH')
-            appts_content = sharepoint_service.get_file_content(appointments_file_path)
-            appointments = parse_appointments_file(appts_content, appointments_file_path)
-        except:
-            appointments = []
-        
-        # Find appointment
-        cancelled_appt = None
-        new_appointments = []
-        
-        for appt in appointments:
-            if str(appt.get('OrderNumber', '')).strip().upper() == str(order_number).strip().upper():
-                cancelled_appt = appt
-            else:
-                new_appointments.append(appt)
+        def send_cancellation(cancelled_appt):
+            customer_email = cancelled_appt.get('Customer_Email', '')
+            if customer_email:
+                try:
+                    # Reconstruct ISO datetime from date and time
+                    appt_date = cancelled_appt.get('Appointment_Date', '')
+                    appt_time = cancelled_appt.get('Appointment_Time', '')
+                    original_iso_time = combine_date_and_time_to_iso(appt_date, appt_time)
+                    
+                    email_result = email_service.send_cancellation_email(
+                        order_number,
+                        original_iso_time,
+                        customer_email
+                    )
+                    
+                    if not email_result.get('success'):
+                        print(f"Failed to send cancellation email: {email_result.get('message')}")
+                except Exception as e:
+                    print(f"Error sending cancellation email: {e}")
         
-        if not cancelled_appt:
+        # Remove appointment (batched with other changes arriving at the same time)
+        try:
+            cancelled_appt = appointment_writer.submit({'op': 'cancel', 'orderNumber': order_number})
+        except MutationRejected as e:
             return jsonify({
                 'success': False,
-                'message': 'Appointment not found'
-            }), 404
-        
-        # Update file
-        appointments_file_path = app.config.get('APPOINTMENTS_FILE_PATH')
-        save_appointments_file(
-            new_appointments,
-            appointments_file_path,
-            ['OrderNumber', 'Appointment_Date', 'Appointment_Time', 'Customer_Email', 'Created_Time']
-        )
+                'message': e.message
+            }), e.status_code
+        except WritePending as pending:
+            pending.on_commit(send_cancellation)
+            return write_pending_response(pending, 'Cancellation is being saved (appointments file is in use)')
         
         # Send cancellation email
-        customer_email = cancelled_appt.get('Customer_Email', '')
-        if customer_email:
-            try:
-                # Reconstruct ISO datetime from date and time
-                appt_date = cancelled_appt.get('Appointment_Date', '')
-                appt_time = cancelled_appt.get('Appointment_Time', '')
-                original_iso_time = combine_date_and_time_to_iso(appt_date, appt_time)
-                
-                email_result = email_service.send_cancellation_email(
-                    order_number,
-                    original_iso_time,
-                    customer_email
-                )
-                
-                if not email_result.get('success'):
-                    print(f"Failed to send cancellation email: {email_result.get('message')}")
-            except Exception as e:
-                print(f"Error sending cancellation email: {e}")
+        send_cancellation(cancelled_appt)
         
         return jsonify({
             'success': True,
             'message': 'Appointment cancelled successfully'
         })
         
+    except SharePointUnavailable as e:
+        return sharepoint_unavailable_response(e)
     except Exception as e:
         print(f'Error cancelling appointment: {e}')
         traceback.print_exc()
@@ -714,93 +1679,86 @@ def reschedule_appointment(order_number):
         data = request.get_json()
         new_slot_time = data.get('newSlotTime')
         
-        if not order_number or not new_slot_time:
+        # durationMinutes sets how long the appointment holds the dock; with
+        # it, newSlotTime may be left out to keep the current time
+        duration = None
+        if data.get('durationMinutes') not in (None, ''):
+            duration = normalize_duration(data['durationMinutes'])
+            if duration is None:
+                return jsonify({
+                    'success': False,
+                    'message': 'durationMinutes must be a positive number of minutes'
+                }), 400
+        
+        if not order_number or not (new_slot_time or duration):
             return jsonify({
                 'success': False,
                 'message': 'Order number and new slot time are required'
             }), 400
         
-        # Fetch appointments
-        try:
-            appointments_file_path = app.config.get('APPOINTMENTS_FILE_PATH')
-            appts_content = sharepoint_service.get_file_content(appointments_file_path)
-            appointments = parse_appointments_file(appts_content, appointments_file_path)
-        except:
-            appointments = []
-        
-        # Find appointment
-        appt_index = None
-        for i, appt in enumerate(appointments):
-            if str(appt.get('OrderNumber', '')).strip().upper() == str(order_number).strip().upper():
-                appt_index = i
-                break
-        
-        if appt_index is None:
-            return jsonify({
-                'success': False,
-                'message': 'Appointment not found'
-            }), 404
+        def send_reschedule(old_appointment):
+            customer_email = old_appointment.get('Customer_Email', '')
+            
+            # Send reschedule email (not for a duration-only change)
+            if customer_email and new_slot_time:
+                try:
+                    # Reconstruct old ISO datetime from old appointment
+                    old_appt_date = old_appointment.get('Appointment_Date', '')
+                    old_appt_time = old_appointment.get('Appointment_Time', '')
+                    old_iso_time = combine_date_and_time_to_iso(old_appt_date, old_appt_time)
+                    
+                    email_result = email_service.send_reschedule_email(
+                        order_number,
+                        old_iso_time,
+                        new_slot_time,
+                        customer_email,
+                        duration_minutes=duration or appointment_duration(old_appointment)
+                    )
+                    
+                    if not email_result.get('success'):
+                        print(f"Failed to send reschedule email: {email_result.get('message')}")
+                except Exception as e:
+                    print(f"Error sending reschedule email: {e}")
         
-        # Check if new slot is available (excluding current appointment)
-        other_appts = [a for i, a in enumerate(appointments) if i != appt_index]
-        booked_slots = get_all_booked_slots(other_appts)
+        appointment = {'orderNumber': order_number}
+        if new_slot_time:
+            appointment['appointmentDate'] = format_date_for_excel(new_slot_time)
+            appointment['appointmentTime'] = format_time_for_excel(new_slot_time)
+        if duration:
+            appointment['durationMinutes'] = duration
         
-        if new_slot_time in booked_slots:
+        # Update appointment (batched with other changes arriving at the same time)
+        try:
+            old_appointment = appointment_writer.submit({
+                'op': 'reschedule',
+                'orderNumber': order_number,
+                'newSlotTime': new_slot_time,
+                'durationMinutes': duration,
+                'createdTime': datetime.now().isoformat()
+            })
+        except MutationRejected as e:
             return jsonify({
                 'success': False,
-                'message': 'The new time slot is not available'
-            }), 409
-        
-        # Update appointment
-        old_appointment = appointments[appt_index]
-        customer_email = old_appointment.get('Customer_Email', '')
-        
-        appointments[appt_index] = {
-            'OrderNumber': order_number,
-            'Appointment_Date': format_date_for_excel(new_slot_time),
-            'Appointment_Time': format_time_for_excel(new_slot_time),
-            'Customer_Email': customer_email,
-            'Created_Time': old_appointment.get('Created_Time', datetime.now().isoformat())
-        }
+                'message': e.message
+            }), e.status_code
+        except WritePending as pending:
+            pending.on_commit(send_reschedule)
+            return write_pending_response(
+                pending,
+                'Reschedule is being saved (appointments file is in use)',
+                appointment=appointment
+            )
         
-        # Save file
-        appointments_file_path = app.config.get('APPOINTMENTS_FILE_PATH')
-        save_appointments_file(
-            appointments,
-            appointments_file_path,
-            ['OrderNumber', 'Appointment_Date', 'Appointment_Time', 'Customer_Email', 'Created_Time']
-        )
-        
-        # Send reschedule email
-        if customer_email:
-            try:
-                # Reconstruct old ISO datetime from old appointment
-                old_appt_date = old_appointment.get('Appointment_Date', '')
-                old_appt_time = old_appointment.get('Appointment_Time', '')
-                old_iso_time = combine_date_and_time_to_iso(old_appt_date, old_appt_time)
-                
-                email_result = email_service.send_reschedule_email(
-                    order_number,
-                    old_iso_time,
-                    new_slot_time,
-                    customer_email
-                )
-                
-                if not email_result.get('success'):
-                    print(f"Failed to send reschedule email: {email_result.get('message')}")
-            except Exception as e:
-                print(f"Error sending reschedule email: {e}")
+        send_reschedule(old_appointment)
         
         return jsonify({
             'success': True,
             'message': 'Appointment rescheduled successfully',
-            'appointment': {
-                'orderNumber': order_number,
-                'appointmentDate': format_date_for_excel(new_slot_time),
-                'appointmentTime': format_time_for_excel(new_slot_time)
-            }
+            'appointment': appointment
         })
         
+    except SharePointUnavailable as e:
+        return sharepoint_unavailable_response(e)
     except Exception as e:
         print(f'Error rescheduling appointment: {e}')
         traceback.print_exc()
@@ -811,6 +1769,7 @@ def reschedule_appointment(order_number):
         }), 500
 
 if __name__ == '__main__':
+    start_background_work()
     port = app.config.get('PORT', 3000)
     print(f'Appointment system server running on port {port}')
     print(f'Health check: http://localhost:{port}/api/health')
@@ -0,0 +1,340 @@
+#!/usr/bin/env python3
+"""
+Micro-benchmarks for the hot helper functions
+Runs each helper on fixed synthetic inputs of several sizes, records time and
+peak allocated memory, and compares them against benchmarks/thresholds.json.
+
+Usage:
+    python benchmarks/bench_hot_paths.py            # compare against thresholds
+    python benchmarks/bench_hot_paths.py --update   # record new baseline
+    python benchmarks/bench_hot_paths.py --only parse_csv_file
+"""
+
+import argparse
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from datetime import datetime, timedelta
+
+BENCH_DIR = os.path.dirname(os.path.abspath(__file__))
+sys.path.insert(0, os.path.dirname(BENCH_DIR))
+
+import app as app_module  # noqa: E402
+from services import file_formats  # noqa: E402
+from services.dock_schedule import DockSchedule  # noqa: E402
+from services.free_slots import FreeSlotIndex  # noqa: E402
+
+THRESHOLDS_FILE = os.path.join(BENCH_DIR, 'thresholds.json')
+
+# A run fails when a helper is this much slower (or heavier) than its baseline
+DEFAULT_TOLERANCE = 0.20
+
+# Fast helpers are timed in batches so each measurement covers at least this long
+MIN_TIMING_SECONDS = 0.02
+
+# Tiny peaks (a few hundred bytes) vary with interpreter internals, so memory
+# limits get a small absolute allowance on top of the ratio
+MEMORY_SLACK_BYTES = 4096
+
+# generate_time_slots starts from today and skips past slots and weekends;
+# it is run against this fixed Monday so every run builds the same grid
+BENCH_NOW = datetime(2025, 1, 6)
+
+APPOINTMENT_FIELDS = ['OrderNumber', 'Appointment_Date', 'Appointment_Time', 'Customer_Email', 'Created_Time']
+ORDER_FIELDS = ['Ready Order Number', 'Ready Date', 'Pick up Status', 'Storage Fee Start From', 'Customer Name', 'Notes']
+
+
+class PinnedDatetime(datetime):
+    """datetime whose utcnow() is BENCH_NOW"""
+
+    @classmethod
+    def utcnow(cls):
+        return BENCH_NOW
+
+
+def make_orders(count):
+    """Fixed synthetic orders sheet rows"""
+    rng = random.Random(count)
+    statuses = ['Ready to Pickup', 'Fulfilled', 'Ready to Pickup', 'Partial']
+    base = datetime(2025, 1, 6)
+    return [{
+        'Ready Order Number': f'SO-{100000 + i}',
+        'Ready Date': (base + timedelta(days=i % 90)).strftime('%Y-%m-%d'),
+        'Pick up Status': rng.choice(statuses),
+        'Storage Fee Start From': 'Picked Up' if i % 11 == 0 else '',
+        'Customer Name': f'Customer {i}',
+        'Notes': 'Side door' if i % 7 == 0 else ''
+    } for i in range(count)]
+
+
+def make_appointments(count):
+    """Fixed synthetic appointment rows in the same format the app writes"""
+    base = datetime(2025, 1, 6, 9, 0)
+    appointments = []
+    for i in range(count):
+        slot = base + timedelta(days=i // 16, minutes=30 * (i % 16))
+        appointments.append({
+            'OrderNumber': f'SO-{100000 + i}',
+            'Appointment_Date': slot.strftime('%Y-%m-%d'),
+            'Appointment_Time': slot.strftime('%I:%M %p'),
+            'Customer_Email': f'customer{i}@example.com',
+            'Created_Time': (slot - timedelta(days=2)).isoformat()
+        })
+    return appointments
+
+
+def make_pickups(count):
+    """(order number, ISO slot time) of the fixed synthetic appointments"""
+    return [(a['OrderNumber'], app_module.combine_date_and_time_to_iso(a['Appointment_Date'], a['Appointment_Time']))
+            for a in make_appointments(count)]
+
+
+def calibrate():
+    """Fixed pure-Python workload used to scale thresholds to the current machine"""
+    start = time.perf_counter()
+    total = 0
+    for i in range(300000):
+        total += len(str(i)) * (i % 7)
+    return time.perf_counter() - start
+
+
+def build_cases():
+    """Return list of (name, size, setup, run) benchmark cases"""
+    cases = []
+
+    for size in (100, 1000, 5000):
+        cases.append(('parse_excel_file', size,
+                      lambda size=size: file_formats.records_to_excel_bytes(make_orders(size), ORDER_FIELDS),
+                      file_formats.parse_excel_file))
+
+    for size in (100, 1000, 10000):
+        cases.append(('parse_csv_file', size,
+                      lambda size=size: file_formats.records_to_csv_bytes(make_appointments(size), APPOINTMENT_FIELDS),
+                      file_formats.parse_csv_file))
+
+    for size in (100, 1000, 10000):
+        cases.append(('records_to_csv_bytes', size,
+                      lambda size=size: make_appointments(size),
+                      lambda records: file_formats.records_to_csv_bytes(records, APPOINTMENT_FIELDS)))
+
+    for size in (100, 1000, 5000):
+        cases.append(('records_to_excel_bytes', size,
+                      lambda size=size: make_appointments(size),
+                      lambda records: file_formats.records_to_excel_bytes(records, APPOINTMENT_FIELDS)))
+
+    # Size is the booking window in days
+    for size in (15, 60, 180):
+        def run_slots(days):
+            original = app_module.app.config.get('TIME_SLOT_DAYS_AHEAD')
+            app_module.app.config['TIME_SLOT_DAYS_AHEAD'] = days
+            app_module.datetime = PinnedDatetime
+            try:
+                return app_module.generate_time_slots()
+            finally:
+                app_module.app.config['TIME_SLOT_DAYS_AHEAD'] = original
+                app_module.datetime = datetime
+        cases.append(('generate_time_slots', size, lambda size=size: size, run_slots))
+
+    for size in (100, 1000, 10000):
+        cases.append(('get_all_booked_slots', size,
+                      lambda size=size: make_appointments(size),
+                      app_module.get_all_booked_slots))
+
+    # Appointments as read from the snapshot, with pre-parsed Slot_Key
+    for size in (100, 1000, 10000):
+        cases.append(('get_booked_slot_keys', size,
+                      lambda size=size: app_module.build_appointments_table(make_appointments(size)).to_records(),
+                      app_module.get_booked_slot_keys))
+
+
+    # Size is the number of orders in the snapshot; each run looks up 1,000 of them
+    for size in (1000, 100000):
+        def run_find(data):
+            table, keys = data
+            for key in keys:
+                table.find(key)
+        cases.append(('find_order', size,
+                      lambda size=size: (app_module.RecordTable.from_records(make_orders(size), 'Ready Order Number',
+                                                                             app_module.ORDER_FIELDNAMES),
+                                         [f'SO-{100000 + (i * 7919) % size}' for i in range(1000)]),
+                      run_find))
+
+    # Size is the number of slots in the grid (every 10th booked); each run does 1,000 lookups
+    for size in (1000, 100000):
+        def setup_free_slots(size):
+            grid = list(range(0, size * 30, 30))
+            index = FreeSlotIndex(lambda: grid)
+            index.update(set(grid[::10]))
+            return index, [(i * 7919 * 30) % (size * 30) for i in range(1000)]
+        def run_nearest(data):
+            index, keys = data
+            for key in keys:
+                index.nearest(key, 3)
+        cases.append(('free_slot_nearest', size, lambda size=size: setup_free_slots(size), run_nearest))
+
+    # Size is the number of slots in the grid (a 1-3 slot booking at every 4th);
+    # each run loads the schedule and does 1,000 fit checks
+    for size in (1000, 100000):
+        def setup_dock_schedule(size):
+            grid = list(range(0, size * 30, 30))
+            bookings = [(key, 30 * (1 + i % 3)) for i, key in enumerate(grid[::4])]
+            return DockSchedule(grid, lambda key: 1, 30), bookings, [(i * 7919 * 30) % (size * 30) for i in range(1000)]
+        def run_dock_schedule(data):
+            schedule, bookings, keys = data
+            schedule.load(bookings)
+            for key in keys:
+                schedule.fits(key, 60)
+        cases.append(('dock_schedule', size, lambda size=size: setup_dock_schedule(size), run_dock_schedule))
+
+    # Size is the number of emails in a bulk send (e.g. a morning's reminders)
+    for size in (100, 1000, 10000):
+        def run_render(pickups):
+            for order_number, pickup_time in pickups:
+                app_module.email_service.generate_reminder_email_body(order_number, pickup_time)
+        cases.append(('render_email', size,
+                      lambda size=size: make_pickups(size),
+                      run_render))
+
+    for size in (100, 1000):
+        def run_calendar(pickups):
+            for order_number, pickup_time in pickups:
+                app_module.email_service.generate_calendar_event(order_number, pickup_time, 30)
+        cases.append(('calendar_event', size,
+                      lambda size=size: make_pickups(size),
+                      run_calendar))
+
+    for size in (100, 1000, 10000):
+        def run_combine(pairs):
+            for date_str, time_str in pairs:
+                app_module.combine_date_and_time_to_iso(date_str, time_str)
+        cases.append(('combine_date_and_time_to_iso', size,
+                      lambda size=size: [(a['Appointment_Date'], a['Appointment_Time'])
+                                         for a in make_appointments(size)],
+                      run_combine))
+
+    return cases
+
+
+def measure(setup, run, repeats):
+    """Return (best seconds per call, peak allocated bytes) for one case"""
+    data = setup()
+
+    # Like timeit.autorange: batch fast calls so each timing covers >= 20 ms
+    loops = 1
+    while True:
+        start = time.perf_counter()
+        for _ in range(loops):
+            run(data)
+        if time.perf_counter() - start >= MIN_TIMING_SECONDS or loops >= 1000:
+            break
+        loops *= 2
+
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(loops):
+            run(data)
+        timings.append((time.perf_counter() - start) / loops)
+
+    # Memory is measured on a separate run so tracing does not skew the timings
+    tracemalloc.start()
+    try:
+        run(data)
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    return min(timings), peak
+
+
+def load_thresholds():
+    if not os.path.exists(THRESHOLDS_FILE):
+        return None
+    with open(THRESHOLDS_FILE) as f:
+        return json.load(f)
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Hot-path micro-benchmarks')
+    parser.add_argument('--update', action='store_true', help='Record results as the new baseline')
+    parser.add_argument('--only', help='Run only benchmarks whose name contains this string')
+    parser.add_argument('--repeats', type=int, default=5, help='Timed runs per case (best is kept)')
+    parser.add_argument('--tolerance', type=float, default=None,
+                        help=f'Allowed slowdown ratio (default {DEFAULT_TOLERANCE})')
+    args = parser.parse_args()
+
+    thresholds = load_thresholds()
+    tolerance = args.tolerance
+    if tolerance is None:
+        tolerance = (thresholds or {}).get('tolerance', DEFAULT_TOLERANCE)
+
+    # Each baseline stores the calibration timing of the run that recorded it;
+    # its time limit is scaled by how much slower or faster this run's is
+    calibration = min(calibrate() for _ in range(5))
+
+    results = {}
+    failures = []
+
+    print(f"{'benchmark':<30} {'size':>6} {'time ms':>10} {'limit ms':>10} {'peak KB':>10} {'limit KB':>10}")
+    print('-' * 82)
+
+    for name, size, setup, run in build_cases():
+        if args.only and args.only not in name:
+            continue
+
+        seconds, peak = measure(setup, run, args.repeats)
+        key = f'{name}[{size}]'
+        results[key] = {'seconds': seconds, 'peak_bytes': peak, 'calibration_seconds': calibration}
+
+        limit_ms = ''
+        limit_kb = ''
+        status = ''
+        baseline = (thresholds or {}).get('benchmarks', {}).get(key)
+        if baseline and not args.update:
+            scale = calibration / baseline['calibration_seconds']
+            max_seconds = baseline['seconds'] * scale * (1 + tolerance)
+            max_peak = baseline['peak_bytes'] * (1 + tolerance) + MEMORY_SLACK_BYTES
+            limit_ms = f'{max_seconds * 1000:.2f}'
+            limit_kb = f'{max_peak / 1024:.1f}'
+            if seconds > max_seconds:
+                failures.append(f'{key}: {seconds * 1000:.2f} ms > {limit_ms} ms')
+                status = ' SLOWER'
+            if peak > max_peak:
+                failures.append(f'{key}: {peak / 1024:.1f} KB > {limit_kb} KB')
+                status += ' HEAVIER'
+
+        print(f'{name:<30} {size:>6} {seconds * 1000:>10.2f} {limit_ms:>10} {peak / 1024:>10.1f} {limit_kb:>10}{status}')
+
+    if args.update:
+        merged = (thresholds or {}).get('benchmarks', {}) if args.only else {}
+        merged.update(results)
+        with open(THRESHOLDS_FILE, 'w') as f:
+            json.dump({
+                'tolerance': tolerance,
+                'recorded_at': datetime.now().isoformat(timespec='seconds'),
+                'python': sys.version.split()[0],
+                'benchmarks': dict(sorted(merged.items()))
+            }, f, indent=2)
+            f.write('\n')
+        print(f'\nBaseline written to {THRESHOLDS_FILE}')
+        return 0
+
+    if thresholds is None:
+        print('\nNo thresholds recorded yet. Run with --update to create a baseline.')
+        return 0
+
+    if failures:
+        print(f'\nRegression detected (tolerance {tolerance:.0%}):')
+        for failure in failures:
+            print(f'  {failure}')
+        return 1
+
+    print(f'\nAll benchmarks within {tolerance:.0%} of baseline')
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
@@ -1,4 +1,5 @@
 import os
+import tempfile
 from dotenv import load_dotenv
 
 load_dotenv()
@@ -10,22 +11,74 @@ class Config:
     # Server Configuration
     PORT = int(os.getenv('PORT', 3000))
     
+    # Async serving mode (gevent, see serve_async.py); sync gunicorn workers ignore these
+    ASYNC_WORKER_CONNECTIONS = int(os.getenv('ASYNC_WORKER_CONNECTIONS', 500))  # In-flight requests per async process
+    GRAPH_HTTP_POOL_SIZE = int(os.getenv('GRAPH_HTTP_POOL_SIZE', 10))  # Pooled Graph connections per service (both modes)
+    
+    # Graph outage handling
+    GRAPH_CONNECT_TIMEOUT_SECONDS = float(os.getenv('GRAPH_CONNECT_TIMEOUT_SECONDS', 5))
+    GRAPH_READ_TIMEOUT_SECONDS = float(os.getenv('GRAPH_READ_TIMEOUT_SECONDS', 20))
+    CIRCUIT_FAILURE_THRESHOLD = int(os.getenv('CIRCUIT_FAILURE_THRESHOLD', 5))  # Consecutive Graph failures before failing fast
+    CIRCUIT_RESET_SECONDS = float(os.getenv('CIRCUIT_RESET_SECONDS', 30))  # How long to fail fast before probing again
+    
     # Microsoft Graph API Configuration for SharePoint
     CLIENT_ID = os.getenv('CLIENT_ID')
     CLIENT_SECRET = os.getenv('CLIENT_SECRET')
     TENANT_ID = os.getenv('TENANT_ID')
     
+    # Where the orders/appointments files live: 'sharepoint' (default) or
+    # 'local' (files under STORAGE_LOCAL_DIR, for development and load tests)
+    STORAGE_BACKEND = os.getenv('STORAGE_BACKEND', 'sharepoint')
+    STORAGE_LOCAL_DIR = os.getenv('STORAGE_LOCAL_DIR', os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data'))
+    
     # SharePoint Configuration
     SHAREPOINT_SITE_URL = os.getenv('SHAREPOINT_SITE_URL')
     SHAREPOINT_SITE_ID = os.getenv('SHAREPOINT_SITE_ID') or os.getenv('SHAREPOINT_OBJECT_ID')
     ORDERS_FILE_PATH = os.getenv('ORDERS_FILE_PATH')
     APPOINTMENTS_FILE_PATH = os.getenv('APPOINTMENTS_FILE_PATH', '/Sunique Wiki/appointments.csv')
+    APPOINTMENTS_APPEND_ONLY = os.getenv('APPOINTMENTS_APPEND_ONLY', 'false').lower() == 'true'  # CSV appointments as an append-only change log, read by Range requests
+    APPOINTMENTS_EXCEL_TABLE = os.getenv('APPOINTMENTS_EXCEL_TABLE', '')  # Named table in an .xlsx appointments file: row-level writes instead of re-uploading the workbook
+    SNAPSHOT_TTL_SECONDS = float(os.getenv('SNAPSHOT_TTL_SECONDS', 5))  # Serve cached parsed files this long before re-checking eTag
+    SNAPSHOT_DIR = os.getenv('SNAPSHOT_DIR', os.path.join(tempfile.gettempdir(), 'sunique-snapshots'))  # Memory-mapped orders snapshots; empty to disable
+    SHAREPOINT_FETCH_MAX_WORKERS = int(os.getenv('SHAREPOINT_FETCH_MAX_WORKERS', 4))  # Parallel file downloads
     
     # Microsoft Graph API Configuration for Email
     OUTLOOK_CLIENT_ID = os.getenv('OUTLOOK_CLIENT_ID')
     OUTLOOK_CLIENT_SECRET = os.getenv('OUTLOOK_CLIENT_SECRET')
     OUTLOOK_TENANT_ID = os.getenv('OUTLOOK_TENANT_ID')
     OUTLOOK_SENDER_EMAIL = os.getenv('OUTLOOK_SENDER_EMAIL', 'info@suniquecabinetry.com')
+    EMAIL_CALENDAR_ATTACHMENTS = os.getenv('EMAIL_CALENDAR_ATTACHMENTS', 'true').lower() == 'true'  # Attach an .ics calendar event to emails that set or cancel a pickup time
+    
+    # Appointment writes arriving within this window are flushed as one upload
+    WRITE_BATCH_WINDOW_MS = int(os.getenv('WRITE_BATCH_WINDOW_MS', 100))
+    WRITE_ACK_TIMEOUT_SECONDS = float(os.getenv('WRITE_ACK_TIMEOUT_SECONDS', 5))  # Longer waits (file locked) answer 202 pending
+    WRITE_RETRY_DEADLINE_SECONDS = float(os.getenv('WRITE_RETRY_DEADLINE_SECONDS', 120))  # Give up on a locked/failing upload after this
+    WRITE_STATUS_DIR = os.getenv('WRITE_STATUS_DIR', os.path.join(tempfile.gettempdir(), 'sunique-write-status'))  # Pending write status shared by workers
+    WRITE_JOURNAL_DIR = os.getenv('WRITE_JOURNAL_DIR', os.path.join(tempfile.gettempdir(), 'sunique-journal'))  # fsync'd log of unconfirmed writes; use a persistent volume
+    
+    # Past appointments are moved out of the appointments file into monthly archives
+    ARCHIVE_AFTER_DAYS = int(os.getenv('ARCHIVE_AFTER_DAYS', 30))  # Archive appointments dated more than this many days ago
+    ARCHIVE_INTERVAL_HOURS = float(os.getenv('ARCHIVE_INTERVAL_HOURS', 6))  # How often the archiver runs; 0 to disable
+    ARCHIVE_DIR = os.getenv('ARCHIVE_DIR', '')  # Folder for appointments-YYYY-MM.csv; default: 'archive' next to the appointments file
+    
+    # Appointments of picked-up orders are removed by a background job
+    RECONCILE_INTERVAL_SECONDS = float(os.getenv('RECONCILE_INTERVAL_SECONDS', 60))  # How often appointments of picked-up orders are removed; 0 to disable
+    
+    # Waitlist for fully booked days; a freed slot is booked for the order that has waited longest
+    WAITLIST_FILE = os.getenv('WAITLIST_FILE', os.path.join(tempfile.gettempdir(), 'sunique-waitlist.json'))  # Shared by workers; use a persistent volume; empty = this process only
+    WAITLIST_INTERVAL_SECONDS = float(os.getenv('WAITLIST_INTERVAL_SECONDS', 10))  # How often freed slots are checked for waiting orders; 0 to disable
+    
+    # Reminder emails before each appointment, sent by a background job
+    REMINDER_DAY_BEFORE_TIME = os.getenv('REMINDER_DAY_BEFORE_TIME', '16:00')  # Time of day of the reminder the day before; empty = none
+    REMINDER_MORNING_OF_TIME = os.getenv('REMINDER_MORNING_OF_TIME', '07:00')  # Time of day of the reminder on the day itself; empty = none
+    REMINDER_MAX_PER_MINUTE = int(os.getenv('REMINDER_MAX_PER_MINUTE', 20))  # Graph allows 30 messages a minute per mailbox; leaves room for confirmations
+    REMINDER_STATE_FILE = os.getenv('REMINDER_STATE_FILE', os.path.join(tempfile.gettempdir(), 'sunique-reminders.json'))  # Keeps reminders across restarts; use a persistent volume; empty = in memory
+    REMINDER_INTERVAL_SECONDS = float(os.getenv('REMINDER_INTERVAL_SECONDS', 60))  # How often due reminders are sent; 0 to disable
+    
+    # Live slot updates for open booking calendars (server-sent events)
+    SLOT_EVENTS_MAX_STREAMS = os.getenv('SLOT_EVENTS_MAX_STREAMS', '')  # Open streams per process; empty = half of ASYNC_WORKER_CONNECTIONS in async mode, 0 (off) otherwise; gunicorn.conf.py sets it for gthread
+    SLOT_EVENTS_POLL_SECONDS = float(os.getenv('SLOT_EVENTS_POLL_SECONDS', 5))  # How often other workers' commits are picked up while streams are open
+    SLOT_EVENTS_STREAM_SECONDS = float(os.getenv('SLOT_EVENTS_STREAM_SECONDS', 300))  # A stream ends after this long and the browser reconnects
     
     # Admin Configuration
     ADMIN_PASSWORD = os.getenv('ADMIN_PASSWORD', '2045@Westgate')
@@ -35,6 +88,11 @@ class Config:
     TIME_SLOT_END_HOUR = 17   # 5 PM
     TIME_SLOT_INTERVAL_MINUTES = 30
     TIME_SLOT_DAYS_AHEAD = 15  # Number of days to show for booking
+    SLOT_CAPACITY = int(os.getenv('SLOT_CAPACITY', 1))  # Orders that can be loaded at the same time (loading bays)
+    SLOT_CAPACITY_BY_WEEKDAY = os.getenv('SLOT_CAPACITY_BY_WEEKDAY', '')  # e.g. 'Mon=2,Fri=3'; overrides SLOT_CAPACITY on those days
+    SLOT_CAPACITY_BY_TIME = os.getenv('SLOT_CAPACITY_BY_TIME', '')  # e.g. '12:00=1,12:30=1'; overrides both at those times of day
+    APPOINTMENT_DURATION_COLUMN = os.getenv('APPOINTMENT_DURATION_COLUMN', '')  # Orders sheet column with the dock minutes an order needs; empty = one slot each
+    APPOINTMENT_MAX_MINUTES = int(os.getenv('APPOINTMENT_MAX_MINUTES', 240))  # Longest appointment an order or admin can set
     
     # CORS Configuration
     CORS_ORIGINS = [
@@ -0,0 +1,64 @@
+"""
+Production gunicorn configuration
+Used by the Procfile and railway.json: gunicorn -c gunicorn.conf.py app:app
+
+The app is preloaded in the master process, which also downloads and parses
+the orders and appointments snapshots before forking. Snapshots are stored as
+single packed buffers (services/record_table.py), so every worker shares the
+master's pages copy-on-write instead of holding its own parsed copy, and RSS
+per worker stays flat as workers are added.
+
+Environment overrides:
+    WEB_CONCURRENCY          worker processes (default 2)
+    GUNICORN_WORKER_CLASS    gthread (default), sync or gevent (async mode)
+    GUNICORN_THREADS         threads per gthread worker (default 4)
+    ASYNC_WORKER_CONNECTIONS in-flight requests per gevent worker (default 500)
+    SLOT_EVENTS_MAX_STREAMS  open slot event streams per worker (gthread default:
+                             a quarter of the threads, at least 1)
+    PRELOAD_SNAPSHOTS        set to 0 to skip loading snapshots in the master
+"""
+
+import gc
+import os
+
+bind = f"0.0.0.0:{os.getenv('PORT', '3000')}"
+
+# Worker model: gthread keeps a few requests in flight per process while they
+# wait on Graph; gevent is the async mode (see serve_async.py)
+workers = int(os.getenv('WEB_CONCURRENCY', 2))
+worker_class = os.getenv('GUNICORN_WORKER_CLASS', 'gthread')
+threads = int(os.getenv('GUNICORN_THREADS', 4))
+worker_connections = int(os.getenv('ASYNC_WORKER_CONNECTIONS', 500))
+
+# Import the app once in the master so workers inherit it (and its snapshots)
+preload_app = True
+
+# Requests wait at most WRITE_ACK_TIMEOUT_SECONDS on uploads (retries run in
+# the background), so this only catches genuinely stuck workers
+timeout = 60
+graceful_timeout = 30
+
+if worker_class == 'gevent':
+    # The preloaded app is imported in the master, so patch before that happens
+    from gevent import monkey
+    monkey.patch_all()
+elif worker_class == 'gthread':
+    # A slot event stream holds one of the worker's threads while it is open;
+    # the app reads this when it is imported
+    os.environ.setdefault('SLOT_EVENTS_MAX_STREAMS', str(max(1, threads // 4)))
+
+def when_ready(server):
+    """Runs in the master after the app is loaded, before any worker is forked"""
+    if os.getenv('PRELOAD_SNAPSHOTS', '1') != '0':
+        from app import preload_snapshots
+        preload_snapshots()
+    
+    # Move everything loaded so far out of the garbage collector's reach so
+    # collections in the workers don't touch (and un-share) those pages
+    gc.freeze()
+
+def post_fork(server, worker):
+    """Runs in each worker right after fork"""
+    from app import reset_after_fork, start_background_work
+    reset_after_fork()
+    start_background_work()
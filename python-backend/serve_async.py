@@ -0,0 +1,29 @@
+#!/usr/bin/env python3
+"""
+Async serving mode
+Runs the Flask app on a gevent server with cooperative (non-blocking) I/O.
+Graph downloads/uploads, 423 backoff sleeps and sendMail calls yield to other
+requests instead of blocking the process, so one process can hold hundreds of
+in-flight bookings while waiting on Microsoft.
+
+Local:       python serve_async.py
+Production:  GUNICORN_WORKER_CLASS=gevent gunicorn -c gunicorn.conf.py app:app
+"""
+
+# Must run before anything else imports socket/ssl/threading
+from gevent import monkey
+monkey.patch_all()
+
+from gevent.pywsgi import WSGIServer  # noqa: E402
+from app import app, start_background_work  # noqa: E402
+
+if __name__ == '__main__':
+    port = app.config.get('PORT', 3000)
+    max_connections = app.config.get('ASYNC_WORKER_CONNECTIONS', 500)
+    
+    print(f'Appointment system server (async mode) running on port {port}')
+    print(f'Health check: http://localhost:{port}/api/health')
+    
+    start_background_work()
+    server = WSGIServer(('0.0.0.0', port), app, spawn=max_connections)
+    server.serve_forever()
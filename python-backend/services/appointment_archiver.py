@@ -0,0 +1,114 @@
+import re
+from datetime import datetime, timedelta
+from services import file_formats
+from services.appointment_writer import MutationRejected, WritePending
+from services.record_table import RecordTable
+from services.storage import StorageFileNotFound, VersionConflict
+
+def appointment_key(record):
+    """Identify one booking: order number, date and time (a rescheduled booking is a new key)"""
+    return (
+        RecordTable.normalize_key(record.get('OrderNumber')),
+        str(record.get('Appointment_Date', ''))[:10],
+        str(record.get('Appointment_Time', '')).strip()
+    )
+
+class AppointmentArchiver:
+    """Moves past appointments from the hot appointments file into per-month archives
+    
+    Each run, appointments dated more than keep_days ago are merged
+    into <archive_dir>/appointments-YYYY-MM.csv (one file per month of the
+    appointment date) and then removed from the hot file through the
+    appointment writer, so every request keeps reading only current and
+    upcoming bookings however long the system runs.
+    
+    Archives are written before anything is removed, and merging skips
+    bookings already archived, so a run interrupted half-way is simply
+    completed by the next one. Removal only matches the exact booking
+    (order, date and time), so an order rescheduled in the meantime stays.
+    
+    run_once() is scheduled by a PeriodicJob (services/periodic_job.py).
+    """
+    
+    MONTH_PATTERN = re.compile(r'^\d{4}-\d{2}$')
+    
+    def __init__(self, storage, load, remove, archive_dir, fieldnames, keep_days=30):
+        self.storage = storage
+        self.load = load
+        self.remove = remove
+        self.archive_dir = archive_dir.rstrip('/')
+        self.fieldnames = fieldnames
+        self.keep_days = keep_days
+        self.archived = 0
+    
+    def run_once(self, today=None):
+        """Archive appointments dated before the cutoff; returns how many were archived"""
+        cutoff = ((today or datetime.now()) - timedelta(days=self.keep_days)).strftime('%Y-%m-%d')
+        
+        by_month = {}
+        for appointment in self.load():
+            date = str(appointment.get('Appointment_Date', ''))[:10]
+            if self._is_date(date) and date < cutoff:
+                by_month.setdefault(date[:7], []).append(appointment)
+        
+        if not by_month:
+            return 0
+        
+        for month, appointments in sorted(by_month.items()):
+            self._merge_into_archive(month, appointments)
+        
+        entries = [list(appointment_key(a)) for appointments in by_month.values() for a in appointments]
+        try:
+            self.remove(entries)
+        except WritePending:
+            pass  # Committed in the background
+        except MutationRejected:
+            pass  # Already removed (cancelled or archived by another run)
+        
+        self.archived += len(entries)
+        print(f"Archived {len(entries)} appointment(s) before {cutoff} into {len(by_month)} monthly file(s)")
+        return len(entries)
+    
+    def get_month(self, month):
+        """Return the archived appointments of month ('YYYY-MM'), or [] if there are none"""
+        if not self.MONTH_PATTERN.match(month or ''):
+            raise ValueError('Month must be in YYYY-MM format')
+        try:
+            return file_formats.parse_csv_file(self.storage.read(self.archive_path(month)))
+        except StorageFileNotFound:
+            return []
+    
+    def archive_path(self, month):
+        return f"{self.archive_dir}/appointments-{month}.csv"
+    
+    def get_stats(self):
+        return {'archived': self.archived, 'archiveDir': self.archive_dir}
+    
+    def _merge_into_archive(self, month, appointments):
+        path = self.archive_path(month)
+        for _ in range(3):
+            try:
+                content, version = self.storage.read_if_changed(path)
+                archived = file_formats.parse_csv_file(content)
+            except StorageFileNotFound:
+                archived, version = [], None
+            
+            known = {appointment_key(a) for a in archived}
+            new = [a for a in appointments if appointment_key(a) not in known]
+            if not new:
+                return
+            
+            content = file_formats.records_to_csv_bytes(archived + new, self.fieldnames)
+            try:
+                self.storage.write(path, content, if_match=version, create_only=version is None)
+                return
+            except VersionConflict:
+                continue  # Someone else wrote the archive meanwhile; merge again
+        raise VersionConflict(f"Archive {path} kept changing")
+    
+    def _is_date(self, value):
+        try:
+            datetime.strptime(value, '%Y-%m-%d')
+            return True
+        except ValueError:
+            return False
@@ -0,0 +1,253 @@
+import csv
+import threading
+from datetime import datetime
+from io import StringIO
+from services.record_table import RecordTable
+from services.storage import StorageFileNotFound, VersionConflict
+
+class AppointmentLog:
+    """Appointments kept as an append-only CSV of change records, read incrementally
+    
+    Each line records one change: Op 'set' (add or replace the appointment
+    for OrderNumber), 'delete' (remove it) or 'compact' (forget everything
+    before this line). The current appointments are the result of replaying
+    the file from the top. A plain appointments CSV without an Op column is
+    read as all 'set' lines and rewritten in log format on the first save.
+    
+    After one full read, refresh() remembers the byte offset and version it
+    has seen and fetches only the bytes after that offset with a Range
+    request, applying the new lines to the in-memory state. The range starts
+    at the last line already read; if those bytes no longer match, the file
+    was compacted or rewritten and is read again in full.
+    
+    save() appends the changed appointments as new lines; only those bytes
+    are sent when the storage backend can append (the local backend), and
+    the whole file otherwise (Graph has no append). When the log has grown
+    well past the number of live appointments, it is compacted instead:
+    rewritten as a 'compact' line followed by one 'set' line per appointment.
+    
+    Used as a SnapshotCache parser: the cache calls refresh() instead of
+    downloading and parsing the file itself. build_table(records) packs the
+    current appointments into the snapshot's RecordTable. After a tail read
+    or an append, only the changed appointments are packed and merged into
+    the previous table (RecordTable.merge), and on_tail(previous table, new
+    table, changes) lets the caller bring anything derived from the table
+    (the dock schedule) forward the same way; changes lists (old record or
+    None, new record or None) per changed appointment.
+    """
+    
+    OPS_COLUMNS = ('Op', 'Recorded_At')
+    
+    # Compact once the log has this many lines and more than this many per live appointment
+    COMPACT_MIN_LINES = 1000
+    COMPACT_RATIO = 2
+    
+    def __init__(self, storage, path, key_field, fieldnames, build_table=None, on_tail=None):
+        self.storage = storage
+        self.path = path
+        self.key_field = key_field
+        self.fieldnames = fieldnames
+        self.columns = ['Op'] + list(fieldnames) + ['Recorded_At']
+        self.build_table = build_table or (lambda records: RecordTable.from_records(records, key_field, fieldnames))
+        self.on_tail = on_tail
+        self._lock = threading.Lock()
+        self._reset(b'', None)
+        
+        self.full_reads = 0
+        self.tail_reads = 0
+        self.tail_bytes = 0
+        self.compactions = 0
+    
+    def refresh(self, snapshot):
+        """Bring the state up to date; returns (RecordTable, version)
+        
+        snapshot is the cache's current snapshot of the file (or None). If it
+        is still current, its data is returned unchanged.
+        """
+        with self._lock:
+            known_version = snapshot.version if snapshot else None
+            if known_version and known_version == self.version:
+                start = self.offset - len(self.anchor)
+                content, version = self.storage.read_range(self.path, start, known_version)
+                if content is None:
+                    return snapshot.data, version
+                
+                if content.startswith(self.anchor):
+                    self.tail_reads += 1
+                    self.tail_bytes += len(content) - len(self.anchor)
+                    self._apply_tail(content[len(self.anchor):], version)
+                    changes = self._changes_since_table()
+                    table = self._table()
+                    if self.on_tail and changes and table is not snapshot.data:
+                        self.on_tail(snapshot.data, table, changes)
+                    return table, version
+                
+                print(f"{self.path} was compacted or rewritten; reading it in full")
+            
+            try:
+                content, version = self.storage.read_if_changed(self.path)
+            except StorageFileNotFound:
+                self._reset(b'', None)
+                raise
+            
+            self._reset(content, version)
+            self.full_reads += 1
+            return self._table(), version
+    
+    def save(self, appointments, version):
+        """Append the changes that turn the current state into appointments
+        
+        version must be the version the appointments were read at (as
+        returned by refresh); the upload is conditional on it. Returns
+        (RecordTable, new version) for the snapshot cache.
+        """
+        with self._lock:
+            if version != self.version:
+                raise VersionConflict()
+            
+            lines = self._changes(appointments)
+            if not lines:
+                return self._table(), self.version
+            
+            live = len(appointments)
+            # Also rewrites a new file, a plain appointments CSV or a log
+            # written with different columns in the current log format
+            if not self.log_format or self.header != self.columns or self.lines + len(lines) > max(self.COMPACT_MIN_LINES, self.COMPACT_RATIO * live):
+                content = self._compacted(appointments)
+                self.compactions += 1
+            else:
+                # A file edited by hand may lack the final newline
+                separator = b'' if self.content.endswith(b'\n') else b'\n'
+                tail = separator + self._encode(lines)
+                if self.storage.can_append:
+                    new_version = self.storage.append(self.path, tail, if_match=version)
+                else:
+                    new_version = self.storage.write(self.path, self.content + tail, if_match=version)
+                self._apply_tail(tail, new_version)
+                return self._table(), new_version
+            
+            new_version = self.storage.write(self.path, content, if_match=version, create_only=version is None)
+            self._reset(content, new_version)
+            return self._table(), new_version
+    
+    def get_stats(self):
+        return {
+            'lines': self.lines,
+            'bytes': self.offset,
+            'fullReads': self.full_reads,
+            'tailReads': self.tail_reads,
+            'tailBytes': self.tail_bytes,
+            'compactions': self.compactions
+        }
+    
+    def _reset(self, content, version):
+        """Replace the whole state with a full read of content"""
+        self.content = b''
+        self.version = version
+        self.records = {}
+        self.lines = 0
+        self.header = None
+        self.log_format = False
+        self.offset = 0
+        self.anchor = b''
+        
+        # The table of the state before the changes in _previous (key -> old record)
+        self._built = None
+        self._previous = {}
+        self._apply_tail(content, version, complete_only=False)
+    
+    def _apply_tail(self, tail, version, complete_only=True):
+        """Apply the lines in tail (the bytes that follow offset)
+        
+        A tail read may end in the middle of a line still being written, so
+        only complete lines are applied unless this is a full read.
+        """
+        end = tail.rfind(b'\n') + 1 if complete_only else len(tail)
+        chunk = tail[:end]
+        rows = csv.reader(StringIO(chunk.decode('utf-8' if self.content else 'utf-8-sig')))
+        if self.header is None:
+            self.header = next(rows, None)
+            self.log_format = bool(self.header) and all(column in self.header for column in self.OPS_COLUMNS)
+        
+        for row in rows:
+            if not row:
+                continue
+            record = dict(zip(self.header, row))
+            op = record.pop('Op', 'set') if self.log_format else 'set'
+            self._apply(op, record)
+            self.lines += 1
+        
+        self.content += chunk
+        self.offset = len(self.content)
+        self.anchor = self.content[self.content.rstrip(b'\n').rfind(b'\n') + 1:]
+        self.version = version
+    
+    def _apply(self, op, record):
+        key = RecordTable.normalize_key(record.get(self.key_field))
+        if op == 'compact':
+            self.records = {}
+            self._built = None
+            self._previous = {}
+            return
+        if self._built is not None and key not in self._previous:
+            self._previous[key] = self.records.get(key)
+        if op == 'delete':
+            self.records.pop(key, None)
+        elif key:
+            self.records[key] = {field: record.get(field, '') for field in self.fieldnames}
+    
+    def _changes(self, appointments):
+        """Return the 'set' and 'delete' rows that turn the state into appointments"""
+        now = datetime.now().isoformat()
+        lines = []
+        seen = set()
+        for appointment in appointments:
+            key = RecordTable.normalize_key(appointment.get(self.key_field))
+            seen.add(key)
+            record = {field: self._text(appointment.get(field)) for field in self.fieldnames}
+            if self.records.get(key) != record:
+                lines.append(dict(record, Op='set', Recorded_At=now))
+        
+        for key, record in self.records.items():
+            if key not in seen:
+                lines.append({'Op': 'delete', self.key_field: record[self.key_field], 'Recorded_At': now})
+        return lines
+    
+    def _compacted(self, appointments):
+        now = datetime.now().isoformat()
+        rows = [{'Op': 'compact', 'Recorded_At': now}]
+        rows += [dict({field: self._text(a.get(field)) for field in self.fieldnames}, Op='set', Recorded_At=now) for a in appointments]
+        output = StringIO()
+        writer = csv.DictWriter(output, fieldnames=self.columns, lineterminator='\n', extrasaction='ignore')
+        writer.writeheader()
+        writer.writerows(rows)
+        return '\ufeff'.encode('utf-8') + output.getvalue().encode('utf-8')
+    
+    def _encode(self, rows):
+        output = StringIO()
+        writer = csv.DictWriter(output, fieldnames=self.columns, lineterminator='\n', extrasaction='ignore')
+        writer.writerows(rows)
+        return output.getvalue().encode('utf-8')
+    
+    def _changes_since_table(self):
+        """(old record or None, new record or None) of each appointment changed since the last table"""
+        changes = []
+        for key, old in self._previous.items():
+            new = self.records.get(key)
+            if old != new:
+                changes.append((old, new))
+        return changes
+    
+    def _table(self):
+        """The RecordTable of the current state, merged into the last one when there is one"""
+        if self._built is None:
+            self._built = self.build_table(list(self.records.values()))
+        elif self._previous:
+            changed = [self.records[key] for key in self._previous if key in self.records]
+            removed = [key for key in self._previous if key not in self.records]
+            self._built = self._built.merge(self.build_table(changed), removed)
+        self._previous = {}
+        return self._built
+    
+    def _text(self, value):
+        return '' if value is None else str(value)
@@ -0,0 +1,306 @@
+import random
+import threading
+import time
+import uuid
+from concurrent.futures import Future, TimeoutError as FutureTimeoutError
+
+class MutationRejected(Exception):
+    """A mutation that can't be applied to the current appointments (e.g. slot taken)"""
+    
+    def __init__(self, message, status_code=409):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+
+class WritePending(Exception):
+    """A mutation still being retried (e.g. file locked) when the caller stopped waiting"""
+    
+    def __init__(self, write_id, future):
+        super().__init__(f"Write {write_id} is still pending")
+        self.write_id = write_id
+        self.future = future
+    
+    def on_commit(self, callback):
+        """Call callback(result) from the writer once the mutation is written"""
+        def done(future):
+            if future.exception() is None:
+                try:
+                    callback(future.result())
+                except Exception as e:
+                    print(f"Error in after-commit callback for write {self.write_id}: {e}")
+        self.future.add_done_callback(done)
+
+class _QueuedMutation:
+    __slots__ = ('mutation', 'future', 'deadline', 'attempts', 'journal_id')
+    
+    def __init__(self, mutation, future, deadline, journal_id=None):
+        self.mutation = mutation
+        self.future = future
+        self.deadline = deadline
+        self.attempts = 0
+        self.journal_id = journal_id
+
+class GroupCommitWriter:
+    """Batches appointment mutations into one load-apply-upload cycle
+    
+    Mutations (plain dicts such as {'op': 'book', ...}) submitted within a
+    short window are applied in arrival order to the latest appointments list
+    and flushed as a single upload. Each caller is acknowledged only after
+    that upload succeeds; a mutation rejected by apply() fails on its own
+    without affecting the rest of the batch.
+    
+    A retryable failure (file locked, throttled, network) puts the batch
+    back at the front of the queue and retries it on this background thread
+    with jittered exponential backoff until retry_deadline runs out. Request
+    threads never sleep: submit() waits at most ack_timeout and then raises
+    WritePending with a write id whose outcome is tracked in status_store.
+    
+    load() returns the current appointments list and its version,
+    apply(appointments, mutation) checks and applies one mutation in place
+    (raising MutationRejected to refuse it) and returns a result for the
+    caller, and save(appointments, version) uploads the new list if the file
+    is still at that version. If given, check_available() is called before a new
+    mutation is queued and may raise to refuse it up front (e.g. while
+    SharePoint is known to be down), and after_commit(appointments) is
+    called once a batch is saved (e.g. to refresh caches). An error in
+    after_commit is only logged: the batch is written and is not retried.
+    
+    With a journal (services/write_journal.py), every mutation is fsync'd to
+    local disk before it is queued and confirmed once it is committed or
+    finally refused, so changes accepted by a process that crashes before
+    its upload are replayed by recover() in the next one.
+    """
+    
+    RETRY_BASE_SECONDS = 1
+    RETRY_MAX_SECONDS = 16
+    
+    def __init__(self, load, apply, save, window_seconds=0.1, max_batch=50,
+                 ack_timeout=5, retry_deadline=120, status_store=None, check_available=None,
+                 journal=None, after_commit=None):
+        self.load = load
+        self.apply = apply
+        self.save = save
+        self.after_commit = after_commit
+        self.check_available = check_available
+        self.journal = journal
+        self.window_seconds = window_seconds
+        self.max_batch = max_batch
+        self.ack_timeout = ack_timeout
+        self.retry_deadline = retry_deadline
+        self.status_store = status_store
+        
+        self._pending = []
+        self._retry_at = 0
+        self._condition = threading.Condition()
+        self._thread = None
+        self._stopping = False
+        
+        self.uploads = 0
+        self.mutations = 0
+        self.largest_batch = 0
+        self.retries = 0
+        self.gave_up = 0
+    
+    def submit(self, mutation):
+        """Queue a mutation and wait up to ack_timeout for it to be written
+        
+        Returns apply()'s result, raises MutationRejected or the upload error,
+        or raises WritePending if the write is still being retried.
+        """
+        future = self.submit_async(mutation)
+        try:
+            return future.result(timeout=self.ack_timeout)
+        except FutureTimeoutError:
+            raise WritePending(self._track(mutation, future), future)
+    
+    def submit_async(self, mutation):
+        """Queue a mutation; returns a Future resolved once it is durably written"""
+        if self.check_available:
+            self.check_available()
+        return self._enqueue(mutation)
+    
+    def recover(self):
+        """Re-queue changes a previous process journaled but never confirmed; returns how many"""
+        if self.journal is None:
+            return 0
+        
+        def resubmit(mutation):
+            future = self._enqueue(mutation)
+            future.add_done_callback(lambda f: print(
+                f"Replayed {mutation.get('op')} for {mutation.get('orderNumber', '')}: "
+                f"{'committed' if f.exception() is None else f.exception()}"
+            ))
+        
+        replayed = self.journal.recover(resubmit)
+        if replayed:
+            print(f"Replaying {replayed} unconfirmed appointment change(s) from the write journal")
+        return replayed
+    
+    def _enqueue(self, mutation):
+        # Journal first: once this returns, the change survives a crash
+        journal_id = self.journal.append(mutation) if self.journal else None
+        
+        future = Future()
+        queued = _QueuedMutation(mutation, future, time.time() + self.retry_deadline, journal_id)
+        with self._condition:
+            self._ensure_thread()
+            self._pending.append(queued)
+            self._condition.notify()
+        return future
+    
+    def stop(self, timeout=5):
+        """Stop the writer thread after its current batch (tests, shutdown)
+        
+        Mutations still queued stay in the journal for the next process to
+        replay; a later submit starts a new thread.
+        """
+        with self._condition:
+            self._stopping = True
+            self._condition.notify_all()
+        if self._thread is not None:
+            self._thread.join(timeout)
+    
+    def get_status(self, write_id):
+        """Return the tracked status of a pending write, or None"""
+        return self.status_store.get(write_id) if self.status_store else None
+    
+    def get_stats(self):
+        return {
+            'mutations': self.mutations,
+            'uploads': self.uploads,
+            'largestBatch': self.largest_batch,
+            'pending': len(self._pending),
+            'retries': self.retries,
+            'gaveUp': self.gave_up,
+            'retryingInSeconds': round(max(0, self._retry_at - time.time()), 1),
+            'journaled': self.journal.pending_count() if self.journal else None
+        }
+    
+    def _track(self, mutation, future):
+        """Give a still-running write an id and record its outcome when it finishes"""
+        write_id = uuid.uuid4().hex
+        if self.status_store is None:
+            return write_id
+        
+        details = {'op': mutation.get('op'), 'orderNumber': mutation.get('orderNumber')}
+        self.status_store.record(write_id, 'pending', **details)
+        
+        def done(future):
+            error = future.exception()
+            if error is None:
+                self.status_store.record(write_id, 'committed', **details)
+            else:
+                self.status_store.record(
+                    write_id, 'failed',
+                    message=getattr(error, 'message', str(error)),
+                    statusCode=getattr(error, 'status_code', None),
+                    **details
+                )
+        future.add_done_callback(done)
+        return write_id
+    
+    def _ensure_thread(self):
+        # Started lazily so a gunicorn master never owns the thread (threads don't survive fork)
+        if self._thread is None or not self._thread.is_alive():
+            self._stopping = False
+            self._thread = threading.Thread(target=self._run, name='appointment-writer', daemon=True)
+            self._thread.start()
+    
+    def _run(self):
+        while True:
+            with self._condition:
+                while True:
+                    if self._stopping:
+                        return
+                    delay = self._retry_at - time.time()
+                    if self._pending and delay <= 0:
+                        break
+                    self._condition.wait(delay if self._pending else None)
+            
+            # Let the rest of a burst arrive, then take up to max_batch mutations
+            time.sleep(self.window_seconds)
+            with self._condition:
+                batch = self._pending[:self.max_batch]
+                del self._pending[:self.max_batch]
+            
+            self._flush(batch)
+    
+    def _flush(self, batch):
+        try:
+            appointments, version = self.load()
+        except Exception as e:
+            self._retry_or_fail(batch, e)
+            return
+        
+        accepted = []
+        for queued in batch:
+            try:
+                result = self.apply(appointments, queued.mutation)
+            except Exception as e:
+                self._confirm([queued], 'rejected')
+                queued.future.set_exception(e)
+                continue
+            accepted.append((queued, result))
+        
+        if not accepted:
+            return
+        
+        try:
+            self.save(appointments, version)
+        except Exception as e:
+            # Retries re-load and re-apply, so a retried mutation is checked
+            # again against whatever changed in the meantime
+            self._retry_or_fail([queued for queued, _ in accepted], e)
+            return
+        
+        self._confirm([queued for queued, _ in accepted], 'committed')
+        self._retry_at = 0
+        self.uploads += 1
+        self.mutations += len(accepted)
+        self.largest_batch = max(self.largest_batch, len(accepted))
+        if len(accepted) > 1:
+            print(f"Group commit: {len(accepted)} appointment changes in one upload")
+        
+        if self.after_commit:
+            try:
+                self.after_commit(appointments)
+            except Exception as e:
+                print(f"Error in after-commit hook: {e}")
+        
+        for queued, result in accepted:
+            queued.future.set_result(result)
+    
+    def _confirm(self, batch, outcome):
+        if self.journal:
+            try:
+                self.journal.confirm([queued.journal_id for queued in batch], outcome)
+            except OSError as e:
+                # Worst case the change is replayed once more and re-checked
+                print(f"Could not confirm journal entries: {e}")
+    
+    def _retry_or_fail(self, batch, error):
+        now = time.time()
+        retry = []
+        for queued in batch:
+            if getattr(error, 'retryable', True) and now < queued.deadline:
+                queued.attempts += 1
+                retry.append(queued)
+            else:
+                self.gave_up += 1
+                self._confirm([queued], 'failed')
+                queued.future.set_exception(error)
+        
+        if not retry:
+            print(f"Appointment write failed: {error}")
+            return
+        
+        # Full jitter keeps workers that hit the same lock from retrying in step
+        attempts = max(queued.attempts for queued in retry)
+        delay = random.uniform(0, min(self.RETRY_MAX_SECONDS, self.RETRY_BASE_SECONDS * 2 ** (attempts - 1)))
+        delay = min(delay, max(queued.deadline for queued in retry) - now)
+        print(f"Appointment write failed ({error}); retrying {len(retry)} change(s) in {delay:.1f}s (attempt {attempts})")
+        
+        self.retries += 1
+        with self._condition:
+            self._pending[:0] = retry
+            self._retry_at = now + delay
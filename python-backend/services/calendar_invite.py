@@ -0,0 +1,68 @@
+"""iCalendar (.ics) events attached to appointment emails
+
+Slot times are labelled UTC but are the warehouse's clock (the emails
+print them as they are, see services/slot_keys.py), so events use
+floating local times: the customer's calendar shows the same time as the
+email. Every email about an order carries the same UID with a higher
+SEQUENCE, so a reschedule moves the entry already in the customer's
+calendar and a cancellation removes it.
+"""
+
+import time
+from datetime import datetime, timedelta
+
+PRODID = '-//Sunique Cabinetry//Pickup Appointments//EN'
+LOCATION = 'Westgate Warehouse, 2045 Westgate Dr Ste 130, Carrollton, TX 75006'
+
+def pickup_event(order_number, pickup_time, duration_minutes, organizer, cancelled=False):
+    """The .ics file (bytes) for an order's pickup at ISO slot time pickup_time; None if it doesn't parse"""
+    try:
+        start = datetime.fromisoformat(pickup_time.replace('Z', '+00:00')).replace(tzinfo=None)
+    except (AttributeError, ValueError):
+        return None
+    end = start + timedelta(minutes=duration_minutes)
+    now = time.time()
+    
+    lines = [
+        'BEGIN:VCALENDAR',
+        f'PRODID:{PRODID}',
+        'VERSION:2.0',
+        'CALSCALE:GREGORIAN',
+        f"METHOD:{'CANCEL' if cancelled else 'PUBLISH'}",
+        'BEGIN:VEVENT',
+        f'UID:pickup-{_text(order_number)}@suniquecabinetry.com',
+        # Later emails about the order must carry a higher sequence
+        f'SEQUENCE:{int(now)}',
+        f"DTSTAMP:{time.strftime('%Y%m%dT%H%M%SZ', time.gmtime(now))}",
+        f"DTSTART:{start.strftime('%Y%m%dT%H%M%S')}",
+        f"DTEND:{end.strftime('%Y%m%dT%H%M%S')}",
+        f'SUMMARY:{_text(f"Sunique order {order_number} pickup")}',
+        f'LOCATION:{_text(LOCATION)}',
+        f'DESCRIPTION:{_text("To cancel or modify your appointment, please contact Sunique at (972) 245-3309.")}',
+        f'ORGANIZER;CN=Sunique Cabinetry:mailto:{organizer}',
+        f"STATUS:{'CANCELLED' if cancelled else 'CONFIRMED'}",
+        'TRANSP:OPAQUE',
+        'END:VEVENT',
+        'END:VCALENDAR'
+    ]
+    return ''.join(_fold(line) + '\r\n' for line in lines).encode('utf-8')
+
+def _text(value):
+    """Escape a TEXT value (RFC 5545 3.3.11)"""
+    return (str(value).replace('\\', '\\\\').replace(';', '\\;').replace(',', '\\,')
+            .replace('\r\n', '\\n').replace('\n', '\\n'))
+
+def _fold(line):
+    """Split a content line into lines of at most 75 octets, continued with a leading space"""
+    encoded = line.encode('utf-8')
+    if len(encoded) <= 75:
+        return line
+    pieces = []
+    while encoded:
+        size = 75 if not pieces else 74
+        # Don't split a multi-byte character
+        while size < len(encoded) and (encoded[size] & 0xC0) == 0x80:
+            size -= 1
+        pieces.append(encoded[:size].decode('utf-8'))
+        encoded = encoded[size:]
+    return '\r\n '.join(pieces)
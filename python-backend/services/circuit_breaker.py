@@ -0,0 +1,114 @@
+import threading
+import time
+
+class SharePointUnavailable(Exception):
+    """Raised without calling Graph while the circuit breaker is open"""
+    
+    # Lets the appointment writer keep retrying an in-flight write until its deadline
+    retryable = True
+    
+    def __init__(self, message, retry_after=None):
+        super().__init__(message)
+        self.message = message
+        self.retry_after = retry_after
+
+class CircuitBreaker:
+    """Stop calling a dependency that keeps failing, then probe it again later
+    
+    closed     calls go through; failure_threshold consecutive failures open it
+    open       calls fail immediately with SharePointUnavailable until
+               reset_timeout has passed
+    half_open  one trial call goes through; success closes the circuit,
+               failure opens it for another reset_timeout
+    
+    Only outages count as failures (timeouts, connection errors, 429, 5xx);
+    a 404 or 423 means the service is answering and counts as success.
+    """
+    
+    CLOSED = 'closed'
+    OPEN = 'open'
+    HALF_OPEN = 'half_open'
+    
+    def __init__(self, name, failure_threshold=5, reset_timeout=30):
+        self.name = name
+        self.failure_threshold = failure_threshold
+        self.reset_timeout = reset_timeout
+        
+        self.state = self.CLOSED
+        self.consecutive_failures = 0
+        self.opened_at = 0
+        self.last_error = None
+        self.times_opened = 0
+        self.rejected = 0
+        
+        self._trial_in_flight = False
+        self._lock = threading.Lock()
+    
+    def before_call(self):
+        """Raise SharePointUnavailable if the call should not be attempted"""
+        with self._lock:
+            if self.state == self.CLOSED:
+                return
+            
+            retry_after = self.opened_at + self.reset_timeout - time.time()
+            if self.state == self.OPEN and retry_after <= 0:
+                self.state = self.HALF_OPEN
+                self._trial_in_flight = False
+            
+            if self.state == self.HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return
+            
+            self.rejected += 1
+            raise SharePointUnavailable(
+                f"{self.name} is unavailable ({self.last_error}); not retrying for {max(retry_after, 0):.0f}s",
+                retry_after=max(1, round(retry_after))
+            )
+    
+    def check(self):
+        """Raise SharePointUnavailable while open, without using up a half-open trial
+        
+        Used to refuse new writes up front instead of queueing them.
+        """
+        if self.state == self.OPEN:
+            retry_after = self.opened_at + self.reset_timeout - time.time()
+            if retry_after > 0:
+                self.rejected += 1
+                raise SharePointUnavailable(
+                    f"{self.name} is unavailable ({self.last_error})",
+                    retry_after=max(1, round(retry_after))
+                )
+    
+    def record_success(self):
+        with self._lock:
+            if self.state != self.CLOSED:
+                print(f"Circuit breaker for {self.name} closed: service is answering again")
+            self.state = self.CLOSED
+            self.consecutive_failures = 0
+            self._trial_in_flight = False
+    
+    def record_failure(self, error):
+        with self._lock:
+            self.consecutive_failures += 1
+            self.last_error = str(error)[:200]
+            self._trial_in_flight = False
+            
+            if self.state == self.HALF_OPEN or self.consecutive_failures >= self.failure_threshold:
+                if self.state != self.OPEN:
+                    self.times_opened += 1
+                    print(f"Circuit breaker for {self.name} opened after {self.consecutive_failures} failure(s): {self.last_error}")
+                self.state = self.OPEN
+                self.opened_at = time.time()
+    
+    def is_open(self):
+        """True while calls are being rejected (a half-open trial may still be allowed)"""
+        return self.state != self.CLOSED
+    
+    def get_stats(self):
+        return {
+            'state': self.state,
+            'consecutiveFailures': self.consecutive_failures,
+            'timesOpened': self.times_opened,
+            'rejected': self.rejected,
+            'lastError': self.last_error
+        }
@@ -0,0 +1,193 @@
+import bisect
+import copy
+import threading
+
+class DockSchedule:
+    """Dock occupancy over the bookable slot grid, for appointments of any length
+    
+    An appointment starting at slot key start with duration minutes occupies
+    every grid slot in [start, start + duration). Occupancy minus capacity
+    per grid slot is kept in a segment tree with range add and range max, so
+    both adding an appointment and asking "is there a free bay at every slot
+    of this interval" take O(log n) in the number of grid slots, however
+    full the schedule is. The tree is built in one pass from a difference
+    array (load()), so a snapshot with many appointments costs two bisects
+    per appointment rather than a tree update each.
+    
+    A start only fits if every slot of its interval is on the grid, so a
+    long appointment can't run past closing time or over a weekend.
+    """
+    
+    def __init__(self, grid, capacity, interval):
+        self.grid = grid
+        self.capacity = capacity
+        self.interval = interval
+        self._positions = {key: i for i, key in enumerate(grid)}
+        self._size = len(grid)
+        self.load([])
+    
+    def load(self, appointments):
+        """Rebuild from (start, duration) pairs"""
+        difference = [0] * (self._size + 1)
+        for start, duration in appointments:
+            low, high = self._range(start, duration)
+            if low < high:
+                difference[low] += 1
+                difference[high] -= 1
+        
+        values = []
+        occupied = 0
+        for i, key in enumerate(self.grid):
+            occupied += difference[i]
+            values.append(occupied - self.capacity(key))
+        self._max = [0] * (4 * max(1, self._size))
+        self._add = [0] * (4 * max(1, self._size))
+        self._build(1, 0, self._size, values)
+        return self
+    
+    def add(self, start, duration, count=1):
+        """Book (or, with count=-1, release) a bay for [start, start + duration)"""
+        low, high = self._range(start, duration)
+        if low < high:
+            self._update(1, 0, self._size, low, high, count)
+    
+    def remaining(self, start, duration):
+        """Bays free during the whole of [start, start + duration); 0 if it doesn't fit the grid"""
+        position = self._positions.get(start)
+        steps = -(-duration // self.interval)
+        if position is None or position + steps > self._size:
+            return 0
+        # Consecutive grid slots, not e.g. the next morning
+        if self.grid[position + steps - 1] != start + (steps - 1) * self.interval:
+            return 0
+        return max(0, -self._query(1, 0, self._size, position, position + steps))
+    
+    def copy(self):
+        """An independent copy, e.g. to apply a batch of changes that may not be saved"""
+        other = copy.copy(self)
+        other._max = list(self._max)
+        other._add = list(self._add)
+        return other
+    
+    def fits(self, start, duration):
+        return self.remaining(start, duration) > 0
+    
+    def on_grid(self, key):
+        return key in self._positions
+    
+    def first_fit(self, start, end, duration):
+        """Earliest grid slot in [start, end) where an appointment of duration fits, or None"""
+        for key in self.grid[bisect.bisect_left(self.grid, start):bisect.bisect_left(self.grid, end)]:
+            if self.fits(key, duration):
+                return key
+        return None
+    
+    def _range(self, start, duration):
+        return bisect.bisect_left(self.grid, start), bisect.bisect_left(self.grid, start + duration)
+    
+    def _build(self, node, low, high, values):
+        if high - low <= 0:
+            return
+        if high - low == 1:
+            self._max[node] = values[low]
+            return
+        middle = (low + high) // 2
+        self._build(2 * node, low, middle, values)
+        self._build(2 * node + 1, middle, high, values)
+        self._max[node] = max(self._max[2 * node], self._max[2 * node + 1])
+    
+    def _update(self, node, low, high, start, end, value):
+        # Pending adds stay on the node that covers the whole range; every
+        # node's max already includes its own pending add
+        if end <= low or high <= start:
+            return
+        if start <= low and high <= end:
+            self._max[node] += value
+            self._add[node] += value
+            return
+        middle = (low + high) // 2
+        self._update(2 * node, low, middle, start, end, value)
+        self._update(2 * node + 1, middle, high, start, end, value)
+        self._max[node] = max(self._max[2 * node], self._max[2 * node + 1]) + self._add[node]
+    
+    def _query(self, node, low, high, start, end):
+        if end <= low or high <= start:
+            return float('-inf')
+        if start <= low and high <= end:
+            return self._max[node]
+        middle = (low + high) // 2
+        return max(self._query(2 * node, low, middle, start, end),
+                   self._query(2 * node + 1, middle, high, start, end)) + self._add[node]
+
+class DockScheduleCache:
+    """The DockSchedule of the current appointments snapshot, kept between requests
+    
+    build(appointments) makes a schedule from scratch; grid_version()
+    changes whenever the bookable slots do (e.g. each time a slot starts and
+    drops off the grid). get(source, appointments) returns the cached
+    schedule while source (the appointments snapshot table) and the grid
+    version are the ones it was built for, and otherwise builds it from
+    appointments(). The cached schedule is shared: callers must not change it.
+    
+    A write batch takes a copy with checkout(), applies each change to it
+    with add() and, once the batch is saved, put()s it back as the schedule
+    of the new snapshot, so neither a read nor a write rebuilds it. Changes
+    read from another worker's appends go through advance() the same way.
+    """
+    
+    def __init__(self, build, grid_version):
+        self.build = build
+        self.grid_version = grid_version
+        self._lock = threading.Lock()
+        self._schedule = None
+        self._source = None
+        self._version = None
+        
+        self.builds = 0
+        self.updates = 0
+    
+    def get(self, source, appointments):
+        version = self.grid_version()
+        with self._lock:
+            if source is not None and source is self._source and version == self._version:
+                return self._schedule
+        schedule = self.build(appointments())
+        self.builds += 1
+        self._store(schedule, source, version)
+        return schedule
+    
+    def checkout(self, source, appointments):
+        """(copy of source's schedule, grid version) for a write batch to change"""
+        version = self.grid_version()
+        return self.get(source, appointments).copy(), version
+    
+    def advance(self, source, new_source, update):
+        """Cache source's schedule, changed by update(schedule), as new_source's
+        
+        Does nothing unless source's schedule is the cached one; new_source's
+        is then built on first use as usual.
+        """
+        version = self.grid_version()
+        with self._lock:
+            if source is None or source is not self._source or version != self._version:
+                return
+            schedule = self._schedule.copy()
+        update(schedule)
+        self.put(schedule, new_source, version)
+    
+    def put(self, schedule, source, version):
+        """Cache schedule as the one of source, unless the grid has moved on since version"""
+        if self._store(schedule, source, version):
+            self.updates += 1
+    
+    def _store(self, schedule, source, version):
+        if source is None or version != self.grid_version():
+            return False
+        with self._lock:
+            self._schedule = schedule
+            self._source = source
+            self._version = version
+        return True
+    
+    def get_stats(self):
+        return {'builds': self.builds, 'updates': self.updates}
@@ -1,6 +1,9 @@
+import base64
 import msal
 import requests
-from datetime import datetime
+from services.calendar_invite import pickup_event
+from services.email_templates import format_pickup_time, render_email
+from services.http_session import create_graph_session
 
 class EmailService:
     def __init__(self, config):
@@ -10,6 +13,17 @@ class EmailService:
         self.tenant_id = config.get('OUTLOOK_TENANT_ID')
         self.sender_email = config.get('OUTLOOK_SENDER_EMAIL', 'info@suniquecabinetry.com')
         
+        # MSAL client is created on first token request, not in a preloaded
+        # gunicorn master (it runs tenant discovery)
+        self.app = None
+        
+        # Pooled HTTP session shared by all sendMail calls
+        self.session = create_graph_session(config)
+        
+        # Attach an .ics calendar event to emails about a pickup time
+        self.attach_calendar = config.get('EMAIL_CALENDAR_ATTACHMENTS', True)
+        self.default_duration = config.get('TIME_SLOT_INTERVAL_MINUTES', 30)
+        
         if not self.client_id or not self.client_secret or not self.tenant_id:
             print('Outlook API credentials are not properly configured')
             self.is_configured = False
@@ -17,15 +31,16 @@ class EmailService:
             self.is_configured = True
             self.authority = f"https://login.microsoftonline.com/{self.tenant_id}"
             self.scope = ['https://graph.microsoft.com/.default']
-            
+    
+    def get_access_token(self):
+        """Get Microsoft Graph API access token"""
+        if self.app is None:
             self.app = msal.ConfidentialClientApplication(
                 self.client_id,
                 authority=self.authority,
                 client_credential=self.client_secret
             )
-    
-    def get_access_token(self):
-        """Get Microsoft Graph API access token"""
+        
         result = self.app.acquire_token_silent(self.scope, account=None)
         
         if not result:
@@ -36,257 +51,72 @@ class EmailService:
         else:
             raise Exception(f"Failed to acquire token: {result.get('error_description', 'Unknown error')}")
     
-    def send_confirmation_email(self, order_number, pickup_time, customer_email):
-        """Send appointment confirmation email"""
-        if not self.is_configured:
-            print('Email service not configured. Skipping email send.')
-            return {'success': False, 'message': 'Email service not configured'}
+    def reset_connections(self):
+        """Drop pooled connections and the MSAL client after a fork
         
-        try:
-            if not customer_email:
-                return {'success': False, 'message': 'Customer email is required'}
-            
-            # Generate email body
-            email_body = self.generate_email_body(order_number, pickup_time)
-            
-            # Prepare email message
-            message = {
-                'message': {
-                    'subject': f'Appointment Confirmation - Order {order_number}',
-                    'body': {
-                        'contentType': 'HTML',
-                        'content': email_body
-                    },
-                    'toRecipients': [
-                        {
-                            'emailAddress': {
-                                'address': customer_email
-                            }
-                        }
-                    ],
-                    'ccRecipients': [
-                        {
-                            'emailAddress': {
-                                'address': 'warehouse@suniquecabinetry.com'
-                            }
-                        }
-                    ]
-                },
-                'saveToSentItems': True
-            }
-            
-            # Send email via Microsoft Graph API
-            token = self.get_access_token()
-            headers = {
-                'Authorization': f'Bearer {token}',
-                'Content-Type': 'application/json'
-            }
-            
-            url = f'https://graph.microsoft.com/v1.0/users/{self.sender_email}/sendMail'
-            response = requests.post(url, headers=headers, json=message)
-            
-            if response.status_code == 202:
-                print(f'Confirmation email sent successfully to {customer_email}')
-                return {
-                    'success': True,
-                    'message': 'Email sent successfully'
-                }
-            else:
-                print(f'Failed to send email: {response.status_code} - {response.text}')
-                return {
-                    'success': False,
-                    'message': f'Failed to send email: {response.status_code}'
-                }
-                
-        except Exception as e:
-            print(f'Error sending email: {e}')
-            return {
-                'success': False,
-                'message': f'Error sending email: {str(e)}'
-            }
-    
-    def generate_email_body(self, order_number, pickup_time):
-        """Generate HTML email body"""
-        try:
-            # Parse pickup time
-            pickup_date = datetime.fromisoformat(pickup_time.replace('Z', '+00:00'))
-            formatted_date = pickup_date.strftime('%B %d, %Y')
-            formatted_time = pickup_date.strftime('%I:%M %p')
-            
-        except:
-            formatted_date = 'N/A'
-            formatted_time = 'N/A'
-        
-        return f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    line-height: 1.6;
-                    color: #333;
-                }}
-                .container {{
-                    max-width: 600px;
-                    margin: 0 auto;
-                    padding: 20px;
-                }}
-                .header {{
-                    background-color: #8B4513;
-                    color: white;
-                    padding: 20px;
-                    text-align: center;
-                }}
-                .content {{
-                    background-color: #f9f9f9;
-                    padding: 30px;
-                    border-radius: 5px;
-                    margin-top: 20px;
-                }}
-                .appointment-details {{
-                    background-color: white;
-                    padding: 20px;
-                    border-left: 4px solid #8B4513;
-                    margin: 20px 0;
-                }}
-                .detail-row {{
-                    margin: 10px 0;
-                }}
-                .label {{
-                    font-weight: bold;
-                    color: #8B4513;
-                }}
-                .footer {{
-                    margin-top: 30px;
-                    padding-top: 20px;
-                    border-top: 1px solid #ddd;
-                    font-size: 14px;
-                    color: #666;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>Appointment Confirmed</h1>
-                </div>
-                
-                <div class="content">
-                    <p>Dear Customer,</p>
-                    
-                    <p>Your pickup appointment has been successfully scheduled.</p>
-                    
-                    <div class="appointment-details">
-                        <div class="detail-row">
-                            <span class="label">Order Number:</span> {order_number}
-                        </div>
-                        <div class="detail-row">
-                            <span class="label">Pickup Date:</span> {formatted_date}
-                        </div>
-                        <div class="detail-row">
-                            <span class="label">Pickup Time:</span> {formatted_time}
-                        </div>
-                        <div class="detail-row">
-                            <span class="label">Location:</span> Westgate Warehouse<br>
-                            2045 Westgate Dr Ste 130, Carrollton, TX 75006
-                        </div>
-                    </div>
-                    
-                    <p><strong>Important Information:</strong></p>
-                    <ul>
-                        <li>Please keep the email confirmation or a screenshot for your reference and have it ready when picking up your order.</li>
-                        <li>To cancel or modify your appointment, please contact Sunique at (972) 245-3309.</li>
-                        <li>The appointment is reserved for 10 minutes. If you are delayed more than 10 minutes, the appointment will be void.</li>
-                        <li>We reserve the right to adjust the time. We will do our best to get your order loaded, but we do not guarantee it will be ready at the exact scheduled time.</li>
-                    </ul>
-                    
-                    <div class="footer">
-                        <p>If you have any questions, please contact us:</p>
-                        <p>
-                            <strong>Sunique Cabinetry</strong><br>
-                            Phone: (972) 245-3309<br>
-                            Email: info@suniquecabinetry.com<br>
-                            Address: 2045 Westgate Dr Ste 130, Carrollton, TX 75006
-                        </p>
-                    </div>
-                </div>
-            </div>
-        </body>
-        </html>
+        Both are recreated on first use, so a forked worker doesn't share the
+        master's sockets.
         """
+        self.session.close()
+        self.app = None
+    
+    def send_confirmation_email(self, order_number, pickup_time, customer_email, duration_minutes=None):
+        """Send appointment confirmation email"""
+        return self.send_email(
+            'Confirmation',
+            f'Appointment Confirmation - Order {order_number}',
+            lambda: self.generate_email_body(order_number, pickup_time),
+            customer_email,
+            calendar=lambda: self.generate_calendar_event(order_number, pickup_time, duration_minutes)
+        )
     
     def send_cancellation_email(self, order_number, original_pickup_time, customer_email):
         """Send appointment cancellation email"""
-        if not self.is_configured:
-            print('Email service not configured. Skipping email send.')
-            return {'success': False, 'message': 'Email service not configured'}
-        
-        try:
-            if not customer_email:
-                return {'success': False, 'message': 'Customer email is required'}
-            
-            # Generate email body
-            email_body = self.generate_cancellation_email_body(order_number, original_pickup_time)
-            
-            # Prepare email message
-            message = {
-                'message': {
-                    'subject': f'Appointment Cancelled - Order {order_number}',
-                    'body': {
-                        'contentType': 'HTML',
-                        'content': email_body
-                    },
-                    'toRecipients': [
-                        {
-                            'emailAddress': {
-                                'address': customer_email
-                            }
-                        }
-                    ],
-                    'ccRecipients': [
-                        {
-                            'emailAddress': {
-                                'address': 'warehouse@suniquecabinetry.com'
-                            }
-                        }
-                    ]
-                },
-                'saveToSentItems': True
-            }
-            
-            # Send email via Microsoft Graph API
-            token = self.get_access_token()
-            headers = {
-                'Authorization': f'Bearer {token}',
-                'Content-Type': 'application/json'
-            }
-            
-            url = f'https://graph.microsoft.com/v1.0/users/{self.sender_email}/sendMail'
-            response = requests.post(url, headers=headers, json=message)
-            
-            if response.status_code == 202:
-                print(f'Cancellation email sent successfully to {customer_email}')
-                return {
-                    'success': True,
-                    'message': 'Cancellation email sent successfully'
-                }
-            else:
-                print(f'Failed to send cancellation email: {response.status_code} - {response.text}')
-                return {
-                    'success': False,
-                    'message': f'Failed to send email: {response.status_code}'
-                }
-                
-        except Exception as e:
-            print(f'Error sending cancellation email: {e}')
-            return {
-                'success': False,
-                'message': f'Error sending email: {str(e)}'
-            }
+        return self.send_email(
+            'Cancellation',
+            f'Appointment Cancelled - Order {order_number}',
+            lambda: self.generate_cancellation_email_body(order_number, original_pickup_time),
+            customer_email,
+            calendar=lambda: self.generate_calendar_event(order_number, original_pickup_time, cancelled=True)
+        )
     
-    def send_reschedule_email(self, order_number, old_pickup_time, new_pickup_time, customer_email):
+    def send_reschedule_email(self, order_number, old_pickup_time, new_pickup_time, customer_email, duration_minutes=None):
         """Send appointment reschedule email"""
+        return self.send_email(
+            'Reschedule',
+            f'Appointment Rescheduled - Order {order_number}',
+            lambda: self.generate_reschedule_email_body(order_number, old_pickup_time, new_pickup_time),
+            customer_email,
+            calendar=lambda: self.generate_calendar_event(order_number, new_pickup_time, duration_minutes)
+        )
+    
+    def send_waitlist_promotion_email(self, order_number, pickup_time, customer_email, duration_minutes=None):
+        """Send the email for a waitlisted order booked into a freed slot"""
+        return self.send_email(
+            'Waitlist',
+            f'A Pickup Time Opened Up - Order {order_number}',
+            lambda: self.generate_waitlist_promotion_email_body(order_number, pickup_time),
+            customer_email,
+            calendar=lambda: self.generate_calendar_event(order_number, pickup_time, duration_minutes)
+        )
+    
+    def send_reminder_email(self, order_number, pickup_time, customer_email, same_day=False):
+        """Send a reminder of an upcoming pickup (the day before, or with same_day the morning of)"""
+        # Reminders are not copied to the warehouse, and the event is already in the calendar
+        return self.send_email(
+            'Reminder',
+            f'Pickup Reminder - Order {order_number}',
+            lambda: self.generate_reminder_email_body(order_number, pickup_time, same_day),
+            customer_email,
+            copy_warehouse=False
+        )
+    
+    def send_email(self, kind, subject, render_body, customer_email, copy_warehouse=True, calendar=None):
+        """Send one email via Microsoft Graph
+        
+        render_body() returns the HTML body; calendar(), if given, returns the
+        .ics event to attach (or None). Returns {'success', 'message'}.
+        """
         if not self.is_configured:
             print('Email service not configured. Skipping email send.')
             return {'success': False, 'message': 'Email service not configured'}
@@ -295,16 +125,13 @@ class EmailService:
             if not customer_email:
                 return {'success': False, 'message': 'Customer email is required'}
             
-            # Generate email body
-            email_body = self.generate_reschedule_email_body(order_number, old_pickup_time, new_pickup_time)
-            
             # Prepare email message
             message = {
                 'message': {
-                    'subject': f'Appointment Rescheduled - Order {order_number}',
+                    'subject': subject,
                     'body': {
                         'contentType': 'HTML',
-                        'content': email_body
+                        'content': render_body()
                     },
                     'toRecipients': [
                         {
@@ -312,17 +139,29 @@ class EmailService:
                                 'address': customer_email
                             }
                         }
-                    ],
-                    'ccRecipients': [
-                        {
-                            'emailAddress': {
-                                'address': 'warehouse@suniquecabinetry.com'
-                            }
-                        }
                     ]
                 },
                 'saveToSentItems': True
             }
+            if copy_warehouse:
+                message['message']['ccRecipients'] = [
+                    {
+                        'emailAddress': {
+                            'address': 'warehouse@suniquecabinetry.com'
+                        }
+                    }
+                ]
+            
+            event = calendar() if calendar and self.attach_calendar else None
+            if event:
+                message['message']['attachments'] = [
+                    {
+                        '@odata.type': '#microsoft.graph.fileAttachment',
+                        'name': 'pickup-appointment.ics',
+                        'contentType': 'text/calendar',
+                        'contentBytes': base64.b64encode(event).decode('ascii')
+                    }
+                ]
             
             # Send email via Microsoft Graph API
             token = self.get_access_token()
@@ -332,255 +171,58 @@ class EmailService:
             }
             
             url = f'https://graph.microsoft.com/v1.0/users/{self.sender_email}/sendMail'
-            response = requests.post(url, headers=headers, json=message)
+            response = self.session.post(url, headers=headers, json=message)
             
             if response.status_code == 202:
-                print(f'Reschedule email sent successfully to {customer_email}')
+                print(f'{kind} email sent successfully to {customer_email}')
                 return {
                     'success': True,
-                    'message': 'Reschedule email sent successfully'
+                    'message': 'Email sent successfully'
                 }
             else:
-                print(f'Failed to send reschedule email: {response.status_code} - {response.text}')
+                print(f'Failed to send {kind.lower()} email: {response.status_code} - {response.text}')
                 return {
                     'success': False,
                     'message': f'Failed to send email: {response.status_code}'
                 }
                 
         except Exception as e:
-            print(f'Error sending reschedule email: {e}')
+            print(f'Error sending {kind.lower()} email: {e}')
             return {
                 'success': False,
                 'message': f'Error sending email: {str(e)}'
             }
     
+    def generate_email_body(self, order_number, pickup_time):
+        """Generate HTML email body"""
+        pickup_date, pickup_clock = format_pickup_time(pickup_time)
+        return render_email('confirmation', order_number=order_number, pickup_date=pickup_date, pickup_time=pickup_clock)
+    
     def generate_cancellation_email_body(self, order_number, original_pickup_time):
         """Generate HTML email body for cancellation"""
-        try:
-            # Parse pickup time
-            pickup_date = datetime.fromisoformat(original_pickup_time.replace('Z', '+00:00'))
-            formatted_date = pickup_date.strftime('%B %d, %Y')
-            formatted_time = pickup_date.strftime('%I:%M %p')
-            
-        except:
-            formatted_date = 'N/A'
-            formatted_time = 'N/A'
-        
-        return f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    line-height: 1.6;
-                    color: #333;
-                }}
-                .container {{
-                    max-width: 600px;
-                    margin: 0 auto;
-                    padding: 20px;
-                }}
-                .header {{
-                    background-color: #dc3545;
-                    color: white;
-                    padding: 20px;
-                    text-align: center;
-                }}
-                .content {{
-                    background-color: #f9f9f9;
-                    padding: 30px;
-                    border-radius: 5px;
-                    margin-top: 20px;
-                }}
-                .appointment-details {{
-                    background-color: white;
-                    padding: 20px;
-                    border-left: 4px solid #dc3545;
-                    margin: 20px 0;
-                }}
-                .detail-row {{
-                    margin: 10px 0;
-                }}
-                .label {{
-                    font-weight: bold;
-                    color: #dc3545;
-                }}
-                .footer {{
-                    margin-top: 30px;
-                    padding-top: 20px;
-                    border-top: 1px solid #ddd;
-                    font-size: 14px;
-                    color: #666;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>Appointment Cancelled</h1>
-                </div>
-                
-                <div class="content">
-                    <p>Dear Valued Customer,</p>
-                    
-                    <p>Your pickup appointment has been cancelled.</p>
-                    
-                    <div class="appointment-details">
-                        <div class="detail-row">
-                            <span class="label">Order Number:</span> {order_number}
-                        </div>
-                        <div class="detail-row">
-                            <span class="label">Cancelled Appointment Date:</span> {formatted_date}
-                        </div>
-                        <div class="detail-row">
-                            <span class="label">Cancelled Appointment Time:</span> {formatted_time}
-                        </div>
-                    </div>
-                    
-                    <p><strong>Need to Schedule a New Appointment?</strong></p>
-                    <p>If you need to schedule a new pickup appointment, please use our <a href="https://sunique-pickup-appointment.netlify.app/">online booking system</a> or contact us directly.</p>
-                    
-                    <div class="footer">
-                        <p>If you have any questions, please contact us:</p>
-                        <p>
-                            <strong>Sunique Cabinetry</strong><br>
-                            Phone: (972) 245-3309<br>
-                            Email: info@suniquecabinetry.com<br>
-                            Address: 2045 Westgate Dr Ste 130, Carrollton, TX 75006
-                        </p>
-                    </div>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
+        pickup_date, pickup_clock = format_pickup_time(original_pickup_time)
+        return render_email('cancellation', order_number=order_number, pickup_date=pickup_date, pickup_time=pickup_clock)
     
     def generate_reschedule_email_body(self, order_number, old_pickup_time, new_pickup_time):
         """Generate HTML email body for reschedule"""
-        try:
-            # Parse old pickup time
-            old_date = datetime.fromisoformat(old_pickup_time.replace('Z', '+00:00'))
-            old_formatted_date = old_date.strftime('%B %d, %Y')
-            old_formatted_time = old_date.strftime('%I:%M %p')
-            
-            # Parse new pickup time
-            new_date = datetime.fromisoformat(new_pickup_time.replace('Z', '+00:00'))
-            new_formatted_date = new_date.strftime('%B %d, %Y')
-            new_formatted_time = new_date.strftime('%I:%M %p')
-            
-        except:
-            old_formatted_date = 'N/A'
-            old_formatted_time = 'N/A'
-            new_formatted_date = 'N/A'
-            new_formatted_time = 'N/A'
-        
-        return f"""
-        <!DOCTYPE html>
-        <html>
-        <head>
-            <style>
-                body {{
-                    font-family: Arial, sans-serif;
-                    line-height: 1.6;
-                    color: #333;
-                }}
-                .container {{
-                    max-width: 600px;
-                    margin: 0 auto;
-                    padding: 20px;
-                }}
-                .header {{
-                    background-color: #ffc107;
-                    color: #333;
-                    padding: 20px;
-                    text-align: center;
-                }}
-                .content {{
-                    background-color: #f9f9f9;
-                    padding: 30px;
-                    border-radius: 5px;
-                    margin-top: 20px;
-                }}
-                .appointment-details {{
-                    background-color: white;
-                    padding: 20px;
-                    border-left: 4px solid #ffc107;
-                    margin: 20px 0;
-                }}
-                .old-time {{
-                    text-decoration: line-through;
-                    color: #999;
-                }}
-                .new-time {{
-                    color: #28a745;
-                    font-weight: bold;
-                }}
-                .detail-row {{
-                    margin: 10px 0;
-                }}
-                .label {{
-                    font-weight: bold;
-                    color: #ffc107;
-                }}
-                .footer {{
-                    margin-top: 30px;
-                    padding-top: 20px;
-                    border-top: 1px solid #ddd;
-                    font-size: 14px;
-                    color: #666;
-                }}
-            </style>
-        </head>
-        <body>
-            <div class="container">
-                <div class="header">
-                    <h1>Appointment Rescheduled</h1>
-                </div>
-                
-                <div class="content">
-                    <p>Dear Valued Customer,</p>
-                    
-                    <p>Your pickup appointment has been rescheduled by our staff.</p>
-                    
-                    <div class="appointment-details">
-                        <div class="detail-row">
-                            <span class="label">Order Number:</span> {order_number}
-                        </div>
-                        <div class="detail-row">
-                            <span class="label">Previous Time:</span><br>
-                            <span class="old-time">{old_formatted_date} at {old_formatted_time}</span>
-                        </div>
-                        <div class="detail-row">
-                            <span class="label">New Time:</span><br>
-                            <span class="new-time">{new_formatted_date} at {new_formatted_time}</span>
-                        </div>
-                        <div class="detail-row">
-                            <span class="label">Location:</span> Westgate Warehouse<br>
-                            2045 Westgate Dr Ste 130, Carrollton, TX 75006
-                        </div>
-                    </div>
-                    
-                    <p><strong>Important Information:</strong></p>
-                    <ul>
-                        <li>Please keep the email confirmation or a screenshot for your reference and have it ready when picking up your order.</li>
-                        <li>To cancel or modify your appointment, please contact Sunique at (972) 245-3309.</li>
-                        <li>The appointment is reserved for 10 minutes. If you are delayed more than 10 minutes, the appointment will be void.</li>
-                        <li>We reserve the right to adjust the time. We will do our best to get your order loaded, but we do not guarantee it will be ready at the exact scheduled time.</li>
-                    </ul>
-                    
-                    <div class="footer">
-                        <p>If you have any questions, please contact us:</p>
-                        <p>
-                            <strong>Sunique Cabinetry</strong><br>
-                            Phone: (972) 245-3309<br>
-                            Email: info@suniquecabinetry.com<br>
-                            Address: 2045 Westgate Dr Ste 130, Carrollton, TX 75006
-                        </p>
-                    </div>
-                </div>
-            </div>
-        </body>
-        </html>
-        """
+        old_date, old_clock = format_pickup_time(old_pickup_time)
+        new_date, new_clock = format_pickup_time(new_pickup_time)
+        return render_email('reschedule', order_number=order_number, old_pickup_date=old_date, old_pickup_time=old_clock,
+                            pickup_date=new_date, pickup_time=new_clock)
+    
+    def generate_waitlist_promotion_email_body(self, order_number, pickup_time):
+        """Generate HTML email body for a booking made from the waitlist"""
+        pickup_date, pickup_clock = format_pickup_time(pickup_time)
+        return render_email('waitlist_promotion', order_number=order_number, pickup_date=pickup_date, pickup_time=pickup_clock)
+    
+    def generate_reminder_email_body(self, order_number, pickup_time, same_day=False):
+        """Generate HTML email body for a pickup reminder"""
+        pickup_date, pickup_clock = format_pickup_time(pickup_time)
+        return render_email('reminder', order_number=order_number, pickup_date=pickup_date, pickup_time=pickup_clock,
+                            when='today' if same_day else 'tomorrow')
+    
+    def generate_calendar_event(self, order_number, pickup_time, duration_minutes=None, cancelled=False):
+        """Generate the .ics event for an order's pickup (see services/calendar_invite.py)"""
+        return pickup_event(order_number, pickup_time, duration_minutes or self.default_duration,
+                            self.sender_email, cancelled=cancelled)
 
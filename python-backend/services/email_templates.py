@@ -0,0 +1,244 @@
+"""HTML email templates, compiled once at import
+
+Every email shares LAYOUT (styles, colored header, details box, footer).
+Each email in TEMPLATES fills in its static parts once (accent color,
+title, intro, detail rows, closing notes) and is split into the literal
+HTML around the values that change per email, such as {order_number}. A
+render then only escapes those values and joins them with the cached
+literal chunks, instead of formatting the whole page.
+
+Static parts use str.format syntax: {name} is a value given to render()
+(or to the template, when it names a static part); {{ and }} are
+literal braces.
+"""
+
+import html
+from datetime import datetime
+from functools import lru_cache
+from string import Formatter
+
+LAYOUT = """
+        <!DOCTYPE html>
+        <html>
+        <head>
+            <style>
+                body {{
+                    font-family: Arial, sans-serif;
+                    line-height: 1.6;
+                    color: #333;
+                }}
+                .container {{
+                    max-width: 600px;
+                    margin: 0 auto;
+                    padding: 20px;
+                }}
+                .header {{
+                    background-color: {accent};
+                    color: {header_text};
+                    padding: 20px;
+                    text-align: center;
+                }}
+                .content {{
+                    background-color: #f9f9f9;
+                    padding: 30px;
+                    border-radius: 5px;
+                    margin-top: 20px;
+                }}
+                .appointment-details {{
+                    background-color: white;
+                    padding: 20px;
+                    border-left: 4px solid {accent};
+                    margin: 20px 0;
+                }}
+{extra_styles}                .detail-row {{
+                    margin: 10px 0;
+                }}
+                .label {{
+                    font-weight: bold;
+                    color: {accent};
+                }}
+                .footer {{
+                    margin-top: 30px;
+                    padding-top: 20px;
+                    border-top: 1px solid #ddd;
+                    font-size: 14px;
+                    color: #666;
+                }}
+            </style>
+        </head>
+        <body>
+            <div class="container">
+                <div class="header">
+                    <h1>{title}</h1>
+                </div>
+                
+                <div class="content">
+                    <p>{greeting}</p>
+                    
+                    <p>{intro}</p>
+                    
+                    <div class="appointment-details">
+{details}                    </div>
+                    
+{closing}                    
+                    <div class="footer">
+                        <p>If you have any questions, please contact us:</p>
+                        <p>
+                            <strong>Sunique Cabinetry</strong><br>
+                            Phone: (972) 245-3309<br>
+                            Email: info@suniquecabinetry.com<br>
+                            Address: 2045 Westgate Dr Ste 130, Carrollton, TX 75006
+                        </p>
+                    </div>
+                </div>
+            </div>
+        </body>
+        </html>
+        """
+
+RESCHEDULE_STYLES = """                .old-time {{
+                    text-decoration: line-through;
+                    color: #999;
+                }}
+                .new-time {{
+                    color: #28a745;
+                    font-weight: bold;
+                }}
+"""
+
+class EmailTemplate:
+    """A template split into literal chunks and the names of the values between them"""
+    
+    def __init__(self, source, **static):
+        parts = ['']
+        for literal, field, _, _ in Formatter().parse(source):
+            parts[-1] += literal
+            if field is None:
+                continue
+            if field in static:
+                # Static parts may use values (and other static parts) themselves
+                inner = EmailTemplate(static[field], **static).parts
+                parts[-1] += inner[0]
+                parts += inner[1:]
+            else:
+                parts += [field, '']
+        self.parts = parts
+        self.literals = parts[0::2]
+        self.fields = parts[1::2]
+    
+    def render(self, **values):
+        chunks = [self.literals[0]]
+        for field, literal in zip(self.fields, self.literals[1:]):
+            chunks.append(html.escape(str(values[field])))
+            chunks.append(literal)
+        return ''.join(chunks)
+
+def detail_row(label, value):
+    return f"""                        <div class="detail-row">
+                            <span class="label">{label}:</span>{value}
+                        </div>
+"""
+
+def notes(items):
+    lines = ''.join(f"                        <li>{item}</li>\n" for item in items)
+    return f"""                    <p><strong>Important Information:</strong></p>
+                    <ul>
+{lines}                    </ul>
+"""
+
+ORDER_ROW = detail_row('Order Number', ' {order_number}')
+LOCATION_ROW = detail_row('Location', """ Westgate Warehouse<br>
+                            2045 Westgate Dr Ste 130, Carrollton, TX 75006""")
+PICKUP_ROWS = (ORDER_ROW + detail_row('Pickup Date', ' {pickup_date}') +
+               detail_row('Pickup Time', ' {pickup_time}') + LOCATION_ROW)
+
+RESERVED_NOTE = 'The appointment is reserved for 10 minutes. If you are delayed more than 10 minutes, the appointment will be void.'
+CONTACT_NOTE = 'To cancel or modify your appointment, please contact Sunique at (972) 245-3309.'
+BOOKED_NOTES = notes([
+    'Please keep the email confirmation or a screenshot for your reference and have it ready when picking up your order.',
+    CONTACT_NOTE,
+    RESERVED_NOTE,
+    'We reserve the right to adjust the time. We will do our best to get your order loaded, but we do not guarantee it will be ready at the exact scheduled time.'
+])
+
+COMMON = {'header_text': 'white', 'extra_styles': '', 'greeting': 'Dear Customer,'}
+
+TEMPLATES = {
+    'confirmation': EmailTemplate(LAYOUT, **dict(
+        COMMON,
+        accent='#8B4513',
+        title='Appointment Confirmed',
+        intro='Your pickup appointment has been successfully scheduled.',
+        details=PICKUP_ROWS,
+        closing=BOOKED_NOTES
+    )),
+    'cancellation': EmailTemplate(LAYOUT, **dict(
+        COMMON,
+        accent='#dc3545',
+        title='Appointment Cancelled',
+        greeting='Dear Valued Customer,',
+        intro='Your pickup appointment has been cancelled.',
+        details=(ORDER_ROW + detail_row('Cancelled Appointment Date', ' {pickup_date}') +
+                 detail_row('Cancelled Appointment Time', ' {pickup_time}')),
+        closing="""                    <p><strong>Need to Schedule a New Appointment?</strong></p>
+                    <p>If you need to schedule a new pickup appointment, please use our <a href="https://sunique-pickup-appointment.netlify.app/">online booking system</a> or contact us directly.</p>
+"""
+    )),
+    'reschedule': EmailTemplate(LAYOUT, **dict(
+        COMMON,
+        accent='#ffc107',
+        header_text='#333',
+        extra_styles=RESCHEDULE_STYLES,
+        title='Appointment Rescheduled',
+        greeting='Dear Valued Customer,',
+        intro='Your pickup appointment has been rescheduled by our staff.',
+        details=(ORDER_ROW +
+                 detail_row('Previous Time', """<br>
+                            <span class="old-time">{old_pickup_date} at {old_pickup_time}</span>""") +
+                 detail_row('New Time', """<br>
+                            <span class="new-time">{pickup_date} at {pickup_time}</span>""") +
+                 LOCATION_ROW),
+        closing=BOOKED_NOTES
+    )),
+    'waitlist_promotion': EmailTemplate(LAYOUT, **dict(
+        COMMON,
+        accent='#28a745',
+        title='Your Pickup Is Scheduled',
+        intro='A pickup time opened up on the day you were waiting for, and we have booked it for you.',
+        details=PICKUP_ROWS,
+        closing=notes([
+            'Please keep this email or a screenshot for your reference and have it ready when picking up your order.',
+            'If this time does not work for you, please contact Sunique at (972) 245-3309 to cancel or change it.',
+            RESERVED_NOTE
+        ])
+    )),
+    'reminder': EmailTemplate(LAYOUT, **dict(
+        COMMON,
+        accent='#8B4513',
+        title='Pickup Reminder',
+        intro='This is a reminder that your pickup appointment is {when}.',
+        details=PICKUP_ROWS,
+        closing=notes([
+            'Please have your confirmation email or a screenshot ready when picking up your order.',
+            CONTACT_NOTE,
+            RESERVED_NOTE
+        ])
+    ))
+}
+
+def render_email(name, **values):
+    """HTML body of the email TEMPLATES[name] with values filled in"""
+    return TEMPLATES[name].render(**values)
+
+@lru_cache(maxsize=4096)
+def format_pickup_time(iso_time):
+    """('November 13, 2025', '09:30 AM') for an ISO slot time; ('N/A', 'N/A') if unparseable
+    
+    Cached, since bulk sends (e.g. reminders) format the same few slot times
+    over and over.
+    """
+    try:
+        pickup_date = datetime.fromisoformat(iso_time.replace('Z', '+00:00'))
+        return pickup_date.strftime('%B %d, %Y'), pickup_date.strftime('%I:%M %p')
+    except (AttributeError, ValueError):
+        return 'N/A', 'N/A'
@@ -0,0 +1,202 @@
+import re
+from datetime import date
+from services.circuit_breaker import SharePointUnavailable
+from services.storage import StorageWriteError, VersionConflict
+
+# SharePoint driveItem eTags look like "{item id},version number"
+ETAG_PATTERN = re.compile(r'"?(\{[^}]*\}),(\d+)"?')
+
+class ExcelTableWriter:
+    """Row-level edits to a named table in a SharePoint workbook (Graph workbook API)
+    
+    Instead of regenerating and uploading the whole workbook, save_changes()
+    compares the records before and after a batch of mutations by key and
+    sends only the difference inside one workbook session: an update per
+    changed row, a delete per removed row and one add for all new rows. The
+    cost of a booking therefore does not grow with the number of rows.
+    
+    The table's columns must be in fieldnames order and its rows must be the
+    only data on the sheet, so that row i of the table is record i of the
+    parsed file. Each update or delete first reads the row it targets and
+    checks its key; if the rows moved (e.g. someone sorted the table in
+    Excel), the row is looked up by key in the key column instead.
+    """
+    
+    def __init__(self, sharepoint, file_path, table_name, key_field, fieldnames):
+        self.sharepoint = sharepoint
+        self.file_path = file_path
+        self.table_name = table_name
+        self.key_field = key_field
+        self.fieldnames = fieldnames
+        
+        self.sessions = 0
+        self.rows_added = 0
+        self.rows_updated = 0
+        self.rows_deleted = 0
+    
+    def save_changes(self, before, after, expected_version=None):
+        """Apply the difference between two record lists to the table; returns the new eTag
+        
+        With expected_version, the changes are only sent if the workbook is
+        still at that eTag (VersionConflict otherwise). Row edits are not
+        transactional: a failure part-way leaves the earlier edits in place,
+        and the caller's retry re-reads the table before trying again.
+        
+        The eTag read after the session only describes `after` if it is the
+        version right after expected_version. Otherwise someone else may have
+        edited the workbook between the check and our edits, and None is
+        returned: the caller must re-read the workbook instead of caching its
+        own view of it.
+        """
+        updates, deletes, adds = self._diff(before, after)
+        if not (updates or deletes or adds):
+            return expected_version
+        
+        if expected_version and self._current_version() != expected_version:
+            raise VersionConflict()
+        
+        session_id = self._request('POST', '/createSession', json={'persistChanges': True}).json()['id']
+        headers = {'workbook-session-id': session_id}
+        self.sessions += 1
+        try:
+            # Updates first and deletes from the bottom up, so the indexes
+            # computed from `before` stay valid until they are used
+            for index, record in updates:
+                row = self._locate(index, record[self.key_field], headers)
+                self._request('PATCH', self._row_path(row), headers=headers, json={'values': [self._values(record)]})
+                self.rows_updated += 1
+            
+            for index, key in sorted(deletes, reverse=True):
+                row = self._locate(index, key, headers)
+                self._request('DELETE', self._row_path(row), headers=headers)
+                self.rows_deleted += 1
+            
+            if adds:
+                self._request(
+                    'POST', f"/tables/{self.table_name}/rows/add", headers=headers,
+                    json={'values': [self._values(record) for record in adds]}
+                )
+                self.rows_added += len(adds)
+        finally:
+            try:
+                self._request('POST', '/closeSession', headers=headers)
+            except Exception as e:
+                # Sessions also expire on their own after a few minutes
+                print(f"Could not close workbook session: {e}")
+        
+        new_version = self._current_version()
+        if expected_version and not self.is_next_version(expected_version, new_version):
+            print(f"{self.file_path} changed from {expected_version} to {new_version} during the save; re-reading it")
+            return None
+        return new_version
+    
+    @staticmethod
+    def is_next_version(old, new):
+        """True if eTag new is the version right after old ({id},N then {id},N+1)"""
+        old_match = ETAG_PATTERN.fullmatch(str(old or ''))
+        new_match = ETAG_PATTERN.fullmatch(str(new or ''))
+        return (bool(old_match) and bool(new_match) and old_match.group(1) == new_match.group(1)
+                and int(new_match.group(2)) == int(old_match.group(2)) + 1)
+    
+    def get_stats(self):
+        return {
+            'table': self.table_name,
+            'sessions': self.sessions,
+            'rowsAdded': self.rows_added,
+            'rowsUpdated': self.rows_updated,
+            'rowsDeleted': self.rows_deleted
+        }
+    
+    def _diff(self, before, after):
+        """Return (updates [(index, record)], deletes [(index, key)], adds [record])"""
+        before_rows = {}
+        for index, record in enumerate(before):
+            before_rows.setdefault(self._key(record), (index, record))
+        after_keys = set()
+        
+        updates = []
+        adds = []
+        for record in after:
+            key = self._key(record)
+            after_keys.add(key)
+            if key not in before_rows:
+                adds.append(record)
+            elif self._values(record) != self._values(before_rows[key][1]):
+                updates.append((before_rows[key][0], record))
+        
+        deletes = [(index, record[self.key_field]) for key, (index, record) in before_rows.items() if key not in after_keys]
+        return updates, deletes, adds
+    
+    def _locate(self, index, key, headers):
+        """Return the table row index holding key, checking the expected index first"""
+        # An index past the end of the table is answered with 400 or 404
+        row = self._request('GET', self._row_path(index), headers=headers, allow_missing=True)
+        if row is not None:
+            values = row.json().get('values') or [[]]
+            if self._cell(values[0], self.key_field) == self._normalize(key):
+                return index
+        
+        # Rows moved since the file was read; find the key in its column
+        column = self._request(
+            'GET', f"/tables/{self.table_name}/columns/{self.key_field}/dataBodyRange",
+            headers=headers, params={'$select': 'values'}
+        ).json().get('values', [])
+        for position, cell in enumerate(column):
+            if cell and self._normalize(cell[0]) == self._normalize(key):
+                return position
+        
+        # Someone else removed it; re-reading the table decides what happens next
+        raise VersionConflict(f"Row for {key} is no longer in table {self.table_name}")
+    
+    def _current_version(self):
+        return self.sharepoint.get_metadata(self.file_path)['version']
+    
+    def _request(self, method, path, allow_missing=False, headers=None, **kwargs):
+        url = self.sharepoint._item_url(self.file_path, ':/workbook' + path)
+        try:
+            token = self.sharepoint.get_access_token()
+            response = self.sharepoint._graph_request(
+                method, url, headers=dict(headers or {}, Authorization=f'Bearer {token}'), **kwargs
+            )
+        except SharePointUnavailable:
+            raise
+        except Exception as e:
+            raise StorageWriteError(f"Workbook request failed: {e}")
+        
+        if response.status_code < 300:
+            return response
+        if response.status_code in (400, 404) and allow_missing:
+            return None
+        if response.status_code in (409, 423):
+            raise StorageWriteError('Workbook is locked or busy (open in Excel or another session)', response.status_code)
+        
+        retryable = response.status_code == 429 or response.status_code >= 500
+        raise StorageWriteError(
+            f"Workbook request failed: {response.status_code} - {response.text}",
+            response.status_code,
+            retryable
+        )
+    
+    def _row_path(self, index):
+        return f"/tables/{self.table_name}/rows/itemAt(index={index})"
+    
+    def _values(self, record):
+        return [self._normalize(record.get(field)) for field in self.fieldnames]
+    
+    def _cell(self, values, field):
+        position = self.fieldnames.index(field)
+        return self._normalize(values[position]) if position < len(values) else ''
+    
+    def _key(self, record):
+        return self._normalize(record.get(self.key_field))
+    
+    def _normalize(self, value):
+        # Cells come back from pandas and from Graph with different types
+        # (NaN, floats for whole numbers, datetimes); compare them as text
+        if value is None or value != value:
+            return ''
+        if isinstance(value, float) and value.is_integer():
+            return str(int(value))
+        if isinstance(value, date):
+            return value.isoformat()
+        return str(value)
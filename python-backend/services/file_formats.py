@@ -0,0 +1,121 @@
+import pandas as pd
+from io import BytesIO
+from openpyxl import load_workbook
+
+def parse_excel_file(content):
+    """Parse Excel file content and return as list of dictionaries"""
+    try:
+        # Load Excel file from bytes
+        excel_file = BytesIO(content)
+        workbook = load_workbook(excel_file, data_only=True)
+        sheet = workbook.active
+        
+        # Find header row containing "Ready Order Number"
+        header_row_index = None
+        for i, row in enumerate(sheet.iter_rows(min_row=1, max_row=10, values_only=True), start=1):
+            if any(cell and str(cell).strip() == 'Ready Order Number' for cell in row):
+                header_row_index = i
+                break
+        
+        if not header_row_index:
+            # Default to first row if not found
+            header_row_index = 1
+        
+        # Read data using pandas with correct header row
+        excel_file.seek(0)
+        df = pd.read_excel(excel_file, header=header_row_index - 1)
+        
+        # Convert to list of dictionaries
+        records = df.to_dict('records')
+        
+        # Clean up NaN values
+        for record in records:
+            for key, value in record.items():
+                if pd.isna(value):
+                    record[key] = ''
+        
+        return records
+    
+    except Exception as e:
+        print(f"Error parsing Excel file: {e}")
+        raise
+
+def parse_csv_file(content):
+    """Parse CSV file content and return as list of dictionaries"""
+    try:
+        csv_file = BytesIO(content)
+        
+        # Try UTF-8 first, then fall back to other encodings
+        try:
+            df = pd.read_csv(csv_file, encoding='utf-8')
+        except UnicodeDecodeError:
+            csv_file.seek(0)
+            try:
+                df = pd.read_csv(csv_file, encoding='latin-1')
+            except:
+                csv_file.seek(0)
+                df = pd.read_csv(csv_file, encoding='cp1252')
+        
+        # Convert to list of dictionaries
+        records = df.to_dict('records')
+        
+        # Clean up NaN values
+        for record in records:
+            for key, value in record.items():
+                if pd.isna(value):
+                    record[key] = ''
+        
+        return records
+    
+    except Exception as e:
+        print(f"Error parsing CSV file: {e}")
+        raise
+
+def records_to_csv_bytes(records, fieldnames):
+    """Convert list of dictionaries to CSV bytes"""
+    import csv
+    from io import StringIO
+    
+    # Use StringIO for text-based CSV writing
+    output = StringIO()
+    
+    writer = csv.DictWriter(
+        output,
+        fieldnames=fieldnames,
+        lineterminator='\n',
+        extrasaction='ignore'
+    )
+    
+    writer.writeheader()
+    writer.writerows(records)
+    
+    # Convert to bytes with UTF-8 BOM
+    csv_string = output.getvalue()
+    return '\ufeff'.encode('utf-8') + csv_string.encode('utf-8')
+
+def records_to_excel_bytes(records, fieldnames):
+    """Convert list of dictionaries to Excel bytes"""
+    from openpyxl import Workbook
+    from io import BytesIO
+    
+    # Create a new workbook
+    workbook = Workbook()
+    sheet = workbook.active
+    
+    # Write header
+    sheet.append(fieldnames)
+    
+    # Write data rows
+    for record in records:
+        row = []
+        for field in fieldnames:
+            value = record.get(field, '')
+            row.append(value)
+        sheet.append(row)
+    
+    # Save to bytes
+    excel_file = BytesIO()
+    workbook.save(excel_file)
+    excel_file.seek(0)
+    
+    return excel_file.read()
@@ -0,0 +1,87 @@
+import bisect
+import threading
+from datetime import datetime
+
+class FreeSlotIndex:
+    """Sorted list of free slot keys for nearest-free-slot lookups
+    
+    grid() returns the slot keys bookable today (see generate_time_slots);
+    it is rebuilt once per day. update(booked) applies the difference from
+    the last booked set to the list with bisect, so a booking or cancel
+    costs a bisect and one list insert or delete per changed slot instead of
+    a rebuild. nearest() finds the closest free slots to a time with one
+    O(log n) bisect.
+    
+    source is any object that identifies where booked came from (e.g. the
+    appointments snapshot table); is_current(source) tells callers they can
+    skip recomputing the booked set.
+    """
+    
+    def __init__(self, grid):
+        self.grid = grid
+        self._lock = threading.Lock()
+        self._free = []
+        self._grid = set()
+        self._booked = set()
+        self._day = None
+        self._source = None
+        
+        self.rebuilds = 0
+        self.updates = 0
+    
+    def is_current(self, source):
+        return source is not None and source is self._source and self._day == datetime.utcnow().date()
+    
+    def update(self, booked, source=None):
+        """Bring the free list in line with booked (the set of full slot keys)"""
+        with self._lock:
+            today = datetime.utcnow().date()
+            if self._day != today:
+                self._grid = set(self.grid())
+                self._booked = set(booked)
+                self._free = sorted(self._grid - self._booked)
+                self._day = today
+                self.rebuilds += 1
+            else:
+                booked = set(booked)
+                for key in self._booked - booked:
+                    if key in self._grid:
+                        bisect.insort(self._free, key)
+                for key in booked - self._booked:
+                    index = bisect.bisect_left(self._free, key)
+                    if index < len(self._free) and self._free[index] == key:
+                        del self._free[index]
+                self._booked = booked
+                self.updates += 1
+            self._source = source
+    
+    def nearest(self, key, count=3, same_day=False, not_before=None):
+        """Return up to count free slot keys closest to key, in time order
+        
+        With same_day only slots on key's date are considered; slots before
+        not_before (e.g. now) are skipped.
+        """
+        with self._lock:
+            free = self._free
+            low, high = 0, len(free)
+            if same_day:
+                low = bisect.bisect_left(free, key - key % 1440)
+                high = bisect.bisect_left(free, key - key % 1440 + 1440)
+            if not_before is not None:
+                low = max(low, bisect.bisect_left(free, not_before))
+            
+            # Walk outwards from key, taking the closer neighbour each time
+            before = bisect.bisect_left(free, key, low, max(low, high)) - 1
+            after = before + 1
+            result = []
+            while len(result) < count and (before >= low or after < high):
+                if after >= high or (before >= low and key - free[before] <= free[after] - key):
+                    result.append(free[before])
+                    before -= 1
+                else:
+                    result.append(free[after])
+                    after += 1
+            return sorted(result)
+    
+    def get_stats(self):
+        return {'free': len(self._free), 'rebuilds': self.rebuilds, 'updates': self.updates}
@@ -0,0 +1,44 @@
+import requests
+from requests.adapters import HTTPAdapter
+
+class TimeoutHTTPAdapter(HTTPAdapter):
+    """HTTPAdapter that applies a default timeout to every request
+    
+    requests waits forever by default, so a hung Graph connection would hold
+    a worker until gunicorn kills it.
+    """
+    
+    def __init__(self, timeout=None, **kwargs):
+        self.timeout = timeout
+        super().__init__(**kwargs)
+    
+    def send(self, request, **kwargs):
+        if kwargs.get('timeout') is None:
+            kwargs['timeout'] = self.timeout
+        return super().send(request, **kwargs)
+
+def create_graph_session(config):
+    """Create a pooled HTTP session for Microsoft Graph calls
+    
+    Reusing connections matters most in async mode, where one process can have
+    hundreds of bookings waiting on Graph at the same time.
+    """
+    pool_size = config.get('GRAPH_HTTP_POOL_SIZE', 10)
+    timeout = (
+        config.get('GRAPH_CONNECT_TIMEOUT_SECONDS', 5),
+        config.get('GRAPH_READ_TIMEOUT_SECONDS', 20)
+    )
+    
+    session = requests.Session()
+    adapter = TimeoutHTTPAdapter(timeout=timeout, pool_connections=4, pool_maxsize=pool_size)
+    session.mount('https://', adapter)
+    session.mount('http://', adapter)
+    return session
+
+def is_async_mode():
+    """True when running on gevent cooperative I/O (serve_async.py or gunicorn -k gevent)"""
+    try:
+        from gevent import monkey
+        return monkey.is_module_patched('socket')
+    except ImportError:
+        return False
@@ -0,0 +1,120 @@
+import fcntl
+import os
+import tempfile
+from datetime import datetime
+from services.storage import StorageBackend, StorageFileNotFound, VersionConflict
+
+class LocalStorageBackend(StorageBackend):
+    """Storage backend for files in a local directory (development, benchmarks, load tests)
+    
+    File paths such as '/Sunique Wiki/appointments.csv' are resolved inside
+    STORAGE_LOCAL_DIR. The version of a file is derived from its inode,
+    size and modification time; every write replaces the file atomically
+    (new inode) and every append makes it longer, so the version changes on
+    each change. Conditional writes and appends hold an flock on a sidecar
+    lock file so check-and-change is atomic across processes.
+    """
+    
+    name = 'local'
+    can_append = True
+    
+    def __init__(self, config):
+        super().__init__(config)
+        self.root = os.path.abspath(config.get('STORAGE_LOCAL_DIR') or 'data')
+        os.makedirs(self.root, exist_ok=True)
+    
+    def _read(self, path):
+        try:
+            with open(self._resolve(path), 'rb') as f:
+                return f.read()
+        except FileNotFoundError:
+            raise StorageFileNotFound(f"File not found: {path}")
+    
+    def get_metadata(self, path):
+        try:
+            stat = os.stat(self._resolve(path))
+        except FileNotFoundError:
+            raise StorageFileNotFound(f"File not found: {path}")
+        return {
+            'version': self._version(stat),
+            'size': stat.st_size,
+            'lastModified': datetime.fromtimestamp(stat.st_mtime).isoformat()
+        }
+    
+    def _read_if_changed(self, path, known_version=None, is_cached=None):
+        # Read and stat the same open file so content and version always match
+        try:
+            with open(self._resolve(path), 'rb') as f:
+                version = self._version(os.fstat(f.fileno()))
+                if known_version and version == known_version:
+                    return None, version
+                if is_cached and is_cached(path, version):
+                    return None, version
+                return f.read(), version
+        except FileNotFoundError:
+            raise StorageFileNotFound(f"File not found: {path}")
+    
+    def _read_range(self, path, start, known_version=None):
+        try:
+            with open(self._resolve(path), 'rb') as f:
+                version = self._version(os.fstat(f.fileno()))
+                if known_version and version == known_version:
+                    return None, version
+                f.seek(start)
+                return f.read(), version
+        except FileNotFoundError:
+            raise StorageFileNotFound(f"File not found: {path}")
+    
+    def write(self, path, content, if_match=None, create_only=False):
+        target = self._resolve(path)
+        directory = os.path.dirname(target)
+        os.makedirs(directory, exist_ok=True)
+        
+        with open(target + '.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            
+            if if_match or create_only:
+                try:
+                    current = self._version(os.stat(target))
+                except FileNotFoundError:
+                    current = None
+                if current != (if_match or None):
+                    raise VersionConflict()
+            
+            fd, temp_path = tempfile.mkstemp(dir=directory, suffix='.tmp')
+            try:
+                with os.fdopen(fd, 'wb') as f:
+                    f.write(content)
+                os.replace(temp_path, target)
+            except Exception:
+                if os.path.exists(temp_path):
+                    os.remove(temp_path)
+                raise
+            
+            return self._version(os.stat(target))
+    
+    def append(self, path, content, if_match):
+        target = self._resolve(path)
+        with open(target + '.lock', 'a') as lock:
+            fcntl.flock(lock, fcntl.LOCK_EX)
+            
+            try:
+                f = open(target, 'r+b')
+            except FileNotFoundError:
+                raise VersionConflict()
+            with f:
+                if self._version(os.fstat(f.fileno())) != if_match:
+                    raise VersionConflict()
+                f.seek(0, os.SEEK_END)
+                f.write(content)
+                f.flush()
+                return self._version(os.fstat(f.fileno()))
+    
+    def _resolve(self, path):
+        resolved = os.path.abspath(os.path.join(self.root, str(path).lstrip('/')))
+        if not resolved.startswith(self.root + os.sep):
+            raise ValueError(f"Path escapes the storage directory: {path}")
+        return resolved
+    
+    def _version(self, stat):
+        return f'"{stat.st_ino:x}-{stat.st_size:x}-{stat.st_mtime_ns:x}"'
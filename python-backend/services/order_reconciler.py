@@ -0,0 +1,85 @@
+from services.appointment_writer import MutationRejected, WritePending
+from services.record_table import RecordTable
+
+class OrderReconciler:
+    """Removes appointments of orders that have been picked up
+    
+    Each run compares the current orders snapshot with the one seen last
+    time. The picked-up order numbers are only recomputed when the orders
+    file changed, and a run with neither file changed does nothing. Any
+    appointment whose order is in the picked-up set, or which is missing its
+    order, date or time, is removed in a single batched 'remove' mutation.
+    
+    This keeps the admin list and order validation read-only: they no longer
+    write while serving a request.
+    
+    load_orders() returns (orders table, version); load_appointments()
+    returns (appointments, version); remove(order_numbers, drop_incomplete)
+    submits the removal; is_picked_up(order) decides the order status.
+    """
+    
+    def __init__(self, load_orders, load_appointments, remove, is_picked_up, key_field='Ready Order Number'):
+        self.load_orders = load_orders
+        self.load_appointments = load_appointments
+        self.remove = remove
+        self.is_picked_up = is_picked_up
+        self.key_field = key_field
+        
+        self._orders_version = None
+        self._appointments_version = None
+        self._picked_up = set()
+        
+        self.removed = 0
+        self.newly_picked_up = 0
+    
+    def run_once(self):
+        """Reconcile once; returns how many appointments were submitted for removal"""
+        orders, orders_version = self.load_orders()
+        appointments, appointments_version = self.load_appointments()
+        if orders_version == self._orders_version and appointments_version == self._appointments_version:
+            return 0
+        
+        if orders_version != self._orders_version:
+            picked_up = {
+                RecordTable.normalize_key(order.get(self.key_field))
+                for order in orders if self.is_picked_up(order)
+            }
+            if self._orders_version is not None:
+                newly = picked_up - self._picked_up
+                self.newly_picked_up += len(newly)
+                if newly:
+                    print(f"{len(newly)} order(s) picked up since the last orders snapshot")
+            self._picked_up = picked_up
+        
+        order_numbers = []
+        drop_incomplete = False
+        for appointment in appointments:
+            if not appointment.get('OrderNumber') or not appointment.get('Appointment_Date') or not appointment.get('Appointment_Time'):
+                drop_incomplete = True
+            elif RecordTable.normalize_key(appointment['OrderNumber']) in self._picked_up:
+                order_numbers.append(appointment['OrderNumber'])
+        
+        if order_numbers or drop_incomplete:
+            try:
+                self.remove(order_numbers, drop_incomplete)
+            except WritePending:
+                pass  # Committed in the background
+            except MutationRejected:
+                pass  # Removed meanwhile (cancelled by staff or the customer)
+            print(f"Reconciliation: removing appointments of {len(order_numbers)} picked-up order(s)"
+                  f"{' and incomplete rows' if drop_incomplete else ''}")
+            self.removed += len(order_numbers)
+            
+            # Our own removal changes the appointments version; look again next run
+            self._appointments_version = None
+        else:
+            self._appointments_version = appointments_version
+        self._orders_version = orders_version
+        return len(order_numbers)
+    
+    def get_stats(self):
+        return {
+            'pickedUpOrders': len(self._picked_up),
+            'newlyPickedUp': self.newly_picked_up,
+            'removed': self.removed
+        }
@@ -0,0 +1,88 @@
+import fcntl
+import os
+import tempfile
+import threading
+from datetime import datetime
+
+class PeriodicJob:
+    """Runs fn() every interval_seconds on a background thread, in one process only
+    
+    Every gunicorn worker starts the job, but only the one holding an
+    exclusive flock on lock_path runs it. The lock is kept for the life of
+    the process and released by the OS when it dies, so another worker
+    takes over at its next tick.
+    """
+    
+    def __init__(self, name, fn, interval_seconds, lock_path=None, startup_delay=60):
+        self.name = name
+        self.fn = fn
+        self.interval_seconds = interval_seconds
+        self.startup_delay = startup_delay
+        self.lock_path = lock_path or os.path.join(tempfile.gettempdir(), f"sunique-{name}.lock")
+        
+        self._thread = None
+        self._lock_file = None
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        
+        self.runs = 0
+        self.last_run_at = None
+        self.last_result = None
+        self.last_error = None
+    
+    def start(self):
+        """Start the background thread (call once per serving process)"""
+        if self._thread is None or not self._thread.is_alive():
+            self._stop.clear()
+            self._thread = threading.Thread(target=self._run, name=self.name, daemon=True)
+            self._thread.start()
+    
+    def stop(self, timeout=5):
+        """Stop the background thread and give up leadership (tests, shutdown)"""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join(timeout)
+        if self._lock_file is not None:
+            self._lock_file.close()
+            self._lock_file = None
+    
+    def trigger(self):
+        """Run the job now instead of at its next tick (only the leader process runs it)"""
+        self._wake.set()
+    
+    def get_stats(self):
+        return {
+            'runs': self.runs,
+            'lastRunAt': self.last_run_at,
+            'lastResult': self.last_result,
+            'lastError': self.last_error,
+            'leader': self._lock_file is not None
+        }
+    
+    def _run(self):
+        if self._stop.wait(self.startup_delay):
+            return
+        while not self._stop.is_set():
+            if self._is_leader():
+                try:
+                    self.last_result = self.fn()
+                    self.last_error = None
+                except Exception as e:
+                    self.last_error = str(e)
+                    print(f"Background job {self.name} failed: {e}")
+                self.runs += 1
+                self.last_run_at = datetime.now().isoformat(timespec='seconds')
+            self._wake.wait(self.interval_seconds)
+            self._wake.clear()
+    
+    def _is_leader(self):
+        if self._lock_file is None:
+            lock_file = open(self.lock_path, 'a')
+            try:
+                fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+            except OSError:
+                lock_file.close()
+                return False
+            self._lock_file = lock_file
+        return True
@@ -0,0 +1,328 @@
+import json
+import struct
+import sys
+from array import array
+from datetime import datetime, date, time
+
+class RecordTable:
+    """Read-only table of records packed into one contiguous buffer
+    
+    Rows from the orders/appointments sheets are stored column by column as
+    tagged UTF-8 cells plus offset arrays, with an optional sorted index on a
+    key column. The whole table is a single bytes object, so a snapshot loaded
+    in the gunicorn master is shared copy-on-write by every forked worker:
+    there are no per-cell Python objects whose reference counts would dirty the
+    shared pages. Cells are decoded on access.
+    
+    Buffer layout (all integers native unsigned 32-bit, sections 8-byte aligned):
+        header      magic, byte order, column count, row count, key column
+        directory   (offset, length) of every section
+        names       JSON list of column names
+        per column  offsets[row_count + 1], cell data
+        index       row ids sorted by normalized key, offsets, key data
+    """
+    
+    MAGIC = b'RTB1'
+    NO_KEY = 0xFFFFFFFF
+    
+    _HEADER = struct.Struct('<4scIII')
+    _SECTION = struct.Struct('<QQ')
+    
+    # Cell type tags (empty cells have no bytes at all)
+    _STR = b's'
+    _INT = b'i'
+    _FLOAT = b'f'
+    _BOOL = b'b'
+    _DATETIME = b'd'
+    _DATE = b'D'
+    _TIME = b't'
+    
+    def __init__(self, buffer):
+        self.buffer = buffer
+        self._view = memoryview(buffer)
+        
+        magic, byte_order, column_count, row_count, key_column = self._HEADER.unpack_from(self._view, 0)
+        if magic != self.MAGIC:
+            raise ValueError('Not a record table buffer')
+        if byte_order != self._byte_order():
+            raise ValueError('Record table was written on a machine with different byte order')
+        
+        self.row_count = row_count
+        self._key_column = None if key_column == self.NO_KEY else key_column
+        
+        # Section 0 is the column names, then (offsets, data) per column,
+        # then (row ids, key offsets, key data) when a key column exists
+        section_count = 1 + 2 * column_count + (3 if self._key_column is not None else 0)
+        position = self._HEADER.size
+        sections = []
+        for _ in range(section_count):
+            sections.append(self._SECTION.unpack_from(self._view, position))
+            position += self._SECTION.size
+        
+        names_start, names_length = sections[0]
+        self.columns = json.loads(bytes(self._view[names_start:names_start + names_length]).decode('utf-8'))
+        self._column_positions = {name: i for i, name in enumerate(self.columns)}
+        
+        self._column_offsets = []
+        self._column_data = []
+        for i in range(column_count):
+            self._column_offsets.append(self._section_ints(sections[1 + 2 * i]))
+            self._column_data.append(self._section_bytes(sections[2 + 2 * i]))
+        
+        if self._key_column is not None:
+            base = 1 + 2 * column_count
+            self._index_rows = self._section_ints(sections[base])
+            self._index_offsets = self._section_ints(sections[base + 1])
+            self._index_keys = self._section_bytes(sections[base + 2])
+    
+    @classmethod
+    def from_records(cls, records, key_field=None, columns=None):
+        """Pack a list of dicts into a RecordTable
+        
+        If key_field is given, rows can be looked up with find() using the same
+        normalization the app uses for order numbers (str, strip, upper).
+        """
+        if columns is None:
+            columns = []
+            seen = set()
+            for record in records:
+                for name in record:
+                    if name not in seen:
+                        seen.add(name)
+                        columns.append(str(name))
+        else:
+            columns = [str(name) for name in columns]
+        
+        # An empty sheet still gets its key column so find() works
+        if key_field is not None and key_field not in columns:
+            columns.append(key_field)
+        
+        key_column = columns.index(key_field) if key_field in columns else None
+        
+        column_sections = []
+        for name in columns:
+            offsets = array('I', [0])
+            data = bytearray()
+            for record in records:
+                data += cls._encode_cell(record.get(name, ''))
+                offsets.append(len(data))
+            column_sections.append((offsets, data))
+        
+        keys = None
+        if key_column is not None:
+            keys = [cls.normalize_key(record.get(key_field, '')) for record in records]
+        return cls._pack(columns, key_column, column_sections, keys, len(records))
+    
+    def merge(self, other, removed=()):
+        """Return a new table with other's rows applied to this one by key
+        
+        A row of other replaces the row with the same key in place, or is
+        appended if its key is new; rows whose key is in removed are dropped.
+        Both tables must have the same columns and key column. The rows that
+        didn't change are copied as already-encoded cells, so applying a few
+        changes to a large table neither decodes nor re-encodes the rest.
+        """
+        if self._key_column is None or other.columns != self.columns or other._key_column != self._key_column:
+            raise ValueError('Record tables must have the same columns and key column to merge')
+        
+        replacements = {}
+        for row, key in enumerate(other._row_keys()):
+            replacements.setdefault(key, row)
+        removed = {self.normalize_key(key) for key in removed}
+        
+        # (table, row) of every row of the result, in order
+        plan = []
+        keys = []
+        replaced = set()
+        for row, key in enumerate(self._row_keys()):
+            if key in replacements:
+                if key in replaced:
+                    continue
+                replaced.add(key)
+                plan.append((other, replacements[key]))
+            elif key in removed:
+                continue
+            else:
+                plan.append((self, row))
+            keys.append(key)
+        for key, row in replacements.items():
+            if key not in replaced:
+                plan.append((other, row))
+                keys.append(key)
+        
+        column_sections = []
+        for column in range(len(self.columns)):
+            offsets = array('I', [0])
+            data = bytearray()
+            for table, row in plan:
+                cell_offsets = table._column_offsets[column]
+                data += table._column_data[column][cell_offsets[row]:cell_offsets[row + 1]]
+                offsets.append(len(data))
+            column_sections.append((offsets, data))
+        return self._pack(self.columns, self._key_column, column_sections, keys, len(plan))
+    
+    @classmethod
+    def _pack(cls, columns, key_column, column_sections, keys, row_count):
+        """Lay out encoded columns ((offsets, data) per column) and the key index in one buffer"""
+        column_count = len(columns)
+        sections = [json.dumps(columns).encode('utf-8')]
+        for offsets, data in column_sections:
+            sections.append(offsets.tobytes())
+            sections.append(bytes(data))
+        
+        if key_column is not None:
+            # Stable sort keeps the first row in file order first among duplicates
+            order = sorted(range(row_count), key=lambda i: keys[i])
+            key_offsets = array('I', [0])
+            key_data = bytearray()
+            for i in order:
+                key_data += keys[i].encode('utf-8')
+                key_offsets.append(len(key_data))
+            sections.append(array('I', order).tobytes())
+            sections.append(key_offsets.tobytes())
+            sections.append(bytes(key_data))
+        
+        header = cls._HEADER.pack(
+            cls.MAGIC,
+            cls._byte_order(),
+            column_count,
+            row_count,
+            cls.NO_KEY if key_column is None else key_column
+        )
+        
+        position = cls._align(len(header) + cls._SECTION.size * len(sections))
+        directory = bytearray()
+        body = bytearray()
+        for section in sections:
+            directory += cls._SECTION.pack(position, len(section))
+            padding = cls._align(len(section)) - len(section)
+            body += section + b'\x00' * padding
+            position += len(section) + padding
+        
+        head = header + bytes(directory)
+        head += b'\x00' * (cls._align(len(head)) - len(head))
+        return cls(head + bytes(body))
+    
+    @staticmethod
+    def normalize_key(value):
+        """Normalize a key the way order numbers are compared (case-insensitive)"""
+        return str(value).strip().upper()
+    
+    def __len__(self):
+        return self.row_count
+    
+    def __iter__(self):
+        for row in range(self.row_count):
+            yield self.row(row)
+    
+    def row(self, row):
+        """Decode one row as a dict"""
+        return {name: self._cell(i, row) for i, name in enumerate(self.columns)}
+    
+    def value(self, row, column):
+        """Decode a single cell; missing columns read as empty string"""
+        position = self._column_positions.get(column)
+        if position is None:
+            return ''
+        return self._cell(position, row)
+    
+    def to_records(self):
+        """Decode every row as a list of fresh (mutable) dicts"""
+        return [self.row(row) for row in range(self.row_count)]
+    
+    def find(self, key):
+        """Return the first row whose key column matches key, or None"""
+        row = self.find_row(key)
+        return None if row is None else self.row(row)
+    
+    def find_row(self, key):
+        """Binary search the key index; returns a row number or None"""
+        if self._key_column is None:
+            raise ValueError('Record table has no key column')
+        
+        target = self.normalize_key(key)
+        low, high = 0, self.row_count
+        while low < high:
+            middle = (low + high) // 2
+            if self._index_key(middle) < target:
+                low = middle + 1
+            else:
+                high = middle
+        
+        if low < self.row_count and self._index_key(low) == target:
+            return self._index_rows[low]
+        return None
+    
+    def _row_keys(self):
+        """Normalized key of every row, in row order"""
+        keys = [None] * self.row_count
+        for position in range(self.row_count):
+            keys[self._index_rows[position]] = self._index_key(position)
+        return keys
+    
+    def _index_key(self, position):
+        start = self._index_offsets[position]
+        end = self._index_offsets[position + 1]
+        return str(self._index_keys[start:end], 'utf-8')
+    
+    def _cell(self, column, row):
+        offsets = self._column_offsets[column]
+        start = offsets[row]
+        end = offsets[row + 1]
+        data = self._column_data[column]
+        if end == start:
+            return ''
+        
+        tag = data[start:start + 1].tobytes()
+        text = str(data[start + 1:end], 'utf-8')
+        if tag == self._STR:
+            return text
+        if tag == self._INT:
+            return int(text)
+        if tag == self._FLOAT:
+            return float(text)
+        if tag == self._BOOL:
+            return text == '1'
+        if tag == self._DATETIME:
+            return datetime.fromisoformat(text)
+        if tag == self._DATE:
+            return date.fromisoformat(text)
+        if tag == self._TIME:
+            return time.fromisoformat(text)
+        return text
+    
+    @classmethod
+    def _encode_cell(cls, value):
+        if value is None or value == '':
+            return b''
+        if isinstance(value, bool):
+            return cls._BOOL + (b'1' if value else b'0')
+        if isinstance(value, int):
+            return cls._INT + str(value).encode('utf-8')
+        if isinstance(value, float):
+            return cls._FLOAT + repr(value).encode('utf-8')
+        if isinstance(value, datetime):
+            # pandas Timestamps are datetimes; store them as plain datetimes
+            if hasattr(value, 'to_pydatetime'):
+                value = value.to_pydatetime()
+            return cls._DATETIME + value.isoformat().encode('utf-8')
+        if isinstance(value, date):
+            return cls._DATE + value.isoformat().encode('utf-8')
+        if isinstance(value, time):
+            return cls._TIME + value.isoformat().encode('utf-8')
+        return cls._STR + str(value).encode('utf-8')
+    
+    def _section_bytes(self, section):
+        start, length = section
+        return self._view[start:start + length]
+    
+    def _section_ints(self, section):
+        return self._section_bytes(section).cast('I')
+    
+    @staticmethod
+    def _align(size):
+        return (size + 7) & ~7
+    
+    @staticmethod
+    def _byte_order():
+        return b'L' if sys.byteorder == 'little' else b'B'
@@ -0,0 +1,203 @@
+import json
+import os
+import tempfile
+import time
+from collections import deque
+from services.record_table import RecordTable
+
+class ReminderScheduler:
+    """Sends reminder emails ahead of every booked appointment
+    
+    send_times is a list of (kind, days_before, minute_of_day): e.g.
+    ('dayBefore', 1, 16 * 60) sends a reminder at 4 PM the day before the
+    appointment; list them in the order they go out. Times are slot keys
+    (minutes on the slot clock, see services/slot_keys.py). A reminder that
+    would go out at or after the appointment's start is not scheduled.
+    
+    Pending reminders sit in a timing wheel of one-minute buckets keyed by
+    send minute, so scheduling or cancelling one is a set add or discard.
+    Each run moves the buckets between the minute the wheel reached last
+    and now to the due queue. A reminder whose minute the wheel has already
+    passed when it is scheduled (e.g. for an appointment booked the evening
+    before) is not sent.
+    
+    Each run with a new appointments version diffs the appointments against
+    the ones seen last: a booking schedules its reminders, a cancel drops
+    them and a reschedule does both.
+    
+    At most max_per_minute reminders are sent in any 60 seconds, below the
+    Graph mailbox limit so confirmations still get through; the rest wait
+    for the next run. A failed send ends the run and is tried again on the
+    next one, until the appointment starts. When several reminders for one
+    appointment are due at once (e.g. after downtime), only the last is sent.
+    
+    With a path, the minute the wheel reached and the due queue are saved
+    there after each run, so a restart neither resends nor skips reminders;
+    the wheel itself is rebuilt from the appointments. The scheduler runs in
+    one process (a PeriodicJob), so the file isn't locked.
+    
+    load_appointments() returns (appointments, version); describe(appt)
+    returns (order number, slot key, customer email) or None;
+    send(kind, order_number, slot_key, email) returns the EmailService result.
+    """
+    
+    def __init__(self, load_appointments, describe, send, send_times, path=None, max_per_minute=20, clock=time.time):
+        self.load_appointments = load_appointments
+        self.describe = describe
+        self.send = send
+        self.send_times = list(send_times)
+        self.path = path
+        self.max_per_minute = max_per_minute
+        self.clock = clock
+        if path:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        
+        self._kinds = [kind for kind, _, _ in self.send_times]
+        self._buckets = {}
+        self._pending = {}
+        self._due = {}
+        self._appointments = {}
+        self._version = None
+        self._cursor = None
+        self._loaded = False
+        self._recent_sends = deque()
+        
+        self.sent = 0
+        self.failed = 0
+        self.skipped = 0
+        self.throttled = 0
+    
+    def run_once(self):
+        """Schedule reminders for changed appointments and send the due ones; returns how many were sent"""
+        if not self._loaded:
+            self._load()
+        now = int(self.clock() // 60)
+        if self._cursor is None:
+            # First start: reminders that were due before now are not sent
+            self._cursor = now
+        state = (self._cursor, list(self._due))
+        
+        appointments, version = self.load_appointments()
+        if version != self._version or version is None:
+            self._sync(appointments)
+            self._version = version
+        
+        self._advance(now)
+        sent = self._send_due(now)
+        if (self._cursor, list(self._due)) != state:
+            self._save()
+        return sent
+    
+    def get_stats(self):
+        return {
+            'scheduled': len(self._pending),
+            'due': len(self._due),
+            'sent': self.sent,
+            'failed': self.failed,
+            'skipped': self.skipped,
+            'throttled': self.throttled
+        }
+    
+    def _sync(self, appointments):
+        current = {}
+        for appt in appointments:
+            described = self.describe(appt)
+            if described and described[1] is not None:
+                current[RecordTable.normalize_key(described[0])] = described
+        
+        for key in self._appointments.keys() - current.keys():
+            self._unschedule(key)
+        for key, described in current.items():
+            previous = self._appointments.get(key)
+            if previous is None or previous[1] != described[1]:
+                if previous is not None:
+                    self._unschedule(key)
+                self._schedule(key, described[1])
+        self._appointments = current
+    
+    def _schedule(self, key, start):
+        day = start - start % 1440
+        for kind, days_before, minute_of_day in self.send_times:
+            minute = day - days_before * 1440 + minute_of_day
+            if self._cursor < minute < start:
+                self._pending[(key, kind)] = (minute, start)
+                self._buckets.setdefault(minute, set()).add((key, kind))
+    
+    def _unschedule(self, key):
+        for kind in self._kinds:
+            self._due.pop((key, kind), None)
+            entry = self._pending.pop((key, kind), None)
+            if entry is not None:
+                bucket = self._buckets[entry[0]]
+                bucket.discard((key, kind))
+                if not bucket:
+                    del self._buckets[entry[0]]
+    
+    def _advance(self, now):
+        for minute in range(self._cursor + 1, now + 1):
+            for reminder in self._buckets.pop(minute, ()):
+                self._due[reminder] = self._pending.pop(reminder)[1]
+        self._cursor = max(self._cursor, now)
+    
+    def _send_due(self, now):
+        sent = 0
+        for reminder, start in list(self._due.items()):
+            key, kind = reminder
+            appointment = self._appointments.get(key)
+            later_due = any((key, later) in self._due for later in self._kinds[self._kinds.index(kind) + 1:])
+            if appointment is None or appointment[1] != start or start <= now or later_due:
+                # Cancelled, moved, already started or superseded
+                del self._due[reminder]
+                self.skipped += 1
+                continue
+            
+            if not self._may_send():
+                self.throttled += 1
+                break
+            
+            order_number, _, email = appointment
+            result = self.send(kind, order_number, start, email)
+            if not result.get('success'):
+                self.failed += 1
+                print(f"Reminder for order {order_number} not sent: {result.get('message')}")
+                break
+            del self._due[reminder]
+            sent += 1
+        self.sent += sent
+        return sent
+    
+    def _may_send(self):
+        now = self.clock()
+        while self._recent_sends and self._recent_sends[0] <= now - 60:
+            self._recent_sends.popleft()
+        if len(self._recent_sends) >= self.max_per_minute:
+            return False
+        self._recent_sends.append(now)
+        return True
+    
+    def _load(self):
+        self._loaded = True
+        if not self.path or not os.path.exists(self.path):
+            return
+        try:
+            with open(self.path) as f:
+                state = json.load(f)
+        except (OSError, ValueError) as e:
+            print(f"Could not read the reminder state {self.path}: {e}")
+            return
+        self._cursor = state.get('cursor')
+        self._due = {(key, kind): start for key, kind, start in state.get('due', []) if kind in self._kinds}
+    
+    def _save(self):
+        if not self.path:
+            return
+        state = {'cursor': self._cursor, 'due': [[key, kind, start] for (key, kind), start in self._due.items()]}
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(state, f)
+            os.replace(temp_path, self.path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
@@ -1,13 +1,15 @@
 import msal
-import requests
-from io import BytesIO
-import pandas as pd
-from openpyxl import load_workbook
-from datetime import datetime, timedelta
+from services.http_session import create_graph_session
+from services.circuit_breaker import CircuitBreaker, SharePointUnavailable
+from services.storage import StorageBackend, StorageFileNotFound, StorageWriteError, VersionConflict
 
-class SharePointService:
+class SharePointService(StorageBackend):
+    """Storage backend for files in a SharePoint document library (Microsoft Graph)"""
+    
+    name = 'sharepoint'
+    
     def __init__(self, config):
-        self.config = config
+        super().__init__(config)
         self.client_id = config.get('CLIENT_ID')
         self.client_secret = config.get('CLIENT_SECRET')
         self.tenant_id = config.get('TENANT_ID')
@@ -17,88 +19,224 @@ class SharePointService:
         self.authority = f"https://login.microsoftonline.com/{self.tenant_id}"
         self.scope = ['https://graph.microsoft.com/.default']
         
-        self.app = msal.ConfidentialClientApplication(
-            self.client_id,
-            authority=self.authority,
-            client_credential=self.client_secret
-        )
+        # MSAL client is created on first token request so importing the app
+        # (benchmarks, scripts) does not trigger tenant discovery
+        self.app = None
+        
+        # Pooled HTTP session shared by all Graph calls
+        self.session = create_graph_session(config)
         
         # Cache for site ID (looked up once and reused)
         self._cached_site_id = None
+        
+        # Fail fast instead of waiting on timeouts while Graph is down
+        self.breaker = CircuitBreaker(
+            'SharePoint',
+            failure_threshold=config.get('CIRCUIT_FAILURE_THRESHOLD', 5),
+            reset_timeout=config.get('CIRCUIT_RESET_SECONDS', 30)
+        )
     
     def get_access_token(self):
         """Get Microsoft Graph API access token"""
+        if self.app is None:
+            self.app = msal.ConfidentialClientApplication(
+                self.client_id,
+                authority=self.authority,
+                client_credential=self.client_secret,
+                timeout=self.config.get('GRAPH_READ_TIMEOUT_SECONDS', 20)
+            )
+        
         result = self.app.acquire_token_silent(self.scope, account=None)
         
         if not result:
-            result = self.app.acquire_token_for_client(scopes=self.scope)
+            # Cached tokens are served locally; only a real token request is guarded
+            self.breaker.before_call()
+            try:
+                result = self.app.acquire_token_for_client(scopes=self.scope)
+            except Exception as e:
+                self.breaker.record_failure(e)
+                raise
+            self.breaker.record_success()
         
         if "access_token" in result:
             return result['access_token']
         else:
             raise Exception(f"Failed to acquire token: {result.get('error_description', 'Unknown error')}")
     
-    def get_file_content(self, file_path):
-        """Download file content from SharePoint"""
+    def check_available(self):
+        """Raise SharePointUnavailable if the circuit breaker is open (used before queueing writes)"""
+        self.breaker.check()
+    
+    def _graph_request(self, method, url, **kwargs):
+        """Send a Graph request through the circuit breaker
+        
+        Timeouts, connection errors, 429 and 5xx responses count as failures;
+        any other response (including 404 and 423) shows Graph is answering.
+        """
+        self.breaker.before_call()
+        try:
+            response = self.session.request(method, url, **kwargs)
+        except Exception as e:
+            self.breaker.record_failure(e)
+            raise
+        
+        if response.status_code == 429 or response.status_code >= 500:
+            self.breaker.record_failure(f"HTTP {response.status_code}")
+        else:
+            self.breaker.record_success()
+        return response
+    
+    def _item_url(self, file_path, suffix=''):
+        # Get cached site ID (only looks up once)
+        site_id = self._get_cached_site_id()
+        return f"https://graph.microsoft.com/v1.0/sites/{site_id}/drive/root:{file_path}{suffix}"
+    
+    def _read(self, file_path):
+        """Download file content from SharePoint (uncoalesced)"""
         try:
             token = self.get_access_token()
             headers = {'Authorization': f'Bearer {token}'}
             
-            # Get cached site ID (only looks up once)
-            site_id = self._get_cached_site_id()
-            
-            url = f"https://graph.microsoft.com/v1.0/sites/{site_id}/drive/root:{file_path}:/content"
-            response = requests.get(url, headers=headers)
+            response = self._graph_request('GET', self._item_url(file_path, ':/content'), headers=headers)
             
             if response.status_code == 200:
                 return response.content
+            elif response.status_code == 404:
+                raise StorageFileNotFound(f"File not found: {file_path}")
             else:
                 raise Exception(f"Failed to fetch file: {response.status_code} - {response.text}")
                 
+        except SharePointUnavailable:
+            raise
         except Exception as e:
             print(f"Error fetching file from SharePoint: {e}")
             raise
     
-    def upload_file_content(self, file_path, content):
-        """Upload file content to SharePoint with retry logic"""
-        max_retries = 5
-        
-        for attempt in range(1, max_retries + 1):
-            try:
-                token = self.get_access_token()
-                headers = {'Authorization': f'Bearer {token}'}
-                
-                # Get cached site ID (only looks up once)
-                site_id = self._get_cached_site_id()
-                
-                url = f"https://graph.microsoft.com/v1.0/sites/{site_id}/drive/root:{file_path}:/content"
-                response = requests.put(url, headers=headers, data=content)
+    def get_metadata(self, file_path):
+        """Get file version (eTag), size and last modified time"""
+        item = self._get_item(file_path)
+        return {
+            'version': item.get('eTag'),
+            'size': item.get('size'),
+            'lastModified': item.get('lastModifiedDateTime')
+        }
+    
+    def _get_item(self, file_path):
+        """Get the raw Graph driveItem (eTag, size, download URL, ...)"""
+        try:
+            token = self.get_access_token()
+            headers = {'Authorization': f'Bearer {token}'}
+            
+            response = self._graph_request('GET', self._item_url(file_path), headers=headers)
+            
+            if response.status_code == 200:
+                return response.json()
+            elif response.status_code == 404:
+                raise StorageFileNotFound(f"File not found: {file_path}")
+            else:
+                raise Exception(f"Failed to fetch file metadata: {response.status_code} - {response.text}")
                 
-                if response.status_code in [200, 201]:
-                    if attempt > 1:
-                        print(f"Upload succeeded on attempt {attempt}")
-                    return True
-                elif response.status_code == 423:  # Locked
-                    if attempt < max_retries:
-                        wait_time = 2 ** (attempt - 1)
-                        print(f"File locked, retrying in {wait_time}s... (attempt {attempt}/{max_retries})")
-                        import time
-                        time.sleep(wait_time)
-                        continue
-                else:
-                    raise Exception(f"Failed to upload file: {response.status_code} - {response.text}")
-                    
-            except Exception as e:
-                if attempt == max_retries:
-                    print(f"Error uploading file to SharePoint: {e}")
-                    raise
-                else:
-                    wait_time = 2 ** (attempt - 1)
-                    print(f"Upload failed, retrying in {wait_time}s... (attempt {attempt}/{max_retries})")
-                    import time
-                    time.sleep(wait_time)
+        except SharePointUnavailable:
+            raise
+        except Exception as e:
+            print(f"Error fetching file metadata from SharePoint: {e}")
+            raise
+    
+    def _read_if_changed(self, file_path, known_version=None, is_cached=None):
+        """Metadata check, then download through the item's pre-authenticated URL"""
+        item = self._get_item(file_path)
+        version = item.get('eTag')
+        
+        if known_version and version == known_version:
+            return None, version
+        
+        if is_cached and is_cached(file_path, version):
+            return None, version
+        
+        # Pre-authenticated URL; same request the /content redirect would make
+        download_url = item.get('@microsoft.graph.downloadUrl')
+        if not download_url:
+            return self.read(file_path), version
+        
+        response = self._graph_request('GET', download_url)
+        if response.status_code != 200:
+            raise Exception(f"Failed to fetch file: {response.status_code} - {response.text}")
+        return response.content, version
+    
+    def _read_range(self, file_path, start, known_version=None):
+        """Metadata check, then a Range request for the bytes from start on"""
+        item = self._get_item(file_path)
+        version = item.get('eTag')
+        
+        if known_version and version == known_version:
+            return None, version
+        
+        if start >= (item.get('size') or 0):
+            return b'', version
+        
+        download_url = item.get('@microsoft.graph.downloadUrl')
+        if not download_url:
+            return self.read(file_path)[start:], version
+        
+        response = self._graph_request('GET', download_url, headers={'Range': f'bytes={start}-'})
+        if response.status_code == 206:
+            return response.content, version
+        if response.status_code == 200:
+            # Range ignored; the whole file came back
+            return response.content[start:], version
+        if response.status_code == 416:
+            return b'', version
+        raise Exception(f"Failed to fetch file range: {response.status_code} - {response.text}")
+    
+    def reset_connections(self):
+        """Drop pooled connections and the MSAL client after a fork
+        
+        A worker forked from a preloaded master must not share the master's
+        open sockets; both are recreated on first use.
+        """
+        super().reset_connections()
+        self.session.close()
+        self.app = None
+    
+    def write(self, file_path, content, if_match=None, create_only=False):
+        """Upload file content to SharePoint in a single attempt
+        
+        Returns the eTag of the uploaded version. With if_match, the upload
+        only succeeds if the file is still at that eTag (VersionConflict
+        otherwise); with create_only, only if the file does not exist yet.
+        Raises StorageWriteError on failure; retrying (e.g. while
+        the file is locked) is left to the caller so no request thread sleeps
+        here.
+        """
+        try:
+            token = self.get_access_token()
+            headers = {'Authorization': f'Bearer {token}'}
+            if if_match:
+                headers['If-Match'] = if_match
+            elif create_only:
+                headers['If-None-Match'] = '*'
+            
+            response = self._graph_request('PUT', self._item_url(file_path, ':/content'), headers=headers, data=content)
+        except SharePointUnavailable:
+            raise
+        except Exception as e:
+            # Token, site lookup or network failure: worth another try later
+            raise StorageWriteError(f"Failed to upload file: {e}")
+        
+        if response.status_code in [200, 201]:
+            return response.json().get('eTag')
+        if response.status_code == 412:
+            raise VersionConflict()
+        if response.status_code == 423:
+            raise StorageWriteError('File is locked (open in Excel or another upload)', 423)
         
-        raise Exception(f"Failed to upload file after {max_retries} attempts")
+        # Throttling and server errors are transient; other client errors are not
+        retryable = response.status_code == 429 or response.status_code >= 500
+        raise StorageWriteError(
+            f"Failed to upload file: {response.status_code} - {response.text}",
+            response.status_code,
+            retryable
+        )
     
     def _get_cached_site_id(self):
         """Get SharePoint site ID (cached after first lookup)"""
@@ -126,7 +264,7 @@ class SharePointService:
             site_path = match.group(2)
             
             url = f"https://graph.microsoft.com/v1.0/sites/{hostname}:/sites/{site_path}"
-            response = requests.get(url, headers=headers)
+            response = self._graph_request('GET', url, headers=headers)
             
             if response.status_code == 200:
                 return response.json()['id']
@@ -136,122 +274,3 @@ class SharePointService:
         except Exception as e:
             print(f"Error getting site ID: {e}")
             raise
-    
-    def parse_excel_file(self, content):
-        """Parse Excel file content and return as list of dictionaries"""
-        try:
-            # Load Excel file from bytes
-            excel_file = BytesIO(content)
-            workbook = load_workbook(excel_file, data_only=True)
-            sheet = workbook.active
-            
-            # Find header row containing "Ready Order Number"
-            header_row_index = None
-            for i, row in enumerate(sheet.iter_rows(min_row=1, max_row=10, values_only=True), start=1):
-                if any(cell and str(cell).strip() == 'Ready Order Number' for cell in row):
-                    header_row_index = i
-                    break
-            
-            if not header_row_index:
-                # Default to first row if not found
-                header_row_index = 1
-            
-            # Read data using pandas with correct header row
-            excel_file.seek(0)
-            df = pd.read_excel(excel_file, header=header_row_index - 1)
-            
-            # Convert to list of dictionaries
-            records = df.to_dict('records')
-            
-            # Clean up NaN values
-            for record in records:
-                for key, value in record.items():
-                    if pd.isna(value):
-                        record[key] = ''
-            
-            return records
-            
-        except Exception as e:
-            print(f"Error parsing Excel file: {e}")
-            raise
-    
-    def parse_csv_file(self, content):
-        """Parse CSV file content and return as list of dictionaries"""
-        try:
-            csv_file = BytesIO(content)
-            
-            # Try UTF-8 first, then fall back to other encodings
-            try:
-                df = pd.read_csv(csv_file, encoding='utf-8')
-            except UnicodeDecodeError:
-                csv_file.seek(0)
-                try:
-                    df = pd.read_csv(csv_file, encoding='latin-1')
-                except:
-                    csv_file.seek(0)
-                    df = pd.read_csv(csv_file, encoding='cp1252')
-            
-            # Convert to list of dictionaries
-            records = df.to_dict('records')
-            
-            # Clean up NaN values
-            for record in records:
-                for key, value in record.items():
-                    if pd.isna(value):
-                        record[key] = ''
-            
-            return records
-            
-        except Exception as e:
-            print(f"Error parsing CSV file: {e}")
-            raise
-    
-    def records_to_csv_bytes(self, records, fieldnames):
-        """Convert list of dictionaries to CSV bytes"""
-        import csv
-        from io import StringIO
-        
-        # Use StringIO for text-based CSV writing
-        output = StringIO()
-        
-        writer = csv.DictWriter(
-            output,
-            fieldnames=fieldnames,
-            lineterminator='\n',
-            extrasaction='ignore'
-        )
-        
-        writer.writeheader()
-        writer.writerows(records)
-        
-        # Convert to bytes with UTF-8 BOM
-        csv_string = output.getvalue()
-        return '\ufeff'.encode('utf-8') + csv_string.encode('utf-8')
-    
-    def records_to_excel_bytes(self, records, fieldnames):
-        """Convert list of dictionaries to Excel bytes"""
-        from openpyxl import Workbook
-        from io import BytesIO
-        
-        # Create a new workbook
-        workbook = Workbook()
-        sheet = workbook.active
-        
-        # Write header
-        sheet.append(fieldnames)
-        
-        # Write data rows
-        for record in records:
-            row = []
-            for field in fieldnames:
-                value = record.get(field, '')
-                row.append(value)
-            sheet.append(row)
-        
-        # Save to bytes
-        excel_file = BytesIO()
-        workbook.save(excel_file)
-        excel_file.seek(0)
-        
-        return excel_file.read()
-
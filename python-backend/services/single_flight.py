@@ -0,0 +1,68 @@
+import threading
+from concurrent.futures import Future
+
+class SingleFlight:
+    """Coalesce concurrent calls that share a key into one execution
+    
+    The first caller for a key starts the function; callers that arrive while
+    it is still running get the same Future and receive the same result (or
+    exception). Waiting happens in the callers' own threads, never in a pool
+    worker, so coalesced callers can't starve the download pool.
+    """
+    
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._calls = {}
+        self.executed = 0
+        self.coalesced = 0
+    
+    def do(self, key, fn):
+        """Run fn() once for all concurrent callers with this key (inline for the first caller)"""
+        return self.submit(key, fn).result()
+    
+    def submit(self, key, fn, executor=None):
+        """Return a Future for fn(); concurrent callers with the same key share it
+        
+        The first caller runs fn inline, or on executor if one is given.
+        """
+        with self._lock:
+            call = self._calls.get(key)
+            if call is not None:
+                call[1] += 1
+                self.coalesced += 1
+                return call[0]
+            
+            future = Future()
+            call = [future, 0]
+            self._calls[key] = call
+            self.executed += 1
+        
+        def run():
+            try:
+                result = fn()
+            except BaseException as e:
+                self._finish(key, call)
+                future.set_exception(e)
+            else:
+                self._finish(key, call)
+                future.set_result(result)
+        
+        if executor is not None:
+            executor.submit(run)
+        else:
+            run()
+        return future
+    
+    def _finish(self, key, call):
+        with self._lock:
+            del self._calls[key]
+        if call[1]:
+            print(f"Coalesced {call[1]} concurrent request(s) for {key}")
+    
+    def get_stats(self):
+        """Executions vs. callers that piggybacked on an in-flight execution"""
+        return {
+            'executed': self.executed,
+            'coalesced': self.coalesced,
+            'inFlight': len(self._calls)
+        }
@@ -0,0 +1,70 @@
+"""Per-slot booking capacity (loading bays)
+
+A slot can take more than one booking when several orders can be loaded at
+once. Capacity comes from, in order of precedence:
+- a time-of-day rule, e.g. '12:00=1' (a shorter lunch crew)
+- a weekday rule, e.g. 'Fri=3'
+- the default
+
+This module only answers "how many bays does this slot have" (a couple of
+dict reads on the slot key). The bookings counted against that capacity
+are kept by DockSchedule (services/dock_schedule.py): a segment tree built
+once per appointments snapshot and updated on every book, cancel and
+reschedule, so a check or an update costs O(log n) in the number of grid
+slots rather than a recount of the appointments.
+"""
+
+from services.slot_keys import slot_key
+
+WEEKDAYS = ['mon', 'tue', 'wed', 'thu', 'fri', 'sat', 'sun']
+
+# 1970-01-01, day 0 of the slot keys, was a Thursday
+_EPOCH_WEEKDAY = 3
+
+def parse_rules(text, parse_key):
+    """Parse 'key=capacity,key=capacity' into a dict, converting keys with parse_key"""
+    rules = {}
+    for item in (text or '').split(','):
+        if not item.strip():
+            continue
+        key, _, value = item.partition('=')
+        rules[parse_key(key.strip())] = int(value)
+    return rules
+
+def parse_weekday(text):
+    weekday = text[:3].lower()
+    if weekday not in WEEKDAYS:
+        raise ValueError(f"Unknown weekday in slot capacity rule: {text}")
+    return WEEKDAYS.index(weekday)
+
+def parse_time_of_day(text):
+    minute = slot_key('1970-01-01', text)
+    if minute is None:
+        raise ValueError(f"Unknown time in slot capacity rule: {text}")
+    return minute
+
+class SlotCapacity:
+    """How many bookings each slot key can take"""
+    
+    def __init__(self, default=1, by_weekday=None, by_time=None):
+        self.default = default
+        self.by_weekday = by_weekday or {}
+        self.by_time = by_time or {}
+    
+    @classmethod
+    def from_config(cls, default, by_weekday='', by_time=''):
+        """Build from settings such as by_weekday='Mon=2,Fri=3' and by_time='12:00=1'"""
+        return cls(default, parse_rules(by_weekday, parse_weekday), parse_rules(by_time, parse_time_of_day))
+    
+    def capacity(self, key):
+        minute = key % 1440
+        if minute in self.by_time:
+            return self.by_time[minute]
+        return self.by_weekday.get((key // 1440 + _EPOCH_WEEKDAY) % 7, self.default)
+    
+    def get_stats(self):
+        return {
+            'default': self.default,
+            'byWeekday': {WEEKDAYS[day].capitalize(): capacity for day, capacity in self.by_weekday.items()},
+            'byTime': {f"{minute // 60:02d}:{minute % 60:02d}": capacity for minute, capacity in self.by_time.items()}
+        }
@@ -0,0 +1,146 @@
+import json
+import queue
+import threading
+import time
+from services.slot_keys import slot_key_to_iso
+
+class SlotEventHub:
+    """Pushes slot-taken / slot-freed changes to open booking calendars
+    
+    Each open calendar holds a server-sent events stream (stream()) fed by
+    its own queue. publish(booked) compares a set of full slot keys (no
+    capacity left) with the one published last and queues the differences
+    to every stream, as {'taken': [...], 'freed': [...]} lists of ISO slot
+    times. Changes outside visible_keys() (the bookable slots right now) are
+    not sent.
+    
+    Commits made by this process publish right away. While any stream is
+    open, a watcher thread also reloads the booked slots every poll_seconds
+    (load_booked(), served from the snapshot cache) to pick up commits made
+    by other workers. The SharePoint traffic is that one check per process,
+    however many calendars are open.
+    
+    Every stream holds a connection (and, outside async mode, a thread), so
+    at most max_streams are open per process, and each one ends after
+    stream_seconds; the browser then reconnects on its own.
+    """
+    
+    # Sent to the browser as the EventSource reconnect delay
+    RECONNECT_MS = 5000
+    
+    def __init__(self, load_booked, visible_keys, poll_seconds=5, max_streams=0,
+                 stream_seconds=300, heartbeat_seconds=15):
+        self.load_booked = load_booked
+        self.visible_keys = visible_keys
+        self.poll_seconds = poll_seconds
+        self.max_streams = max_streams
+        self.stream_seconds = stream_seconds
+        self.heartbeat_seconds = heartbeat_seconds
+        
+        self._lock = threading.Lock()
+        self._subscribers = set()
+        self._booked = None
+        self._generation = 0
+        self._thread = None
+        
+        self.events = 0
+        self.polls = 0
+        self.rejected = 0
+    
+    def publish(self, booked):
+        """Push the difference between booked (a set of full slot keys) and the last published set"""
+        with self._lock:
+            self._publish(booked)
+    
+    def subscribe(self):
+        """Register an open calendar; returns its queue, or None if max_streams are already open"""
+        with self._lock:
+            if len(self._subscribers) >= self.max_streams:
+                self.rejected += 1
+                return None
+            subscriber = queue.Queue()
+            self._subscribers.add(subscriber)
+            if self._thread is None:
+                self._thread = threading.Thread(target=self._watch, name='slot-events', daemon=True)
+                self._thread.start()
+            return subscriber
+    
+    def unsubscribe(self, subscriber):
+        with self._lock:
+            self._subscribers.discard(subscriber)
+    
+    def stream(self, subscriber):
+        """Yield the server-sent events for one subscriber until stream_seconds have passed"""
+        deadline = time.time() + self.stream_seconds
+        try:
+            yield f"retry: {self.RECONNECT_MS}\n\n"
+            while True:
+                remaining = deadline - time.time()
+                if remaining <= 0:
+                    return
+                try:
+                    event = subscriber.get(timeout=min(self.heartbeat_seconds, remaining))
+                except queue.Empty:
+                    # Comment line: keeps proxies from closing an idle connection
+                    # and lets the server notice a closed tab
+                    yield ": keep-alive\n\n"
+                    continue
+                yield f"event: slots\ndata: {json.dumps(event)}\n\n"
+        finally:
+            self.unsubscribe(subscriber)
+    
+    def get_stats(self):
+        return {
+            'streams': len(self._subscribers),
+            'maxStreams': self.max_streams,
+            'events': self.events,
+            'polls': self.polls,
+            'rejected': self.rejected
+        }
+    
+    def _publish(self, booked):
+        self._generation += 1
+        if not self._subscribers:
+            # Nothing to diff for; the watcher takes a fresh baseline when a stream opens
+            self._booked = None
+            return
+        
+        previous, self._booked = self._booked, set(booked)
+        if previous is None:
+            return
+        
+        visible = self.visible_keys()
+        taken = sorted((self._booked - previous) & visible)
+        freed = sorted((previous - self._booked) & visible)
+        if not taken and not freed:
+            return
+        
+        event = {
+            'taken': [slot_key_to_iso(key) for key in taken],
+            'freed': [slot_key_to_iso(key) for key in freed]
+        }
+        for subscriber in self._subscribers:
+            subscriber.put(event)
+        self.events += 1
+    
+    def _watch(self):
+        while True:
+            generation = self._generation
+            try:
+                booked = self.load_booked()
+            except Exception as e:
+                booked = None
+                print(f"Could not refresh booked slots for live updates: {e}")
+            
+            with self._lock:
+                if not self._subscribers:
+                    # Nobody is listening; start from a fresh baseline next time
+                    self._booked = None
+                    self._thread = None
+                    return
+                # Skip a load that raced with a commit published meanwhile
+                if booked is not None and generation == self._generation:
+                    self._publish(booked)
+                self.polls += 1
+            
+            time.sleep(self.poll_seconds)
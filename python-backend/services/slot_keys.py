@@ -0,0 +1,39 @@
+"""Integer slot keys for appointment times
+
+A slot key is the number of minutes since 1970-01-01 00:00 of an
+appointment's date and time, on the same (naive, UTC-labelled) clock the
+app uses for slot ISO strings such as '2030-01-08T09:00:00Z'. Keys are
+computed once when the appointments are loaded, so comparing, sorting and
+set lookups on booked slots no longer re-parse date and time strings.
+"""
+
+from datetime import date, datetime, timedelta
+
+EPOCH = datetime(1970, 1, 1)
+_EPOCH_ORDINAL = EPOCH.toordinal()
+
+def slot_key(date_value, time_value):
+    """Slot key of a stored appointment date ('YYYY-MM-DD' or date) and time ('09:00 AM'); None if unparseable"""
+    try:
+        if isinstance(date_value, date):
+            day = date_value.toordinal()
+        else:
+            text = str(date_value).strip()[:10]
+            day = date(int(text[0:4]), int(text[5:7]), int(text[8:10])).toordinal()
+        
+        text = str(time_value).strip().upper()
+        meridiem = text[-2:] if text.endswith(('AM', 'PM')) else ''
+        hour, minute = text[:len(text) - len(meridiem)].strip().split(':')[:2]
+        hour = int(hour) % 12 + (12 if meridiem == 'PM' else 0) if meridiem else int(hour)
+        return (day - _EPOCH_ORDINAL) * 1440 + hour * 60 + int(minute)
+    except (ValueError, IndexError):
+        return None
+
+def slot_key_from_iso(iso_time):
+    """Slot key of an ISO slot time such as '2030-01-08T09:00:00Z'"""
+    dt = datetime.fromisoformat(iso_time.replace('Z', '+00:00')).replace(tzinfo=None)
+    return (dt.toordinal() - _EPOCH_ORDINAL) * 1440 + dt.hour * 60 + dt.minute
+
+def slot_key_to_iso(key):
+    """ISO slot time of a slot key, in the format generate_time_slots() uses"""
+    return (EPOCH + timedelta(minutes=key)).isoformat() + 'Z'
@@ -0,0 +1,239 @@
+import threading
+import time
+from datetime import datetime
+from services.snapshot_store import SnapshotDiskStore
+from services.storage import StorageFileNotFound
+
+class Snapshot:
+    """Parsed contents of one SharePoint file at a known version (eTag)"""
+    __slots__ = ('path', 'version', 'data', 'loaded_at', 'checked_at')
+    
+    def __init__(self, path, version, data):
+        self.path = path
+        self.version = version
+        self.data = data
+        self.loaded_at = time.time()
+        self.checked_at = self.loaded_at
+
+class SnapshotCache:
+    """Version-aware cache of parsed files from the storage backend
+    
+    A snapshot younger than SNAPSHOT_TTL_SECONDS is served as-is. Older ones are
+    revalidated with a metadata request and only re-downloaded and re-parsed
+    when the file's eTag changed.
+    
+    Paths registered with persist() are also written to SNAPSHOT_DIR and
+    memory-mapped back, so a restarted or newly started worker picks up the
+    last version without downloading or parsing anything.
+    
+    A parser with a refresh(snapshot) method (services/appointment_log.py)
+    reads the file itself, e.g. fetching only bytes appended since the
+    snapshot, and returns (data, version).
+    
+    If revalidation fails (SharePoint down, circuit breaker open), the last
+    known good snapshot is served instead and get_freshness() reports it as
+    stale until a later revalidation succeeds.
+    """
+    
+    def __init__(self, storage, config):
+        self.storage = storage
+        self.ttl = config.get('SNAPSHOT_TTL_SECONDS', 5)
+        self._snapshots = {}
+        self._lock = threading.Lock()
+        
+        snapshot_dir = config.get('SNAPSHOT_DIR')
+        self.disk_store = SnapshotDiskStore(snapshot_dir) if snapshot_dir else None
+        # path -> schema key of the columns it is parsed into
+        self._persisted = {}
+        
+        # path -> error for paths currently served from a stale snapshot
+        self._degraded = {}
+    
+    def persist(self, path, columns):
+        """Keep on-disk, memory-mapped copies of path's snapshots (RecordTable data only)
+        
+        columns are the ones the parser keeps; copies stored with other
+        columns (e.g. before a config change) are not used.
+        """
+        if self.disk_store and path:
+            self._persisted[path] = SnapshotDiskStore.schema_key(columns)
+    
+    def get(self, path, parser, max_age=None):
+        """Get parsed data for path; parser(content) builds it on a fresh download"""
+        result = self.get_many([(path, parser)], max_age=max_age)[path]
+        if isinstance(result, Exception):
+            raise result
+        return result
+    
+    def get_many(self, files, max_age=None):
+        """Get several snapshots, revalidating stale ones in parallel
+        
+        files is a list of (path, parser). Returns a dict of path -> data, or
+        the exception raised while loading that path.
+        """
+        max_age = self.ttl if max_age is None else max_age
+        now = time.time()
+        
+        results = {}
+        stale = {}
+        for path, parser in files:
+            snapshot = self._snapshots.get(path)
+            if snapshot is None and path in self._persisted:
+                snapshot = self._load_from_disk(path)
+            if snapshot and now - snapshot.checked_at < max_age:
+                results[path] = snapshot.data
+            else:
+                stale[path] = (parser, snapshot)
+        
+        if not stale:
+            return results
+        
+        if len(stale) == 1:
+            # No pool needed (also keeps the gunicorn master thread-free before fork)
+            path, (parser, snapshot) = next(iter(stale.items()))
+            try:
+                results[path] = self.storage.coalesce(
+                    self._flight_key(path, snapshot),
+                    lambda: self._load(path, parser, snapshot)
+                )[0]
+            except Exception as e:
+                results[path] = self._last_known_good(path, snapshot, e)
+            return results
+        
+        # Concurrent callers holding the same version share one metadata
+        # check, download and parse per file
+        loaded = self.storage.gather({
+            path: self.storage.coalesce_in_background(
+                self._flight_key(path, snapshot),
+                lambda path=path, parser=parser, snapshot=snapshot: self._load(path, parser, snapshot)
+            )
+            for path, (parser, snapshot) in stale.items()
+        })
+        for path, result in loaded.items():
+            if isinstance(result, Exception):
+                results[path] = self._last_known_good(path, stale[path][1], result)
+            else:
+                results[path] = result[0]
+        return results
+    
+    def get_latest(self, path, parser):
+        """Revalidate path now and return (data, version)
+        
+        Unlike get(), this never falls back to a stale snapshot, so the
+        version can be used for a conditional write of changes made to data.
+        """
+        snapshot = self._snapshots.get(path)
+        if snapshot is None and path in self._persisted:
+            snapshot = self._load_from_disk(path)
+        return self.storage.coalesce(
+            self._flight_key(path, snapshot),
+            lambda: self._load(path, parser, snapshot)
+        )
+    
+    def get_freshness(self, paths):
+        """Describe how current the data served for paths is
+        
+        stale is True while any of them is served from a last known good
+        snapshot because SharePoint could not be reached; asOf is when the
+        oldest of them was last confirmed current.
+        """
+        snapshots = [self._snapshots[path] for path in paths if path in self._snapshots]
+        if not snapshots:
+            return {'stale': False, 'asOf': None, 'ageSeconds': None}
+        
+        checked_at = min(snapshot.checked_at for snapshot in snapshots)
+        return {
+            'stale': any(path in self._degraded for path in paths),
+            'asOf': datetime.fromtimestamp(checked_at).isoformat(timespec='seconds'),
+            'ageSeconds': round(time.time() - checked_at)
+        }
+    
+    def _last_known_good(self, path, snapshot, error):
+        """Serve the previous snapshot when revalidation failed; otherwise return the error"""
+        if snapshot is None or isinstance(error, StorageFileNotFound):
+            return error
+        
+        if path not in self._degraded:
+            print(f"Serving last known good snapshot of {path} ({error})")
+        self._degraded[path] = str(error)
+        return snapshot.data
+    
+    def _flight_key(self, path, snapshot):
+        return ('snapshot', path, snapshot.version if snapshot else None)
+    
+    def _load(self, path, parser, snapshot):
+        started_at = time.time()
+        if hasattr(parser, 'refresh'):
+            data, version = parser.refresh(snapshot)
+            if snapshot and data is snapshot.data:
+                snapshot.checked_at = time.time()
+                self._degraded.pop(path, None)
+            else:
+                self.put(path, data, version, as_of=started_at)
+            return data, version
+        
+        known_version = snapshot.version if snapshot else None
+        content, version = self.storage.read_if_changed(
+            path, known_version, is_cached=self._is_on_disk)
+        
+        if content is None and snapshot and snapshot.version == version:
+            snapshot.checked_at = time.time()
+            self._degraded.pop(path, None)
+            return snapshot.data, version
+        
+        data = None
+        if content is None:
+            # Another worker already stored this version on disk
+            data = self.disk_store.load(path, version, self._persisted[path])
+            if data is None:
+                content = self.storage.read(path)
+        if data is None:
+            data = parser(content)
+        
+        self.put(path, data, version, as_of=started_at)
+        return data, version
+    
+    def put(self, path, data, version, as_of=None):
+        """Store data for path, e.g. right after this process uploaded it
+        
+        as_of is when the data was read; it is dropped if a newer snapshot
+        (such as our own upload) was stored while the read was in flight.
+        """
+        current = self._snapshots.get(path)
+        if as_of and current and current.loaded_at > as_of and current.version != version:
+            return
+        
+        if path in self._persisted and version:
+            try:
+                data = self.disk_store.save(path, version, data, self._persisted[path])
+            except Exception as e:
+                print(f"Could not write snapshot of {path} to disk: {e}")
+        
+        with self._lock:
+            self._snapshots[path] = Snapshot(path, version, data)
+        self._degraded.pop(path, None)
+    
+    def invalidate(self, path):
+        """Force the next read of path to revalidate"""
+        with self._lock:
+            self._snapshots.pop(path, None)
+    
+    def get_snapshot(self, path):
+        """Return the cached Snapshot for path (or None) without revalidating"""
+        return self._snapshots.get(path)
+    
+    def _is_on_disk(self, path, version):
+        return path in self._persisted and self.disk_store.has(path, version, self._persisted[path])
+    
+    def _load_from_disk(self, path):
+        """Adopt the newest on-disk snapshot of path (treated as fresh for one TTL)"""
+        stored = self.disk_store.load_latest(path, self._persisted[path])
+        if not stored:
+            return None
+        
+        version, data = stored
+        snapshot = Snapshot(path, version, data)
+        with self._lock:
+            self._snapshots.setdefault(path, snapshot)
+        print(f"Loaded {path} snapshot from disk ({len(data)} rows)")
+        return self._snapshots[path]
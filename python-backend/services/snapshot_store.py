@@ -0,0 +1,116 @@
+import hashlib
+import json
+import mmap
+import os
+import tempfile
+from services.record_table import RecordTable
+
+class SnapshotDiskStore:
+    """On-disk copies of parsed snapshots, keyed by SharePoint path, schema and eTag
+    
+    Each version is the RecordTable's packed columnar buffer written as-is to
+    <dir>/<path hash>-<schema hash>-<eTag hash>.rtb, plus a small
+    <path hash>.json pointer to the latest version. Loading memory-maps the
+    file instead of reading it, so restarts skip the download and parse
+    entirely, and every worker on the host shares the same page-cache pages.
+    
+    The schema is the list of columns the table is parsed into (see
+    schema_key()); a snapshot stored under another schema, e.g. by a deploy
+    that kept different columns, is ignored and the file parsed again.
+    """
+    
+    # Older versions kept around for workers that still have them mapped
+    KEEP_VERSIONS = 2
+    
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+    
+    @staticmethod
+    def schema_key(columns):
+        """Hash of the parsed columns and the RecordTable format"""
+        schema = json.dumps([RecordTable.MAGIC.decode('ascii'), list(columns or [])])
+        return hashlib.sha1(schema.encode('utf-8')).hexdigest()[:16]
+    
+    def load_latest(self, path, schema):
+        """Return (version, RecordTable) for the newest stored version of path, or None"""
+        try:
+            with open(self._pointer_file(path)) as f:
+                pointer = json.load(f)
+        except (OSError, ValueError):
+            return None
+        if pointer.get('schema') != schema:
+            return None
+        
+        table = self.load(path, pointer.get('version'), schema)
+        if table is None:
+            return None
+        return pointer['version'], table
+    
+    def load(self, path, version, schema):
+        """Memory-map the stored table for (path, version) under schema; None if not stored"""
+        data_file = self._data_file(path, version, schema)
+        try:
+            with open(data_file, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            return RecordTable(mapped)
+        except (OSError, ValueError) as e:
+            if os.path.exists(data_file):
+                print(f"Ignoring unreadable snapshot {data_file}: {e}")
+            return None
+    
+    def has(self, path, version, schema):
+        """True if (path, version) is already stored under schema, e.g. by another worker"""
+        return bool(version) and os.path.exists(self._data_file(path, version, schema))
+    
+    def save(self, path, version, table, schema):
+        """Write table for (path, version) and return it re-opened as a memory map"""
+        data_file = self._data_file(path, version, schema)
+        
+        # Write to a temp file and rename so readers never see a partial file
+        self._write_atomic(data_file, table.buffer)
+        self._write_atomic(self._pointer_file(path), json.dumps({
+            'path': path,
+            'version': version,
+            'schema': schema,
+            'file': os.path.basename(data_file)
+        }).encode('utf-8'))
+        
+        self._remove_old_versions(path, keep=data_file)
+        return self.load(path, version, schema) or table
+    
+    def _remove_old_versions(self, path, keep):
+        prefix = self._path_key(path) + '-'
+        candidates = []
+        for name in os.listdir(self.directory):
+            full = os.path.join(self.directory, name)
+            if name.startswith(prefix) and name.endswith('.rtb') and full != keep:
+                candidates.append((os.path.getmtime(full), full))
+        
+        # Unlinking a file another worker still has mapped is safe on POSIX
+        for _, full in sorted(candidates, reverse=True)[self.KEEP_VERSIONS - 1:]:
+            try:
+                os.remove(full)
+            except OSError:
+                pass
+    
+    def _write_atomic(self, target, content):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(temp_path, target)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    
+    def _path_key(self, path):
+        return hashlib.sha1(path.encode('utf-8')).hexdigest()[:16]
+    
+    def _pointer_file(self, path):
+        return os.path.join(self.directory, self._path_key(path) + '.json')
+    
+    def _data_file(self, path, version, schema):
+        version_key = hashlib.sha1(str(version).encode('utf-8')).hexdigest()[:16]
+        return os.path.join(self.directory, f"{self._path_key(path)}-{schema}-{version_key}.rtb")
@@ -0,0 +1,175 @@
+from concurrent.futures import ThreadPoolExecutor
+from services.http_session import is_async_mode
+from services.single_flight import SingleFlight
+
+class StorageFileNotFound(Exception):
+    """The requested file does not exist in the storage backend"""
+
+class StorageWriteError(Exception):
+    """A failed write; retryable ones (locked, throttled, outage, conflict) may succeed later"""
+    
+    def __init__(self, message, status_code=None, retryable=True):
+        super().__init__(message)
+        self.message = message
+        self.status_code = status_code
+        self.retryable = retryable
+
+class VersionConflict(StorageWriteError):
+    """A conditional write found a newer version than the one it was based on"""
+    
+    def __init__(self, message='File changed since it was read'):
+        super().__init__(message, 412, retryable=True)
+
+class StorageBackend:
+    """Where the orders and appointments files live
+    
+    Backends implement three primitives:
+        _read(path)                      -> content bytes
+        get_metadata(path)               -> {'version', 'size', 'lastModified'}
+        write(path, content, if_match, create_only) -> new version
+    and may override _read_if_changed() and _read_range() when they can do
+    better than a metadata check followed by a full read. Backends that can
+    add bytes to the end of a file set can_append and implement append().
+    
+    Versions are opaque strings (the SharePoint eTag, or a stat-based token
+    for local files). A write with if_match fails with VersionConflict when
+    the file is no longer at that version, and one with create_only when
+    the file already exists (someone created it first); missing files raise
+    StorageFileNotFound. The base class adds request coalescing and the
+    download pool shared by every backend.
+    """
+    
+    name = 'storage'
+    
+    # Only backends with a remote dependency have a circuit breaker
+    breaker = None
+    
+    # Whether append() is supported; otherwise appending means writing the whole file
+    can_append = False
+    
+    def __init__(self, config):
+        self.config = config
+        
+        # Bounded pool for reading several files at once (created on first use)
+        self._fetch_pool = None
+        
+        # Concurrent requests for the same file share one read (and parse)
+        self.single_flight = SingleFlight()
+    
+    def read(self, path):
+        """Return the content of path
+        
+        Concurrent calls for the same path share one in-flight read.
+        """
+        return self.coalesce(('content', path), lambda: self._read(path))
+    
+    def read_if_changed(self, path, known_version=None, is_cached=None):
+        """Read path only if its version differs from known_version
+        
+        Returns (content, version). content is None when the file is unchanged,
+        so an up-to-date cache costs one metadata lookup. If given,
+        is_cached(path, version) can report that the caller already has the
+        new version elsewhere (e.g. on disk) and the read is skipped.
+        Concurrent calls for the same path and known version share one request.
+        """
+        return self.coalesce(
+            ('if_changed', path, known_version),
+            lambda: self._read_if_changed(path, known_version, is_cached)
+        )
+    
+    def read_range(self, path, start, known_version=None):
+        """Read path from byte offset start to the end, if its version differs from known_version
+        
+        Returns (content, version) like read_if_changed(); content is b'' when
+        the file is shorter than start. Used to fetch only the new tail of an
+        append-only file.
+        """
+        return self.coalesce(
+            ('range', path, start, known_version),
+            lambda: self._read_range(path, start, known_version)
+        )
+    
+    def get_metadata(self, path):
+        raise NotImplementedError
+    
+    def write(self, path, content, if_match=None, create_only=False):
+        raise NotImplementedError
+    
+    def append(self, path, content, if_match):
+        """Add content to the end of path if it is still at version if_match; returns the new version"""
+        raise NotImplementedError
+    
+    def _read(self, path):
+        raise NotImplementedError
+    
+    def _read_if_changed(self, path, known_version=None, is_cached=None):
+        version = self.get_metadata(path)['version']
+        if known_version and version == known_version:
+            return None, version
+        if is_cached and is_cached(path, version):
+            return None, version
+        return self._read(path), version
+    
+    def _read_range(self, path, start, known_version=None):
+        content, version = self._read_if_changed(path, known_version)
+        return (None if content is None else content[start:]), version
+    
+    def coalesce(self, key, fn):
+        """Run fn() once for all concurrent callers with the same key (e.g. path and version)"""
+        return self.single_flight.do(key, fn)
+    
+    def coalesce_in_background(self, key, fn):
+        """Like coalesce, but the first caller's fn runs on the fetch pool; returns a Future"""
+        return self.single_flight.submit(key, fn, executor=self._get_fetch_pool())
+    
+    def gather(self, futures):
+        """Wait for a dict of key -> Future; returns key -> result or the exception raised"""
+        results = {}
+        for key, future in futures.items():
+            try:
+                results[key] = future.result()
+            except Exception as e:
+                results[key] = e
+        return results
+    
+    def get_stats(self):
+        """Read coalescing counters, reported by /api/health"""
+        return dict(self.single_flight.get_stats(), backend=self.name)
+    
+    def check_available(self):
+        """Raise if writes should be refused up front (see SharePointService)"""
+    
+    def reset_connections(self):
+        """Drop per-process resources after a fork"""
+        self._fetch_pool = None
+    
+    def _get_fetch_pool(self):
+        """Get the fetch pool, sized for the serving mode
+        
+        In async mode the pool's threads are greenlets, so it is sized to the
+        number of in-flight requests rather than a handful of OS threads.
+        Created lazily because gunicorn's gevent worker patches threading
+        after a preloaded app has been imported.
+        """
+        if self._fetch_pool is None:
+            max_workers = self.config.get('SHAREPOINT_FETCH_MAX_WORKERS', 4)
+            if is_async_mode():
+                max_workers = max(max_workers, 2 * self.config.get('ASYNC_WORKER_CONNECTIONS', 500))
+            self._fetch_pool = ThreadPoolExecutor(
+                max_workers=max_workers,
+                thread_name_prefix=f'{self.name}-fetch'
+            )
+        return self._fetch_pool
+
+def create_storage_backend(config):
+    """Create the backend selected by STORAGE_BACKEND ('sharepoint' or 'local')"""
+    backend = (config.get('STORAGE_BACKEND') or 'sharepoint').lower()
+    
+    if backend == 'sharepoint':
+        from services.sharepoint_service import SharePointService
+        return SharePointService(config)
+    if backend == 'local':
+        from services.local_storage import LocalStorageBackend
+        return LocalStorageBackend(config)
+    
+    raise ValueError(f"Unknown STORAGE_BACKEND: {backend}")
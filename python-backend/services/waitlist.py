@@ -0,0 +1,180 @@
+import bisect
+import fcntl
+import itertools
+import json
+import os
+import tempfile
+import threading
+import time
+from contextlib import contextmanager
+from services.record_table import RecordTable
+
+class Waitlist:
+    """Orders waiting for a slot on a fully booked day
+    
+    Each day has its own queue, a list of (requestedAt, sequence, order key)
+    kept sorted with bisect, so the order that has waited longest is at the
+    head and an order's position is one binary search for its item. An
+    entry is a dict with orderNumber, date ('YYYY-MM-DD'), customerEmail,
+    durationMinutes and requestedAt (epoch seconds); an order waits for one
+    day at a time.
+    
+    With a path, the waitlist is kept in that JSON file so every gunicorn
+    worker sees the same queues: each call re-reads the file (when it
+    changed) under an exclusive flock, and changes are written back
+    atomically before the lock is released. Without a path it lives in this
+    process only.
+    """
+    
+    def __init__(self, path=None):
+        self.path = path
+        if path:
+            os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+        self._lock = threading.Lock()
+        self._days = {}
+        self._entries = {}
+        self._items = {}
+        self._sequence = itertools.count()
+        self._mtime = None
+        
+        self.revision = 0
+        self.joined = 0
+        self.left = 0
+        self.expired = 0
+    
+    def join(self, entry):
+        """Add entry (replacing the order's entry for another day); returns (entry, position)
+        
+        Joining again for the same day keeps the original place in the queue.
+        """
+        key = RecordTable.normalize_key(entry['orderNumber'])
+        with self._transaction() as changed:
+            existing = self._entries.get(key)
+            if existing is None or existing['date'] != entry['date']:
+                if existing is not None:
+                    self._remove(key)
+                entry = dict(entry, requestedAt=entry.get('requestedAt') or time.time())
+                self._add(entry)
+                self.joined += 1
+                changed.append(key)
+            return self._entries[key], self._position(key)
+    
+    def leave(self, order_number):
+        """Remove the order's entry; returns it, or None if the order wasn't waiting"""
+        key = RecordTable.normalize_key(order_number)
+        with self._transaction() as changed:
+            if key not in self._entries:
+                return None
+            self.left += 1
+            changed.append(key)
+            return self._remove(key)
+    
+    def get(self, order_number):
+        """Return (entry, position) for the order, or (None, None)"""
+        key = RecordTable.normalize_key(order_number)
+        with self._transaction():
+            if key not in self._entries:
+                return None, None
+            return self._entries[key], self._position(key)
+    
+    def waiting(self, date):
+        """Entries waiting for date, head of the queue first"""
+        with self._transaction():
+            return [self._entries[key] for _, _, key in self._days.get(date, [])]
+    
+    def days(self):
+        """Dates with at least one waiting order, in date order"""
+        with self._transaction():
+            return sorted(self._days)
+    
+    def expire(self, before_date):
+        """Drop the queues of days before before_date; returns how many entries were dropped"""
+        with self._transaction() as changed:
+            for date in [d for d in self._days if d < before_date]:
+                for _, _, key in list(self._days[date]):
+                    changed.append(key)
+                    self._remove(key)
+            self.expired += len(changed)
+            return len(changed)
+    
+    def get_stats(self):
+        return {
+            'waiting': len(self._entries),
+            'days': len(self._days),
+            'joined': self.joined,
+            'left': self.left,
+            'expired': self.expired
+        }
+    
+    def _add(self, entry):
+        key = RecordTable.normalize_key(entry['orderNumber'])
+        self._entries[key] = entry
+        self._items[key] = (entry['requestedAt'], next(self._sequence), key)
+        bisect.insort(self._days.setdefault(entry['date'], []), self._items[key])
+    
+    def _remove(self, key):
+        entry = self._entries.pop(key)
+        queue = self._days[entry['date']]
+        del queue[bisect.bisect_left(queue, self._items.pop(key))]
+        if not queue:
+            del self._days[entry['date']]
+        return entry
+    
+    def _position(self, key):
+        """1-based place of the order in its day's queue"""
+        queue = self._days[self._entries[key]['date']]
+        return 1 + bisect.bisect_left(queue, self._items[key])
+    
+    @contextmanager
+    def _transaction(self):
+        """Hold the waitlist (across workers with a path); yields a list to append changed keys to"""
+        changed = []
+        with self._lock:
+            if not self.path:
+                yield changed
+                if changed:
+                    self.revision += 1
+                return
+            
+            with open(self.path + '.lock', 'a') as lock_file:
+                fcntl.flock(lock_file, fcntl.LOCK_EX)
+                self._reload()
+                yield changed
+                if changed:
+                    self._save()
+    
+    def _reload(self):
+        try:
+            mtime = os.stat(self.path).st_mtime_ns
+        except FileNotFoundError:
+            mtime = None
+        if mtime == self._mtime:
+            return
+        
+        self._days = {}
+        self._entries = {}
+        self._items = {}
+        if mtime is not None:
+            try:
+                with open(self.path) as f:
+                    entries = json.load(f)
+            except (OSError, ValueError) as e:
+                print(f"Could not read the waitlist {self.path}: {e}")
+                entries = []
+            for entry in entries:
+                self._add(entry)
+        self._mtime = mtime
+        self.revision += 1
+    
+    def _save(self):
+        fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(self.path) or '.', suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'w') as f:
+                json.dump(list(self._entries.values()), f)
+            os.replace(temp_path, self.path)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+        self._mtime = os.stat(self.path).st_mtime_ns
+        self.revision += 1
@@ -0,0 +1,107 @@
+from datetime import datetime
+from services.appointment_writer import MutationRejected, WritePending
+from services.slot_keys import slot_key_from_iso, slot_key_to_iso
+
+class WaitlistPromoter:
+    """Books freed slots for orders on the waitlist
+    
+    Each run walks the queue of every day with waiting orders from the
+    head, and books each order into the earliest start time that day with
+    room for its whole appointment. A later order only gets a time the ones
+    ahead of it could not use (e.g. a gap shorter than they need).
+    notify(entry, slot_time) runs once the booking is saved.
+    
+    An order that can no longer be booked (picked up, or booked by the
+    customer meanwhile) is dropped from the waitlist. A slot taken between
+    the check and the write (409) is counted as one more booking in this
+    run's schedule, and the order tries the next time with room. Queues of
+    past days are dropped. A run with neither the appointments nor the
+    waitlist changed does nothing.
+    
+    load_appointments() returns (appointments, version); build_schedule
+    (appointments) returns a DockSchedule of the bookable slots;
+    is_bookable(order_number) checks the order against the orders snapshot;
+    book(entry, slot_time) submits the booking.
+    """
+    
+    def __init__(self, waitlist, load_appointments, build_schedule, is_bookable, book, notify):
+        self.waitlist = waitlist
+        self.load_appointments = load_appointments
+        self.build_schedule = build_schedule
+        self.is_bookable = is_bookable
+        self.book = book
+        self.notify = notify
+        
+        self._seen = None
+        
+        self.promoted = 0
+        self.dropped = 0
+    
+    def run_once(self):
+        """Promote waiting orders into free slots; returns how many were booked"""
+        self.waitlist.expire(datetime.utcnow().strftime('%Y-%m-%d'))
+        days = self.waitlist.days()
+        if not days:
+            return 0
+        
+        appointments, version = self.load_appointments()
+        if (version, self.waitlist.revision) == self._seen:
+            return 0
+        
+        schedule = self.build_schedule(appointments)
+        promoted = 0
+        for date in days:
+            day_start = slot_key_from_iso(f"{date}T00:00:00Z")
+            for entry in self.waitlist.waiting(date):
+                duration = entry.get('durationMinutes') or schedule.interval
+                start = schedule.first_fit(day_start, day_start + 1440, duration)
+                if start is None:
+                    continue
+                if not self.is_bookable(entry['orderNumber']):
+                    self._drop(entry, 'order can no longer be booked')
+                    continue
+                
+                slot_time = self._book(entry, schedule, day_start, start, duration)
+                if slot_time is None:
+                    continue
+                self.waitlist.leave(entry['orderNumber'])
+                promoted += 1
+                print(f"Waitlist: booked order {entry['orderNumber']} into {slot_time}")
+        
+        self.promoted += promoted
+        # Our own bookings change the appointments version; look again next run
+        self._seen = None if promoted else (version, self.waitlist.revision)
+        return promoted
+    
+    def get_stats(self):
+        return dict(self.waitlist.get_stats(), promoted=self.promoted, dropped=self.dropped)
+    
+    def _book(self, entry, schedule, day_start, start, duration):
+        """Book entry at start, or at the next start with room after a 409; returns the slot time or None"""
+        while start is not None:
+            slot_time = slot_key_to_iso(start)
+            try:
+                self.book(entry, slot_time)
+            except WritePending as pending:
+                # Journaled; the customer hears about it once it lands
+                pending.on_commit(lambda _, slot_time=slot_time: self.notify(entry, slot_time))
+            except MutationRejected as e:
+                if e.status_code != 409:
+                    self._drop(entry, e.message)
+                    return None
+                # Someone else's booking we haven't read yet; each one found
+                # this way fills the schedule further, so this ends
+                schedule.add(start, duration)
+                start = schedule.first_fit(day_start, day_start + 1440, duration)
+                continue
+            else:
+                self.notify(entry, slot_time)
+            
+            schedule.add(start, duration)
+            return slot_time
+        return None
+    
+    def _drop(self, entry, reason):
+        print(f"Waitlist: dropping order {entry['orderNumber']} ({reason})")
+        self.waitlist.leave(entry['orderNumber'])
+        self.dropped += 1
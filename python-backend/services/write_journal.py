@@ -0,0 +1,141 @@
+import fcntl
+import glob
+import json
+import os
+import tempfile
+import threading
+import time
+import uuid
+
+class WriteJournal:
+    """Append-only, fsync'd journal of appointment mutations not yet uploaded
+    
+    Every mutation is appended (and fsync'd) before it is queued for upload,
+    and a 'done' record is appended once it was committed, rejected or given
+    up on. A process that dies in between leaves unconfirmed entries behind,
+    which the next process replays with recover().
+    
+    Each process writes its own journal-<pid>.jsonl and holds an exclusive
+    flock on it while alive, so a journal whose lock can be taken belongs to
+    a dead process. The file is created and locked under a temporary name
+    and only then renamed into place, so no other process ever sees it
+    unlocked. The file is truncated whenever nothing is unconfirmed,
+    so it stays a few lines long.
+    """
+    
+    def __init__(self, directory):
+        self.directory = directory
+        os.makedirs(directory, exist_ok=True)
+        self._file = None
+        self._pid = None
+        self._unconfirmed = set()
+        self._lock = threading.Lock()
+    
+    def append(self, mutation):
+        """Durably record a mutation before it is queued; returns its journal id"""
+        entry_id = uuid.uuid4().hex
+        with self._lock:
+            self._write({'id': entry_id, 'mutation': mutation, 'at': time.time()})
+            self._unconfirmed.add(entry_id)
+        return entry_id
+    
+    def confirm(self, entry_ids, outcome):
+        """Record that entries need no replay (outcome: committed, rejected or failed)"""
+        entry_ids = [entry_id for entry_id in entry_ids if entry_id]
+        if not entry_ids:
+            return
+        
+        with self._lock:
+            self._write({'done': entry_ids, 'outcome': outcome, 'at': time.time()})
+            self._unconfirmed.difference_update(entry_ids)
+            if not self._unconfirmed:
+                self._file.truncate(0)
+    
+    def recover(self, resubmit):
+        """Replay unconfirmed entries left by dead processes; returns how many
+        
+        resubmit(mutation) must journal the mutation again (in this process's
+        journal) before the orphaned journal file is removed.
+        """
+        own_path = self._path()
+        if (self._file is None or self._pid != os.getpid()) and os.path.exists(own_path):
+            self._set_aside(own_path)
+        
+        replayed = 0
+        for path in sorted(glob.glob(os.path.join(self.directory, 'journal-*.jsonl'))):
+            if path == own_path:
+                continue
+            
+            try:
+                f = open(path, 'r+')
+            except OSError:
+                continue
+            try:
+                try:
+                    fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    continue  # Owner is still running
+                
+                # Another process may have replayed and removed it meanwhile
+                if not os.path.exists(path) or os.stat(path).st_ino != os.fstat(f.fileno()).st_ino:
+                    continue
+                
+                for mutation in self._read_unconfirmed(f):
+                    resubmit(mutation)
+                    replayed += 1
+                os.remove(path)
+            finally:
+                f.close()
+        return replayed
+    
+    def pending_count(self):
+        return len(self._unconfirmed)
+    
+    def _read_unconfirmed(self, f):
+        entries = {}
+        for line in f:
+            try:
+                record = json.loads(line)
+            except ValueError:
+                continue  # Torn last line from a crash mid-write
+            if 'mutation' in record:
+                entries[record['id']] = record['mutation']
+            for entry_id in record.get('done', []):
+                entries.pop(entry_id, None)
+        return list(entries.values())
+    
+    def _write(self, record):
+        f = self._open()
+        f.write(json.dumps(record) + '\n')
+        f.flush()
+        os.fsync(f.fileno())
+    
+    def _open(self):
+        # Opened lazily (and reopened after fork) so each process owns its own file
+        if self._file is None or self._pid != os.getpid():
+            self._pid = os.getpid()
+            self._unconfirmed = set()
+            path = self._path()
+            if os.path.exists(path):
+                self._set_aside(path)
+            
+            # A file created under its final name could be taken by another
+            # process's recover() (and removed) before we lock it
+            fd, temp_path = tempfile.mkstemp(dir=self.directory, prefix='.journal-', suffix='.tmp')
+            f = os.fdopen(fd, 'a')
+            try:
+                fcntl.flock(f, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                os.rename(temp_path, path)
+            except OSError:
+                f.close()
+                os.remove(temp_path)
+                raise
+            self._file = f
+        return self._file
+    
+    def _set_aside(self, path):
+        # Left by a dead process that had our pid; renamed so it is replayed too
+        os.replace(path, os.path.join(self.directory, f"journal-{os.getpid()}-{uuid.uuid4().hex[:8]}.jsonl"))
+    
+    def _path(self):
+        return os.path.join(self.directory, f"journal-{os.getpid()}.jsonl")
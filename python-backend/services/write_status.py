@@ -0,0 +1,77 @@
+import json
+import os
+import tempfile
+import threading
+import time
+
+class WriteStatusStore:
+    """Status of appointment writes that outlived their request
+    
+    A write that is still retrying when the request answers 202 gets a
+    write id; its status ('pending', then 'committed' or 'failed') is kept
+    here so the client can poll for the outcome. When a directory is given,
+    each status is also written there as <write id>.json so a poll can be
+    answered by any gunicorn worker, not just the one holding the write.
+    """
+    
+    # Finished statuses are kept this long for clients still polling
+    RETENTION_SECONDS = 3600
+    
+    def __init__(self, directory=None):
+        self.directory = directory
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        self._statuses = {}
+        self._lock = threading.Lock()
+    
+    def record(self, write_id, status, **details):
+        """Set the status of write_id (extra details such as message are returned by get)"""
+        entry = dict(details, writeId=write_id, status=status, updatedAt=time.time())
+        with self._lock:
+            self._statuses[write_id] = entry
+            self._prune()
+        
+        if self.directory:
+            try:
+                self._write_atomic(self._status_file(write_id), json.dumps(entry).encode('utf-8'))
+            except OSError as e:
+                print(f"Could not store write status {write_id}: {e}")
+    
+    def get(self, write_id):
+        """Return the status dict for write_id, or None if unknown or expired"""
+        entry = self._statuses.get(write_id)
+        if entry is None and self.directory and self._is_valid_id(write_id):
+            try:
+                with open(self._status_file(write_id)) as f:
+                    entry = json.load(f)
+            except (OSError, ValueError):
+                return None
+        return entry
+    
+    def _prune(self):
+        cutoff = time.time() - self.RETENTION_SECONDS
+        for write_id in [k for k, v in self._statuses.items() if v['updatedAt'] < cutoff]:
+            del self._statuses[write_id]
+            if self.directory:
+                try:
+                    os.remove(self._status_file(write_id))
+                except OSError:
+                    pass
+    
+    def _write_atomic(self, target, content):
+        fd, temp_path = tempfile.mkstemp(dir=self.directory, suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                f.write(content)
+            os.replace(temp_path, target)
+        except Exception:
+            if os.path.exists(temp_path):
+                os.remove(temp_path)
+            raise
+    
+    def _is_valid_id(self, write_id):
+        # Ids come from the URL; only accept the hex ids we generate
+        return bool(write_id) and len(write_id) <= 64 and all(c in '0123456789abcdef' for c in write_id)
+    
+    def _status_file(self, write_id):
+        return os.path.join(self.directory, f"{write_id}.json")
@@ -0,0 +1,5 @@
+import os
+import sys
+
+# Import app and services the way gunicorn does, from python-backend/
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
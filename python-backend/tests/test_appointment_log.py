@@ -0,0 +1,128 @@
+import pytest
+
+from services.appointment_log import AppointmentLog
+from services.local_storage import LocalStorageBackend
+from services.snapshot_cache import Snapshot
+from services.storage import VersionConflict
+
+PATH = '/appointments.csv'
+FIELDS = ['OrderNumber', 'Appointment_Date', 'Appointment_Time']
+
+@pytest.fixture
+def storage(tmp_path):
+    return LocalStorageBackend({'STORAGE_LOCAL_DIR': str(tmp_path)})
+
+def open_log(storage):
+    return AppointmentLog(storage, PATH, 'OrderNumber', FIELDS)
+
+def refresh(log, snapshot=None):
+    table, version = log.refresh(snapshot)
+    return Snapshot(PATH, version, table)
+
+def orders(snapshot):
+    return sorted((r['OrderNumber'], r['Appointment_Time']) for r in snapshot.data.to_records())
+
+def appointment(order_number, time='09:00 AM'):
+    return {'OrderNumber': order_number, 'Appointment_Date': '2025-01-06', 'Appointment_Time': time}
+
+def test_replays_set_delete_and_compact_lines(storage):
+    storage.write(PATH, (
+        'Op,OrderNumber,Appointment_Date,Appointment_Time,Recorded_At\n'
+        'set,SO-1,2025-01-06,09:00 AM,\n'
+        'compact,,,,\n'
+        'set,SO-2,2025-01-06,09:00 AM,\n'
+        'set,SO-3,2025-01-06,10:00 AM,\n'
+        'set,so-2,2025-01-06,11:00 AM,\n'
+        'delete,SO-3,,,\n'
+    ).encode('utf-8'))
+    
+    snapshot = refresh(open_log(storage))
+    assert orders(snapshot) == [('so-2', '11:00 AM')]
+
+def test_plain_csv_is_rewritten_as_a_log_on_first_save(storage):
+    storage.write(PATH, b'OrderNumber,Appointment_Date,Appointment_Time\nSO-1,2025-01-06,09:00 AM\n')
+    log = open_log(storage)
+    snapshot = refresh(log)
+    assert orders(snapshot) == [('SO-1', '09:00 AM')]
+    
+    log.save(snapshot.data.to_records() + [appointment('SO-2')], snapshot.version)
+    assert log.compactions == 1
+    assert storage.read(PATH).decode('utf-8-sig').startswith('Op,')
+    assert orders(refresh(open_log(storage))) == [('SO-1', '09:00 AM'), ('SO-2', '09:00 AM')]
+
+def test_other_workers_read_only_the_appended_tail(storage):
+    writer, reader = open_log(storage), open_log(storage)
+    _, version = writer.save([appointment('SO-1'), appointment('SO-2')], None)
+    seen = refresh(reader)
+    
+    writer.save([appointment('SO-1', '01:00 PM')], version)
+    # Appended: one 'set' line for the move and one 'delete' line
+    assert storage.read(PATH).decode('utf-8').count('\n') == 6
+    
+    seen = refresh(reader, seen)
+    assert orders(seen) == [('SO-1', '01:00 PM')]
+    assert reader.tail_reads == 1
+    assert reader.full_reads == 1
+
+def test_unchanged_log_keeps_the_snapshot(storage):
+    log = open_log(storage)
+    log.save([appointment('SO-1')], None)
+    snapshot = refresh(log)
+    assert refresh(log, snapshot).data is snapshot.data
+
+def test_long_log_is_compacted_and_readers_start_over(storage, monkeypatch):
+    monkeypatch.setattr(AppointmentLog, 'COMPACT_MIN_LINES', 10)
+    writer, reader = open_log(storage), open_log(storage)
+    version = None
+    for minute in range(8):
+        _, version = writer.save([appointment('SO-1', f'09:{minute:02d} AM'), appointment('SO-2')], version)
+    seen = refresh(reader)
+    _, version = writer.save([appointment('SO-1', '09:00 AM'), appointment('SO-2'), appointment('SO-3')], version)
+    assert writer.compactions == 2
+    
+    lines = storage.read(PATH).decode('utf-8-sig').splitlines()
+    assert lines[1].startswith('compact,')
+    assert len(lines) == 5
+    
+    seen = refresh(reader, seen)
+    assert orders(seen) == [('SO-1', '09:00 AM'), ('SO-2', '09:00 AM'), ('SO-3', '09:00 AM')]
+    assert reader.full_reads == 2
+
+def test_save_on_a_stale_version_conflicts(storage):
+    log = open_log(storage)
+    log.save([appointment('SO-1')], None)
+    with pytest.raises(VersionConflict):
+        log.save([appointment('SO-2')], 'stale')
+
+def test_tail_read_merges_only_the_changed_rows(storage):
+    writer = open_log(storage)
+    tails = []
+    reader = AppointmentLog(storage, PATH, 'OrderNumber', FIELDS,
+                            on_tail=lambda previous, table, changes: tails.append((previous, table, changes)))
+    _, version = writer.save([appointment('SO-1'), appointment('SO-2')], None)
+    seen = refresh(reader)
+    
+    writer.save([appointment('SO-1', '01:00 PM'), appointment('SO-3')], version)
+    newer = refresh(reader, seen)
+    assert orders(newer) == [('SO-1', '01:00 PM'), ('SO-3', '09:00 AM')]
+    assert newer.data.find('so-3')['OrderNumber'] == 'SO-3'
+    assert newer.data.find('SO-2') is None
+    
+    (previous, table, changes), = tails
+    assert previous is seen.data and table is newer.data
+    assert {(old and old['OrderNumber'], new and new['OrderNumber']) for old, new in changes} == {
+        ('SO-1', 'SO-1'), ('SO-2', None), (None, 'SO-3')}
+
+def test_save_appends_only_the_new_lines(storage, monkeypatch):
+    log = open_log(storage)
+    _, version = log.save([appointment('SO-1')], None)
+    
+    def write(*args, **kwargs):
+        raise AssertionError('appending should not rewrite the file')
+    monkeypatch.setattr(storage, 'write', write)
+    _, version = log.save([appointment('SO-1'), appointment('SO-2')], version)
+    
+    assert storage.read(PATH).decode('utf-8-sig').splitlines()[-1].startswith('set,SO-2,')
+    assert orders(refresh(open_log(storage))) == [('SO-1', '09:00 AM'), ('SO-2', '09:00 AM')]
+    with pytest.raises(VersionConflict):
+        log.save([appointment('SO-3')], 'stale')
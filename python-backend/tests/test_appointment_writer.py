@@ -0,0 +1,216 @@
+import os
+import sys
+import threading
+import time
+from concurrent.futures import wait
+
+import pytest
+
+from services.appointment_writer import GroupCommitWriter, MutationRejected, WritePending
+from services.storage import StorageWriteError, VersionConflict
+from services.write_status import WriteStatusStore
+
+class FakeFile:
+    """An appointments file saved with If-Match on its version"""
+    
+    def __init__(self):
+        self.rows = []
+        self.version = 1
+        self.saves = []
+    
+    def load(self):
+        return list(self.rows), self.version
+    
+    def save(self, appointments, version):
+        if version != self.version:
+            raise VersionConflict()
+        self.saves.append(list(appointments))
+        self.rows = list(appointments)
+        self.version += 1
+
+def book(appointments, mutation):
+    if mutation['slot'] in appointments:
+        raise MutationRejected('This time slot is no longer available', 409)
+    appointments.append(mutation['slot'])
+    return mutation['slot']
+
+# Writers made by a test, stopped after it
+writers = []
+
+@pytest.fixture(autouse=True)
+def stop_writers():
+    yield
+    while writers:
+        writers.pop().stop()
+
+def make_writer(file, **kwargs):
+    options = {'window_seconds': 0.05, 'ack_timeout': 5}
+    options.update(kwargs)
+    writer = GroupCommitWriter(file.load, book, file.save, **options)
+    # Retry quickly
+    writer.RETRY_BASE_SECONDS = 0.01
+    writers.append(writer)
+    return writer
+
+def test_mutations_in_one_window_share_one_upload():
+    file = FakeFile()
+    writer = make_writer(file)
+    
+    futures = [writer.submit_async({'op': 'book', 'slot': slot}) for slot in range(5)]
+    wait(futures, timeout=5)
+    
+    assert [future.result() for future in futures] == list(range(5))
+    assert file.saves == [[0, 1, 2, 3, 4]]
+    assert writer.get_stats()['uploads'] == 1
+    assert writer.get_stats()['largestBatch'] == 5
+
+def test_rejected_mutation_fails_alone():
+    file = FakeFile()
+    writer = make_writer(file)
+    
+    futures = [writer.submit_async({'op': 'book', 'slot': slot}) for slot in (1, 1, 2)]
+    wait(futures, timeout=5)
+    
+    assert futures[0].result() == 1
+    with pytest.raises(MutationRejected) as rejected:
+        futures[1].result()
+    assert rejected.value.status_code == 409
+    assert futures[2].result() == 2
+    assert file.rows == [1, 2]
+
+def test_version_conflict_reloads_and_reapplies():
+    file = FakeFile()
+    save = file.save
+    
+    def save_after_another_worker(appointments, version):
+        if not file.saves:
+            # Another worker saves between our load and our upload
+            save([7], file.version)
+        save(appointments, version)
+    
+    writer = make_writer(file)
+    writer.save = save_after_another_worker
+    
+    assert writer.submit({'op': 'book', 'slot': 3}) == 3
+    assert file.rows == [7, 3]
+    assert writer.get_stats()['retries'] == 1
+
+def test_retry_checks_the_mutation_again():
+    file = FakeFile()
+    save = file.save
+    
+    def save_after_another_worker(appointments, version):
+        if not file.saves:
+            # Another worker takes the same slot first
+            save([3], file.version)
+        save(appointments, version)
+    
+    writer = make_writer(file)
+    writer.save = save_after_another_worker
+    
+    with pytest.raises(MutationRejected):
+        writer.submit({'op': 'book', 'slot': 3})
+    assert file.rows == [3]
+
+def test_non_retryable_error_fails_at_once():
+    file = FakeFile()
+    writer = make_writer(file)
+    
+    def refuse(appointments, version):
+        raise StorageWriteError('Forbidden', status_code=403, retryable=False)
+    writer.save = refuse
+    
+    with pytest.raises(StorageWriteError):
+        writer.submit({'op': 'book', 'slot': 1})
+    assert writer.get_stats()['gaveUp'] == 1
+    assert writer.get_stats()['retries'] == 0
+
+def test_slow_write_is_tracked_under_a_write_id():
+    file = FakeFile()
+    release = threading.Event()
+    
+    def locked_save(appointments, version):
+        release.wait(5)
+        file.save(appointments, version)
+    
+    writer = make_writer(file, ack_timeout=0.1, status_store=WriteStatusStore())
+    writer.save = locked_save
+    
+    with pytest.raises(WritePending) as pending:
+        writer.submit({'op': 'book', 'slot': 1})
+    assert writer.get_status(pending.value.write_id)['status'] == 'pending'
+    
+    release.set()
+    assert pending.value.future.result(timeout=5) == 1
+    assert writer.get_status(pending.value.write_id)['status'] == 'committed'
+
+def test_after_commit_error_does_not_fail_the_batch():
+    file = FakeFile()
+    
+    def broken_hook(appointments):
+        raise RuntimeError('publish failed')
+    
+    writer = make_writer(file, after_commit=broken_hook)
+    
+    assert writer.submit({'op': 'book', 'slot': 1}) == 1
+    assert file.saves == [[1]]
+    assert writer.get_stats()['retries'] == 0
+
+@pytest.fixture(scope='module')
+def app_module(tmp_path_factory):
+    """The app module configured for local storage; the environment and module are restored afterwards"""
+    root = tmp_path_factory.mktemp('storage')
+    os.makedirs(root / 'Sunique Wiki')
+    
+    with pytest.MonkeyPatch.context() as patch:
+        for name, value in {'STORAGE_BACKEND': 'local', 'STORAGE_LOCAL_DIR': str(root), 'ORDERS_FILE_PATH': '/orders.csv',
+                            'SNAPSHOT_DIR': '', 'WRITE_JOURNAL_DIR': '', 'WRITE_STATUS_DIR': ''}.items():
+            patch.setenv(name, value)
+        # Import afresh under this environment, and drop the modules again afterwards
+        for module in ('app', 'config'):
+            patch.delitem(sys.modules, module, raising=False)
+        import app
+        from services import file_formats
+        
+        columns = ['Ready Order Number', 'Pick up Status', 'Storage Fee Start From']
+        orders = [{'Ready Order Number': 'SO-1', 'Pick up Status': 'Ready', 'Storage Fee Start From': ''}]
+        (root / 'orders.csv').write_bytes(file_formats.records_to_csv_bytes(orders, columns))
+        try:
+            yield app
+        finally:
+            app.stop_background_work()
+            for module in ('app', 'config'):
+                sys.modules.pop(module, None)
+
+def test_booking_answers_202_while_the_write_is_retrying(app_module, monkeypatch):
+    writer = app_module.appointment_writer
+    release = threading.Event()
+    save = writer.save
+    
+    def locked_save(appointments, version):
+        release.wait(5)
+        save(appointments, version)
+    
+    monkeypatch.setattr(writer, 'save', locked_save)
+    monkeypatch.setattr(writer, 'ack_timeout', 0.1)
+    monkeypatch.setattr(app_module.email_service, 'send_confirmation_email', lambda *args, **kwargs: {'success': True})
+    client = app_module.app.test_client()
+    slot_time = app_module.generate_time_slots()[0]
+    
+    response = client.post('/api/book-appointment', json={
+        'orderNumber': 'SO-1',
+        'slotTime': slot_time,
+        'customerEmail': 'customer@example.com'
+    })
+    assert response.status_code == 202
+    body = response.get_json()
+    assert body['pending'] is True
+    assert client.get(body['statusUrl']).get_json()['status'] == 'pending'
+    
+    release.set()
+    for _ in range(100):
+        if client.get(body['statusUrl']).get_json()['status'] != 'pending':
+            break
+        time.sleep(0.05)
+    assert client.get(body['statusUrl']).get_json()['status'] == 'committed'
+    assert app_module.find_appointment_by_order_number(app_module.load_appointments(), 'SO-1')
@@ -0,0 +1,136 @@
+import random
+
+from services.dock_schedule import DockSchedule, DockScheduleCache
+
+# Two days of 9:00-11:30 in 30-minute slots (slot keys are minutes)
+GRID = [day * 1440 + 540 + 30 * i for day in (0, 1) for i in range(6)]
+
+def schedule(capacity=1, bookings=()):
+    return DockSchedule(GRID, lambda key: capacity, 30).load(bookings)
+
+def test_overlapping_appointments_share_the_bays():
+    dock = schedule(capacity=2, bookings=[(540, 90)])
+    assert dock.remaining(540, 30) == 1
+    assert dock.remaining(600, 60) == 1
+    assert dock.remaining(630, 30) == 2
+    
+    dock.add(570, 60)
+    assert not dock.fits(570, 30)
+    assert not dock.fits(540, 120)
+    assert dock.fits(630, 60)
+
+def test_release_frees_the_interval():
+    dock = schedule(bookings=[(540, 60)])
+    assert not dock.fits(570, 30)
+    dock.add(540, 60, -1)
+    assert dock.fits(540, 60)
+
+def test_appointment_cannot_run_past_closing_or_off_the_grid():
+    dock = schedule()
+    assert dock.fits(660, 60)
+    # 11:00 + 90 minutes runs past the last slot (11:30)
+    assert not dock.fits(660, 90)
+    # Not a bookable start time
+    assert not dock.fits(545, 30)
+    assert not dock.on_grid(545)
+
+def test_appointment_cannot_run_into_the_next_day():
+    dock = schedule(capacity=3)
+    assert dock.remaining(690, 30) == 3
+    assert dock.remaining(690, 60) == 0
+
+def test_first_fit_skips_blocked_starts():
+    dock = schedule(bookings=[(540, 60), (630, 30)])
+    assert dock.first_fit(540, 720, 30) == 600
+    assert dock.first_fit(540, 720, 60) == 660
+    assert dock.first_fit(540, 660, 90) is None
+
+def test_per_slot_capacity():
+    capacity = {600: 0, 630: 2}
+    dock = DockSchedule(GRID, lambda key: capacity.get(key, 1), 30).load([(630, 30)])
+    assert not dock.fits(600, 30)
+    assert not dock.fits(570, 60)
+    assert dock.remaining(630, 30) == 1
+
+def test_matches_counting_every_slot():
+    rng = random.Random(7)
+    dock = schedule(capacity=2)
+    booked = []
+    for _ in range(300):
+        start, duration = rng.choice(GRID), rng.choice([30, 60, 90])
+        if booked and rng.random() < 0.4:
+            start, duration = booked.pop(rng.randrange(len(booked)))
+            dock.add(start, duration, -1)
+        elif dock.fits(start, duration):
+            booked.append((start, duration))
+            dock.add(start, duration)
+        
+        for key in GRID:
+            for length in (30, 60, 90):
+                slots = [key + offset for offset in range(0, length, 30)]
+                if not all(slot in GRID for slot in slots):
+                    expected = 0
+                else:
+                    expected = min(2 - sum(s <= slot < s + d for s, d in booked) for slot in slots)
+                assert dock.remaining(key, length) == expected
+    
+    assert [dock.remaining(key, 30) for key in GRID] == [schedule(2, booked).remaining(key, 30) for key in GRID]
+
+def test_copy_is_independent():
+    dock = schedule()
+    copy = dock.copy()
+    copy.add(540, 30)
+    assert dock.fits(540, 30)
+    assert not copy.fits(540, 30)
+
+def test_cache_builds_once_per_source_and_grid():
+    builds = []
+    version = [0]
+    def build(appointments):
+        builds.append(appointments)
+        return schedule(bookings=appointments)
+    cache = DockScheduleCache(build, lambda: version[0])
+    snapshot, newer = object(), object()
+    
+    first = cache.get(snapshot, lambda: [(540, 30)])
+    assert cache.get(snapshot, lambda: []) is first
+    assert cache.get(newer, lambda: []) is not first
+    version[0] += 1
+    cache.get(newer, lambda: [])
+    assert len(builds) == 3
+    # No source (e.g. no appointments file yet): never cached
+    cache.get(None, lambda: [])
+    cache.get(None, lambda: [])
+    assert cache.get_stats()['builds'] == 5
+
+def test_cache_takes_a_saved_batch_unless_the_grid_moved():
+    version = [0]
+    cache = DockScheduleCache(lambda appointments: schedule(bookings=appointments), lambda: version[0])
+    snapshot, saved = object(), object()
+    
+    batch, batch_version = cache.checkout(snapshot, lambda: [])
+    batch.add(540, 30)
+    assert cache.get(snapshot, lambda: []).fits(540, 30)
+    
+    cache.put(batch, saved, batch_version)
+    assert cache.get(saved, lambda: []) is batch
+    
+    stale, stale_version = cache.checkout(saved, lambda: [])
+    version[0] += 1
+    cache.put(stale, object(), stale_version)
+    assert cache.get_stats()['updates'] == 1
+
+def test_cache_advances_the_cached_schedule_to_a_newer_snapshot():
+    cache = DockScheduleCache(lambda appointments: schedule(bookings=appointments), lambda: 0)
+    snapshot, newer, unrelated = object(), object(), object()
+    first = cache.get(snapshot, lambda: [(540, 30)])
+    
+    cache.advance(snapshot, newer, lambda dock: dock.add(570, 30))
+    advanced = cache.get(newer, lambda: [])
+    assert not advanced.fits(540, 60)
+    assert first.fits(570, 30)
+    
+    # Only the cached schedule is advanced; anything else is built on use
+    cache.advance(unrelated, object(), lambda dock: dock.add(600, 30))
+    assert cache.get(newer, lambda: []) is advanced
+    assert cache.get_stats() == {'builds': 1, 'updates': 1}
@@ -0,0 +1,135 @@
+from services.reminder_scheduler import ReminderScheduler
+
+DAY = 20000 * 1440
+START = DAY + 600  # 10:00 AM
+DAY_BEFORE = DAY - 1440 + 960  # 4:00 PM the day before
+MORNING_OF = DAY + 420  # 7:00 AM
+SEND_TIMES = [('dayBefore', 1, 960), ('morningOf', 0, 420)]
+
+class Setup:
+    """Appointments, a clock in minutes and the reminders sent"""
+    
+    def __init__(self, minute, **kwargs):
+        self.minute = minute
+        self.appointments = {}
+        self.version = 0
+        self.sent = []
+        self.fail = False
+        self.scheduler = ReminderScheduler(
+            lambda: (list(self.appointments.items()), self.version),
+            lambda item: (item[0], item[1], 'customer@example.com'),
+            self.send,
+            SEND_TIMES,
+            clock=lambda: self.minute * 60,
+            **kwargs
+        )
+    
+    def send(self, kind, order_number, slot_key, email):
+        if self.fail:
+            return {'success': False, 'message': 'Graph error'}
+        self.sent.append((kind, order_number, slot_key))
+        return {'success': True}
+    
+    def book(self, order_number, start=START):
+        self.appointments[order_number] = start
+        self.version += 1
+    
+    def cancel(self, order_number):
+        del self.appointments[order_number]
+        self.version += 1
+    
+    def run_at(self, minute):
+        self.minute = minute
+        return self.scheduler.run_once()
+
+def test_each_reminder_is_sent_once_at_its_minute():
+    setup = Setup(DAY - 2880)
+    setup.book('SO-1')
+    setup.run_at(DAY - 2880)
+    
+    assert setup.run_at(DAY_BEFORE - 1) == 0
+    assert setup.run_at(DAY_BEFORE) == 1
+    assert setup.run_at(DAY_BEFORE + 5) == 0
+    assert setup.run_at(MORNING_OF) == 1
+    assert setup.sent == [('dayBefore', 'SO-1', START), ('morningOf', 'SO-1', START)]
+    assert setup.scheduler.get_stats()['scheduled'] == 0
+
+def test_cancelled_appointment_gets_no_reminders():
+    setup = Setup(DAY - 2880)
+    setup.book('SO-1')
+    setup.run_at(DAY - 2880)
+    setup.cancel('SO-1')
+    
+    setup.run_at(DAY_BEFORE)
+    setup.run_at(MORNING_OF)
+    assert setup.sent == []
+
+def test_rescheduled_appointment_is_reminded_at_its_new_time():
+    setup = Setup(DAY - 2880)
+    setup.book('SO-1')
+    setup.run_at(DAY - 2880)
+    setup.book('SO-1', START + 1440)
+    
+    setup.run_at(DAY_BEFORE)
+    assert setup.sent == []
+    setup.run_at(DAY_BEFORE + 1440)
+    assert setup.sent == [('dayBefore', 'SO-1', START + 1440)]
+
+def test_reminder_whose_minute_has_passed_is_not_sent():
+    setup = Setup(DAY - 2880)
+    setup.run_at(DAY_BEFORE + 60)
+    # Booked the evening before: only the morning-of reminder goes out
+    setup.book('SO-1')
+    setup.run_at(DAY_BEFORE + 61)
+    setup.run_at(MORNING_OF)
+    assert setup.sent == [('morningOf', 'SO-1', START)]
+
+def test_only_the_last_of_several_due_reminders_is_sent():
+    setup = Setup(DAY - 2880)
+    setup.book('SO-1')
+    setup.run_at(DAY - 2880)
+    
+    # Down from before the first reminder until after the second
+    setup.run_at(MORNING_OF + 30)
+    assert setup.sent == [('morningOf', 'SO-1', START)]
+    assert setup.scheduler.get_stats()['skipped'] == 1
+
+def test_sends_are_throttled_per_minute():
+    setup = Setup(DAY - 2880, max_per_minute=2)
+    for i in range(3):
+        setup.book(f'SO-{i}')
+    setup.run_at(DAY - 2880)
+    
+    assert setup.run_at(DAY_BEFORE) == 2
+    assert setup.scheduler.get_stats()['throttled'] == 1
+    assert setup.run_at(DAY_BEFORE + 1) == 1
+    assert sorted(order for _, order, _ in setup.sent) == ['SO-0', 'SO-1', 'SO-2']
+
+def test_failed_send_is_retried_on_the_next_run():
+    setup = Setup(DAY - 2880)
+    setup.book('SO-1')
+    setup.run_at(DAY - 2880)
+    
+    setup.fail = True
+    assert setup.run_at(DAY_BEFORE) == 0
+    setup.fail = False
+    assert setup.run_at(DAY_BEFORE + 1) == 1
+    assert setup.sent == [('dayBefore', 'SO-1', START)]
+
+def test_restart_neither_resends_nor_skips(tmp_path):
+    path = str(tmp_path / 'reminders.json')
+    setup = Setup(DAY - 2880, path=path, max_per_minute=1)
+    setup.book('SO-1')
+    setup.book('SO-2')
+    setup.run_at(DAY - 2880)
+    # One reminder sent, the other left due by the throttle
+    assert setup.run_at(DAY_BEFORE) == 1
+    
+    restarted = Setup(DAY_BEFORE + 2, path=path)
+    restarted.appointments = dict(setup.appointments)
+    restarted.run_at(DAY_BEFORE + 2)
+    assert len(restarted.sent) == 1
+    assert {setup.sent[0][1], restarted.sent[0][1]} == {'SO-1', 'SO-2'}
+    
+    restarted.run_at(MORNING_OF)
+    assert sorted(order for _, order, _ in restarted.sent[1:]) == ['SO-1', 'SO-2']
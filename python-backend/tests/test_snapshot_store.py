@@ -0,0 +1,27 @@
+from services.record_table import RecordTable
+from services.snapshot_store import SnapshotDiskStore
+
+PATH = '/orders.xlsx'
+
+def table(columns):
+    return RecordTable.from_records([{'Ready Order Number': 'SO-1', 'Dock Minutes': '90'}], 'Ready Order Number', columns)
+
+def test_snapshot_is_loaded_back_under_the_same_schema(tmp_path):
+    store = SnapshotDiskStore(str(tmp_path))
+    columns = ['Ready Order Number', 'Dock Minutes']
+    schema = store.schema_key(columns)
+    store.save(PATH, 'etag-1', table(columns), schema)
+    
+    version, loaded = store.load_latest(PATH, schema)
+    assert version == 'etag-1'
+    assert loaded.find('so-1')['Dock Minutes'] == '90'
+    assert store.has(PATH, 'etag-1', schema)
+
+def test_snapshot_parsed_into_other_columns_is_ignored(tmp_path):
+    store = SnapshotDiskStore(str(tmp_path))
+    store.save(PATH, 'etag-1', table(['Ready Order Number']), store.schema_key(['Ready Order Number']))
+    
+    schema = store.schema_key(['Ready Order Number', 'Dock Minutes'])
+    assert store.load_latest(PATH, schema) is None
+    assert store.load(PATH, 'etag-1', schema) is None
+    assert not store.has(PATH, 'etag-1', schema)
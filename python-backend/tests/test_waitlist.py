@@ -0,0 +1,52 @@
+from services.appointment_writer import MutationRejected
+from services.dock_schedule import DockSchedule
+from services.slot_keys import slot_key_from_iso
+from services.waitlist import Waitlist
+from services.waitlist_promoter import WaitlistPromoter
+
+DATE = '2099-01-05'
+DAY_START = slot_key_from_iso(f"{DATE}T00:00:00Z")
+# 9:00, 9:30 and 10:00, one bay each
+GRID = [DAY_START + 540 + 30 * i for i in range(3)]
+
+def join(waitlist, order_number, requested_at):
+    return waitlist.join({'orderNumber': order_number, 'date': DATE, 'customerEmail': 'customer@example.com',
+                          'durationMinutes': 30, 'requestedAt': requested_at})
+
+def test_positions_follow_the_queue():
+    waitlist = Waitlist()
+    for order_number, requested_at in [('SO-2', 20), ('SO-1', 10), ('SO-3', 30)]:
+        join(waitlist, order_number, requested_at)
+    assert [waitlist.get(order)[1] for order in ('SO-1', 'SO-2', 'SO-3')] == [1, 2, 3]
+    
+    waitlist.leave('so-1')
+    assert waitlist.get('SO-3')[1] == 2
+    assert [entry['orderNumber'] for entry in waitlist.waiting(DATE)] == ['SO-2', 'SO-3']
+    # Joining again for the same day keeps the place
+    assert join(waitlist, 'SO-2', 99)[1] == 1
+
+def test_slot_taken_meanwhile_moves_on_to_the_next_free_one():
+    waitlist = Waitlist()
+    join(waitlist, 'SO-1', 10)
+    # 9:00 was booked by someone we haven't read yet
+    taken = {GRID[0]}
+    booked, notified = [], []
+    
+    def book(entry, slot_time):
+        if slot_key_from_iso(slot_time) in taken:
+            raise MutationRejected('This time slot is no longer available', 409)
+        booked.append((entry['orderNumber'], slot_time))
+    
+    promoter = WaitlistPromoter(
+        waitlist,
+        load_appointments=lambda: ([], 1),
+        build_schedule=lambda appointments: DockSchedule(GRID, lambda key: 1, 30),
+        is_bookable=lambda order_number: True,
+        book=book,
+        notify=lambda entry, slot_time: notified.append(slot_time)
+    )
+    
+    assert promoter.run_once() == 1
+    assert booked == [('SO-1', f"{DATE}T09:30:00Z")]
+    assert notified == [f"{DATE}T09:30:00Z"]
+    assert waitlist.days() == []
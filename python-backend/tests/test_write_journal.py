@@ -0,0 +1,109 @@
+import fcntl
+import json
+import os
+import time
+
+from services.appointment_writer import GroupCommitWriter
+from services.write_journal import WriteJournal
+
+def crash(journal):
+    """Drop a journal's file (and its lock) the way a dying process does"""
+    journal._file.close()
+
+def test_unconfirmed_mutations_are_replayed_after_a_crash(tmp_path):
+    journal = WriteJournal(str(tmp_path))
+    first = journal.append({'op': 'book', 'orderNumber': 'SO-1'})
+    journal.append({'op': 'cancel', 'orderNumber': 'SO-2'})
+    journal.confirm([first], 'committed')
+    crash(journal)
+    
+    restarted = WriteJournal(str(tmp_path))
+    replayed = []
+    def resubmit(mutation):
+        restarted.append(mutation)
+        replayed.append(mutation)
+    
+    assert restarted.recover(resubmit) == 1
+    assert replayed == [{'op': 'cancel', 'orderNumber': 'SO-2'}]
+    # The replayed change is journaled again; the old file is gone
+    assert restarted.pending_count() == 1
+    assert os.listdir(tmp_path) == [f"journal-{os.getpid()}.jsonl"]
+
+def test_recover_replays_other_dead_processes_and_skips_torn_lines(tmp_path):
+    lines = [
+        {'id': 'a', 'mutation': {'op': 'book', 'orderNumber': 'SO-1'}},
+        {'id': 'b', 'mutation': {'op': 'book', 'orderNumber': 'SO-2'}},
+        {'done': ['a'], 'outcome': 'rejected'}
+    ]
+    content = ''.join(json.dumps(line) + '\n' for line in lines) + '{"id": "c", "mutat'
+    (tmp_path / 'journal-999999.jsonl').write_text(content)
+    
+    journal = WriteJournal(str(tmp_path))
+    replayed = []
+    assert journal.recover(replayed.append) == 1
+    assert replayed == [{'op': 'book', 'orderNumber': 'SO-2'}]
+    assert not (tmp_path / 'journal-999999.jsonl').exists()
+
+def test_journal_of_a_running_process_is_left_alone(tmp_path):
+    path = tmp_path / 'journal-999999.jsonl'
+    path.write_text(json.dumps({'id': 'a', 'mutation': {'op': 'book'}}) + '\n')
+    with open(path) as owner:
+        fcntl.flock(owner, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        
+        replayed = []
+        assert WriteJournal(str(tmp_path)).recover(replayed.append) == 0
+        assert replayed == []
+    assert path.exists()
+
+def test_journal_of_a_live_process_is_locked_from_the_start(tmp_path):
+    ready_read, ready_write = os.pipe()
+    done_read, done_write = os.pipe()
+    pid = os.fork()
+    if pid == 0:
+        journal = WriteJournal(str(tmp_path))
+        journal.append({'op': 'book', 'orderNumber': 'SO-1'})
+        os.write(ready_write, b'x')
+        os.read(done_read, 1)
+        os._exit(0)
+    
+    os.read(ready_read, 1)
+    replayed = []
+    assert WriteJournal(str(tmp_path)).recover(replayed.append) == 0
+    assert os.listdir(tmp_path) == [f"journal-{pid}.jsonl"]
+    os.write(done_write, b'x')
+    os.waitpid(pid, 0)
+    
+    # Once the owner is gone, its entry is replayed
+    assert WriteJournal(str(tmp_path)).recover(replayed.append) == 1
+    assert replayed == [{'op': 'book', 'orderNumber': 'SO-1'}]
+
+def test_journal_is_truncated_once_everything_is_confirmed(tmp_path):
+    journal = WriteJournal(str(tmp_path))
+    entries = [journal.append({'op': 'book', 'orderNumber': f'SO-{i}'}) for i in range(3)]
+    journal.confirm(entries[:2], 'committed')
+    assert journal.pending_count() == 1
+    assert os.path.getsize(journal._path()) > 0
+    
+    journal.confirm(entries[2:], 'failed')
+    assert journal.pending_count() == 0
+    assert os.path.getsize(journal._path()) == 0
+
+def test_writer_uploads_the_changes_a_crashed_process_accepted(tmp_path):
+    journal = WriteJournal(str(tmp_path))
+    journal.append({'op': 'book', 'slot': 1})
+    journal.append({'op': 'book', 'slot': 2})
+    crash(journal)
+    
+    saved = []
+    def apply(appointments, mutation):
+        appointments.append(mutation['slot'])
+    writer = GroupCommitWriter(lambda: ([], 'v1'), apply, lambda appointments, version: saved.append(appointments),
+                               window_seconds=0.05, journal=WriteJournal(str(tmp_path)))
+    
+    assert writer.recover() == 2
+    for _ in range(100):
+        if writer.journal.pending_count() == 0:
+            break
+        time.sleep(0.05)
+    assert saved == [[1, 2]]
+    assert writer.journal.pending_count() == 0